@@ -1,31 +1,60 @@
-from typing import Annotated
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import TYPE_CHECKING, Annotated, Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials, OAuth2PasswordBearer
-from jose import jwt, JWTError
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta, timezone
-import os
-from dotenv import load_dotenv
-from passlib.context import CryptContext
 
-from app.database import get_db
+from app.config import settings
+from app.database import get_async_db
+from app.metrics import password_hash_duration, register_gauge
 from app.models import User
+from app.token_cache import Principal, token_cache
+
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
+
+# Read settings (see app.config)
+SECRET_KEY = settings.secret_key
+ALGORITHM = settings.algorithm
+ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expire_minutes
+BCRYPT_ROUNDS = settings.bcrypt_rounds
+PASSWORD_HASH_WORKERS = settings.password_hash_workers
+PASSWORD_HASH_QUEUE_LIMIT = settings.password_hash_queue_limit
+PASSWORD_HASH_RETRY_AFTER = settings.password_hash_retry_after
+
+# passlib/bcrypt and python-jose (with cryptography) are imported on first
+# use rather than with this module; warm_up_auth does that before serving.
+# "warm-up" hashed at bcrypt's minimum cost, so verifying it is nearly free.
+_WARM_UP_HASH = "$2b$04$WTxYrzc4q/O6XHvtg.DOzemOhuLZwzfH7vz3eKS5m8Eo2OpNh7xV."
+
+# bcrypt releases the GIL, so a small thread pool keeps hashing off the
+# event loop. _hash_pending counts jobs running or queued on it; it is only
+# touched from the event loop thread, so no lock is needed.
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_hash_pending = 0
+register_gauge(
+    "password_hash_pending", "bcrypt jobs running or queued on the hashing pool.", lambda: _hash_pending
+)
 
-# Load .env file
-load_dotenv()
+# http bearer for jwt
+oauth2_bearer = OAuth2PasswordBearer(tokenUrl="auth/login")
 
-# Read settings
-SECRET_KEY = os.getenv("SECRET_KEY")
-ALGORITHM = os.getenv("ALGORITHM", "HS256")
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
+db_dependency = Annotated[AsyncSession, Depends(get_async_db)]
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-# http bearer for jwt
-oauth2_bearer = OAuth2PasswordBearer(tokenUrl="auth/login")
+@lru_cache(maxsize=None)
+def get_pwd_context() -> "CryptContext":
+    """
+    Password hashing context. Hashes made with a different cost factor report
+    needs_update, which login uses to rehash them transparently.
+    """
+    from passlib.context import CryptContext
 
-db_dependency = Annotated[Session, Depends(get_db)]
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -36,7 +65,7 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     :param hashed_password: The hashed password to compare against.
     :return: True if the passwords match, False otherwise.
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
@@ -46,7 +75,62 @@ def get_password_hash(password: str) -> str:
     :param password: The password to hash.
     :return: The hashed password.
     """
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
+
+
+def _timed_hash_call(operation: str, func, *args):
+    start = time.perf_counter()
+    try:
+        return func(*args)
+    finally:
+        password_hash_duration.observe(time.perf_counter() - start, operation)
+
+
+async def _run_in_hash_pool(operation: str, func, *args):
+    """
+    Run a bcrypt call on the hashing pool, shedding load when it is saturated.
+
+    Time spent in the call itself is recorded in password_hash_seconds under
+    ``operation``.
+
+    :raises HTTPException: 503 with Retry-After when more than
+        PASSWORD_HASH_QUEUE_LIMIT jobs are already waiting for a worker.
+    """
+    global _hash_pending
+    if _hash_pending >= PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_LIMIT:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many authentication requests, try again shortly",
+            headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER)},
+        )
+    _hash_pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_hash_executor, _timed_hash_call, operation, func, *args)
+    finally:
+        _hash_pending -= 1
+
+
+async def hash_password_in_pool(password: str) -> str:
+    """
+    Hash a password on the bounded hashing pool.
+
+    :param password: The password to hash.
+    :return: The hashed password.
+    """
+    return await _run_in_hash_pool("hash", get_pwd_context().hash, password)
+
+
+async def verify_password_in_pool(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    """
+    Verify a password on the bounded hashing pool.
+
+    :param plain_password: The plain password to verify.
+    :param hashed_password: The stored hash to compare against.
+    :return: (matches, new_hash) where new_hash is set when the stored hash
+        was made with an outdated cost factor and should be replaced.
+    """
+    return await _run_in_hash_pool("verify", get_pwd_context().verify_and_update, plain_password, hashed_password)
 
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None) -> str:
@@ -58,6 +142,8 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None) -> s
     :return: The encoded JWT token.
     """
 
+    from jose import jwt
+
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + expires_delta
     to_encode.update({"exp": expire})
@@ -69,34 +155,57 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None) -> s
 async def get_current_user(
     token: Annotated[str, Depends(oauth2_bearer)],
     db: db_dependency,
-) -> User:
+) -> Principal:
+    # Already verified and resolved recently: no decode, no DB round trip
+    principal = token_cache.get(token)
+    if principal is not None:
+        return principal
+
+    from jose import JWTError, jwt
+
     # Common 401 exception
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    decoded_payload = jwt.get_unverified_claims(token)
-    print(decoded_payload)
     # Decode & verify the JWT
     try:
-        # print("Starting JWT decode")
-        # print(f"Token: {token}")
-        # print(f"SECRET_KEY: {SECRET_KEY}, ALGORITHM: {ALGORITHM}")
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        # print(payload)
         user_id: str = payload.get("user_id")
         if user_id is None:
-            # print("User ID not found in token payload.")
             raise credentials_exception
-    except JWTError as e:
-        # print(f"JWTError: {e}")
+    except JWTError:
         raise credentials_exception
 
-    # 5) Load the user from the DB
-    user = db.query(User).get(int(user_id))
+    # Load the user from the DB
+    user = await db.get(User, int(user_id))
     if not user:
-        # print("User not found in database.")
         raise credentials_exception
 
-    return user
+    principal = Principal(id=user.id, email=user.email, name=user.name)
+    token_cache.put(token, payload, principal)
+    return principal
+
+
+async def warm_up_auth() -> None:
+    """
+    Load passlib/bcrypt and python-jose and start the hashing threads.
+
+    Called from the app's lifespan so the first signup/login/authenticated
+    request does not pay for the imports, backend detection and thread start.
+    Nothing is recorded in the password_hash_seconds metric.
+    """
+    context = get_pwd_context()
+    loop = asyncio.get_running_loop()
+    # One job per worker so every thread of the pool gets started
+    await asyncio.gather(*(
+        loop.run_in_executor(_hash_executor, context.verify, "warm-up", _WARM_UP_HASH)
+        for _ in range(PASSWORD_HASH_WORKERS)
+    ))
+
+    from jose import jwt
+
+    if SECRET_KEY:
+        token = create_access_token({"sub": "warm-up"}, expires_delta=timedelta(minutes=1))
+        jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
@@ -0,0 +1,132 @@
+"""
+Application settings, read from the environment (and ``.env``) once.
+
+Modules take their configuration from ``settings`` rather than calling
+load_dotenv/os.getenv themselves, and copy what they use into module-level
+constants. Variables are documented in README.md and .env.example.
+"""
+
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+from dotenv import load_dotenv
+
+
+def _bool(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+
+@dataclass(frozen=True)
+class Settings:
+    # PostgreSQL
+    postgres_user: Optional[str]
+    postgres_password: Optional[str]
+    postgres_db: Optional[str]
+    postgres_host: str
+    postgres_port: str
+
+    # Connection pool and SQL diagnostics
+    db_echo: bool
+    db_pool_size: int
+    db_max_overflow: int
+    db_pool_timeout: float
+    db_pool_recycle: int
+    db_pool_pre_ping: bool
+    db_pool_warmup: int
+    db_statement_timeout_ms: int
+    db_pgbouncer: bool
+    db_replica_url: Optional[str]
+    db_replica_pin_seconds: float
+    slow_query_ms: float
+    max_queries_per_request: int
+
+    # JWT and password hashing
+    secret_key: Optional[str]
+    algorithm: str
+    access_token_expire_minutes: int
+    bcrypt_rounds: int
+    password_hash_workers: int
+    password_hash_queue_limit: int
+    password_hash_retry_after: int
+    token_cache_size: int
+    token_cache_ttl_seconds: float
+
+    # Load shedding: concurrency, queue length and queue wait per router and overall
+    max_concurrency: int
+    max_queue: int
+    max_queue_wait_ms: float
+    auth_max_concurrency: int
+    auth_max_queue: int
+    auth_max_queue_wait_ms: float
+    expenses_max_concurrency: int
+    expenses_max_queue: int
+    expenses_max_queue_wait_ms: float
+    load_shed_retry_after: int
+
+    # Cross-worker cache invalidation
+    cache_invalidation: bool
+    cache_flush_interval_seconds: float
+    db_listen_host: str
+    db_listen_port: str
+
+    # Monthly partitions of expenses
+    expense_partition_months_ahead: int
+    expense_partition_check_hours: float
+
+    # Startup
+    prewarm: bool
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        """Load ``.env`` (without overriding real environment variables) and read every setting."""
+        load_dotenv()
+        return cls(
+            postgres_user=os.getenv("POSTGRES_USER"),
+            postgres_password=os.getenv("POSTGRES_PASSWORD"),
+            postgres_db=os.getenv("POSTGRES_DB"),
+            postgres_host=os.getenv("POSTGRES_HOST", "db"),
+            postgres_port=os.getenv("POSTGRES_PORT", "5432"),
+            db_echo=_bool("DB_ECHO", "false"),
+            db_pool_size=int(os.getenv("DB_POOL_SIZE", 5)),
+            db_max_overflow=int(os.getenv("DB_MAX_OVERFLOW", 10)),
+            db_pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", 30)),
+            db_pool_recycle=int(os.getenv("DB_POOL_RECYCLE", 1800)),
+            db_pool_pre_ping=_bool("DB_POOL_PRE_PING", "false"),
+            db_pool_warmup=int(os.getenv("DB_POOL_WARMUP", 0)),
+            db_statement_timeout_ms=int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 0)),
+            db_pgbouncer=_bool("DB_PGBOUNCER", "false"),
+            db_replica_url=os.getenv("DB_REPLICA_URL") or None,
+            db_replica_pin_seconds=float(os.getenv("DB_REPLICA_PIN_SECONDS", 5)),
+            slow_query_ms=float(os.getenv("SLOW_QUERY_MS", 200)),
+            max_queries_per_request=int(os.getenv("MAX_QUERIES_PER_REQUEST", 15)),
+            secret_key=os.getenv("SECRET_KEY"),
+            algorithm=os.getenv("ALGORITHM", "HS256"),
+            access_token_expire_minutes=int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30)),
+            bcrypt_rounds=int(os.getenv("BCRYPT_ROUNDS", 12)),
+            password_hash_workers=int(os.getenv("PASSWORD_HASH_WORKERS", 2)),
+            password_hash_queue_limit=int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", 32)),
+            password_hash_retry_after=int(os.getenv("PASSWORD_HASH_RETRY_AFTER", 1)),
+            token_cache_size=int(os.getenv("TOKEN_CACHE_SIZE", 10000)),
+            token_cache_ttl_seconds=float(os.getenv("TOKEN_CACHE_TTL_SECONDS", 300)),
+            max_concurrency=int(os.getenv("MAX_CONCURRENCY", 100)),
+            max_queue=int(os.getenv("MAX_QUEUE", 200)),
+            max_queue_wait_ms=float(os.getenv("MAX_QUEUE_WAIT_MS", 2000)),
+            auth_max_concurrency=int(os.getenv("AUTH_MAX_CONCURRENCY", 8)),
+            auth_max_queue=int(os.getenv("AUTH_MAX_QUEUE", 32)),
+            auth_max_queue_wait_ms=float(os.getenv("AUTH_MAX_QUEUE_WAIT_MS", 1000)),
+            expenses_max_concurrency=int(os.getenv("EXPENSES_MAX_CONCURRENCY", 64)),
+            expenses_max_queue=int(os.getenv("EXPENSES_MAX_QUEUE", 128)),
+            expenses_max_queue_wait_ms=float(os.getenv("EXPENSES_MAX_QUEUE_WAIT_MS", 500)),
+            load_shed_retry_after=int(os.getenv("LOAD_SHED_RETRY_AFTER", 1)),
+            cache_invalidation=_bool("CACHE_INVALIDATION", "true"),
+            cache_flush_interval_seconds=float(os.getenv("CACHE_FLUSH_INTERVAL_SECONDS", 5)),
+            db_listen_host=os.getenv("DB_LISTEN_HOST") or os.getenv("POSTGRES_HOST", "db"),
+            db_listen_port=os.getenv("DB_LISTEN_PORT") or os.getenv("POSTGRES_PORT", "5432"),
+            expense_partition_months_ahead=int(os.getenv("EXPENSE_PARTITION_MONTHS_AHEAD", 3)),
+            expense_partition_check_hours=float(os.getenv("EXPENSE_PARTITION_CHECK_HOURS", 24)),
+            prewarm=_bool("APP_PREWARM", "true"),
+        )
+
+
+settings = Settings.from_env()
@@ -0,0 +1,48 @@
+"""
+Explicit server-side cursors for streamed reads.
+
+``DECLARE ... CURSOR`` is planned with cursor_tuple_fraction, i.e. for fast
+delivery of the first rows, so an ordered export walks the matching index
+backwards instead of sorting the whole result before sending anything.
+asyncpg's protocol-level cursors (what ``stream_results`` uses) are planned
+for total cost and usually end up with that full sort.
+"""
+
+from typing import AsyncIterator
+
+from sqlalchemy import Select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+
+class DeclareCursor(Executable, ClauseElement):
+    """``DECLARE <name> NO SCROLL CURSOR FOR <query>``, with the query's bind parameters."""
+    inherit_cache = False
+
+    def __init__(self, name: str, query: Select):
+        self.name = name
+        self.query = query
+
+
+@compiles(DeclareCursor, "postgresql")
+def _compile_declare_cursor(element, compiler, **kw):
+    return f"DECLARE {element.name} NO SCROLL CURSOR FOR {compiler.process(element.query, **kw)}"
+
+
+async def stream_with_cursor(
+    session: AsyncSession, query: Select, chunk_rows: int, name: str = "stream_cursor"
+) -> AsyncIterator[list]:
+    """
+    Yield the rows of ``query`` in lists of up to ``chunk_rows``.
+
+    The cursor lives in the session's transaction and goes away when the
+    session is closed; rows are typed like ``query``'s selected columns.
+    """
+    await session.execute(DeclareCursor(name, query))
+    fetch = text(f"FETCH FORWARD {int(chunk_rows)} FROM {name}").columns(*query.selected_columns)
+    while True:
+        rows = (await session.execute(fetch)).all()
+        if not rows:
+            return
+        yield rows
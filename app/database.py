@@ -1,38 +1,230 @@
-import os
-from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
+import asyncio
+import logging
+from typing import AsyncIterator, Optional
+from uuid import uuid4
+from sqlalchemy import Engine, create_engine, event, make_url, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import NullPool
 
-# 1) Load .env file from project root
-load_dotenv()
+from app.config import settings
+from app.metrics import (
+    InstrumentedAsyncQueuePool, InstrumentedQueuePool, InstrumentedReplicaAsyncQueuePool, track_engine,
+)
+
+# 1) Read individual values (see app.config)
+DB_USER = settings.postgres_user
+DB_PASSWORD = settings.postgres_password
+DB_NAME = settings.postgres_db
+DB_HOST = settings.postgres_host
+DB_PORT = settings.postgres_port
+# Log every statement; for local debugging only, it is slow. Per-request
+# query counts and the slow-query log live in app.sql_stats.
+DB_ECHO = settings.db_echo
 
-# 2) Read individual values (as defined in your .env)
-DB_USER = os.getenv("POSTGRES_USER")
-DB_PASSWORD = os.getenv("POSTGRES_PASSWORD")
-DB_NAME = os.getenv("POSTGRES_DB")
-DB_HOST = os.getenv("POSTGRES_HOST", "db")
-DB_PORT = os.getenv("POSTGRES_PORT", "5432")
+# Connection pool, per engine and per process. Every uvicorn worker of every
+# task can hold up to DB_POOL_SIZE + DB_MAX_OVERFLOW server connections.
+DB_POOL_SIZE = settings.db_pool_size
+DB_MAX_OVERFLOW = settings.db_max_overflow
+DB_POOL_TIMEOUT = settings.db_pool_timeout
+DB_POOL_RECYCLE = settings.db_pool_recycle                  # seconds, -1 to never recycle
+DB_POOL_PRE_PING = settings.db_pool_pre_ping
+DB_POOL_WARMUP = settings.db_pool_warmup                    # connections opened at startup
+DB_STATEMENT_TIMEOUT_MS = settings.db_statement_timeout_ms  # 0 for no limit
+# Connect through PgBouncer in transaction pooling mode: no app-side pool,
+# no server-side prepared statement reuse, no startup parameters
+DB_PGBOUNCER = settings.db_pgbouncer
+# Optional streaming replica for reads (see app.replicas); same pool settings
+DB_REPLICA_URL = settings.db_replica_url
 
-# 3) Construct the full URL dynamically
+logger = logging.getLogger(__name__)
+
+# 2) Construct the full URL dynamically
 DATABASE_URL = (
     f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 )
+# Same database, reached through the asyncpg driver for the request path
+ASYNC_DATABASE_URL = (
+    f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+)
+
+
+def engine_options(async_driver: bool, pgbouncer: bool = DB_PGBOUNCER, replica: bool = False) -> dict:
+    """
+    Keyword arguments for create_engine/create_async_engine from the DB_* settings.
+
+    :param async_driver: True for asyncpg, False for psycopg2.
+    :param pgbouncer: Build the PgBouncer transaction-pooling profile.
+    :param replica: For the read replica's async engine; its pool reports
+        checkouts, waits and timeouts under pool="replica", like its gauges.
+    """
+    options = {"echo": DB_ECHO}
+    connect_args = {}
+    if pgbouncer:
+        # PgBouncer is the pool; a server connection is only ours for one
+        # transaction, so nothing may outlive it on the server side
+        options["poolclass"] = NullPool
+        if async_driver:
+            connect_args.update(
+                statement_cache_size=0,
+                prepared_statement_cache_size=0,
+                prepared_statement_name_func=lambda: f"__asyncpg_{uuid4()}__",
+            )
+    else:
+        options.update(
+            poolclass=(
+                (InstrumentedReplicaAsyncQueuePool if replica else InstrumentedAsyncQueuePool)
+                if async_driver else InstrumentedQueuePool
+            ),
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=DB_POOL_PRE_PING,
+        )
+        if DB_STATEMENT_TIMEOUT_MS:
+            # Sent once per connection as a startup parameter
+            if async_driver:
+                connect_args["server_settings"] = {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}
+            else:
+                connect_args["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+    if connect_args:
+        options["connect_args"] = connect_args
+    return options
+
 
+def _set_local_statement_timeout(conn) -> None:
+    conn.exec_driver_sql(f"SET LOCAL statement_timeout = {DB_STATEMENT_TIMEOUT_MS}")
 
-# 4) Create engine and session factory as before
-engine = create_engine(DATABASE_URL, echo=True, future=True)
-SessionLocal = sessionmaker(
-    bind=engine,
-    autocommit=False,
+
+# 3) Async engine and session factory used by the routers, so queries
+#    await on the socket instead of blocking the event loop
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(async_driver=True))
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
     autoflush=False,
     expire_on_commit=False,
 )
 
+if DB_PGBOUNCER and DB_STATEMENT_TIMEOUT_MS:
+    # PgBouncer rejects startup parameters, so set the timeout per transaction
+    # (one extra round trip each; ALTER ROLE ... SET statement_timeout avoids it)
+    event.listen(async_engine.sync_engine, "begin", _set_local_statement_timeout)
+
+# Pool gauges on /metrics
+track_engine(async_engine, "async")
+
+# 3b) Replica engine and session factory, when DB_REPLICA_URL is set; which
+#     requests may use it is decided by app.replicas
+replica_async_engine: Optional[AsyncEngine] = None
+ReplicaSessionLocal: Optional[async_sessionmaker[AsyncSession]] = None
+if DB_REPLICA_URL:
+    replica_async_engine = create_async_engine(
+        make_url(DB_REPLICA_URL).set(drivername="postgresql+asyncpg"),
+        **engine_options(async_driver=True, replica=True),
+    )
+    ReplicaSessionLocal = async_sessionmaker(
+        bind=replica_async_engine,
+        autoflush=False,
+        expire_on_commit=False,
+    )
+    if DB_PGBOUNCER and DB_STATEMENT_TIMEOUT_MS:
+        event.listen(replica_async_engine.sync_engine, "begin", _set_local_statement_timeout)
+    track_engine(replica_async_engine, "replica")
+
+
+def _create_sync_engine() -> tuple[Engine, sessionmaker]:
+    global engine, SessionLocal
+    engine = create_engine(DATABASE_URL, future=True, **engine_options(async_driver=False))
+    SessionLocal = sessionmaker(
+        bind=engine,
+        autocommit=False,
+        autoflush=False,
+        expire_on_commit=False,
+    )
+    if DB_PGBOUNCER and DB_STATEMENT_TIMEOUT_MS:
+        event.listen(engine, "begin", _set_local_statement_timeout)
+    track_engine(engine, "sync")
+    return engine, SessionLocal
+
+
+def __getattr__(name: str):
+    # 4) The blocking engine and SessionLocal are only used by the CLIs and
+    #    benchmarks, so they (and psycopg2) are created on first access
+    if name in ("engine", "SessionLocal"):
+        return dict(zip(("engine", "SessionLocal"), _create_sync_engine()))[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 def get_db() -> Session:
     """Yield a new Session per request and close it when done."""
-    db = SessionLocal()
+    session_factory = globals().get("SessionLocal") or _create_sync_engine()[1]
+    db = session_factory()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """Yield a new AsyncSession per request and close it when done."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_async_sessionmaker() -> async_sessionmaker[AsyncSession]:
+    """
+    Session factory for work that outlives the request's get_async_db session,
+    such as a StreamingResponse body (dependencies close before it is sent).
+    """
+    return AsyncSessionLocal
+
+
+async def get_replica_db() -> AsyncIterator[Optional[AsyncSession]]:
+    """Yield a new AsyncSession on the replica per request, or None without one."""
+    if ReplicaSessionLocal is None:
+        yield None
+        return
+    async with ReplicaSessionLocal() as db:
+        yield db
+
+
+def get_replica_sessionmaker() -> Optional[async_sessionmaker[AsyncSession]]:
+    """The replica's session factory, or None without a replica; see get_async_sessionmaker."""
+    return ReplicaSessionLocal
+
+
+async def warm_up_pool(target: AsyncEngine = async_engine, connections: int = DB_POOL_WARMUP) -> int:
+    """
+    Open pooled connections before the first request needs them.
+
+    Connections are opened concurrently and returned to the pool, so the first
+    requests skip the TCP/TLS/auth handshake. Capped at the pool size (extra
+    connections would just be closed again) and skipped without a pool, as
+    with PgBouncer. A failure is logged rather than raised: the app can still
+    serve once the database is reachable.
+
+    :return: The number of connections opened.
+    """
+    size = target.pool.size() if hasattr(target.pool, "checkedin") else 0
+    connections = min(connections, size)
+    if connections <= 0:
+        return 0
+
+    async def open_one():
+        conn = await target.connect()
+        try:
+            await conn.exec_driver_sql("SELECT 1")
+        except BaseException:
+            await conn.close()
+            raise
+        return conn
+
+    results = await asyncio.gather(*(open_one() for _ in range(connections)), return_exceptions=True)
+    opened = [conn for conn in results if not isinstance(conn, BaseException)]
+    for conn in opened:
+        await conn.close()
+    if len(opened) < connections:
+        error = next(result for result in results if isinstance(result, BaseException))
+        logger.warning("Pool warm-up opened %d of %d connections: %s", len(opened), connections, error)
+    return len(opened)
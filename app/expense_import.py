@@ -0,0 +1,147 @@
+import csv
+import io
+import math
+import time
+from datetime import date
+from typing import IO, Iterator
+
+from pydantic import BaseModel
+from sqlalchemy import DateTime, Enum, Float, Integer, Text, cast, column, insert, literal, select, table, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.models import Expense, ExpenseCategory
+from app.rollups import rollup_upsert
+
+IMPORT_CHUNK_ROWS = 5000
+MAX_REPORTED_ERRORS = 100
+REQUIRED_COLUMNS = {"date", "amount", "category"}
+STAGING_TABLE = "expense_import_staging"
+STAGING_COLUMNS = ["amount", "description", "category", "date"]
+staging = table(
+    STAGING_TABLE,
+    column("amount", Float),
+    column("description", Text),
+    column("category", Text),
+    column("date", DateTime(timezone=True)),
+)
+
+
+class ImportRowError(BaseModel):
+    line: int
+    detail: str
+
+
+class ImportResult(BaseModel):
+    imported: int
+    rejected: int
+    errors: list[ImportRowError]
+    seconds: float
+    rows_per_sec: float
+
+
+class ImportFormatError(ValueError):
+    """The upload is not a CSV this importer understands (as opposed to a bad row)."""
+
+
+def parse_row(row: dict) -> tuple:
+    """
+    Validate one CSV row into a staging record, raising ValueError with the reason.
+
+    The category is stored by enum name, which is how the expensecategory
+    Postgres enum spells its labels.
+    """
+    try:
+        category = ExpenseCategory((row.get("category") or "").strip())
+    except ValueError:
+        raise ValueError(f"Invalid category: {row.get('category')}")
+    try:
+        expense_date = date.fromisoformat((row.get("date") or "").strip())
+    except ValueError:
+        raise ValueError(f"Invalid date: {row.get('date')}")
+    try:
+        amount = float(row.get("amount") or "")
+    except ValueError:
+        raise ValueError(f"Invalid amount: {row.get('amount')}")
+    if not math.isfinite(amount):
+        raise ValueError(f"Invalid amount: {row.get('amount')}")
+    return amount, (row.get("description") or "").strip(), category.name, expense_date
+
+
+def _read_chunk(reader: Iterator[dict], size: int) -> tuple[list[tuple], list[ImportRowError], bool]:
+    """Parse up to ``size`` rows; returns (records, errors, exhausted)."""
+    records, errors = [], []
+    for _ in range(size):
+        try:
+            row = next(reader)
+        except StopIteration:
+            return records, errors, True
+        try:
+            records.append(parse_row(row))
+        except ValueError as exc:
+            errors.append(ImportRowError(line=reader.line_num, detail=str(exc)))
+    return records, errors, False
+
+
+async def import_expenses_csv(db: AsyncSession, user_id: int, upload: IO[bytes]) -> ImportResult:
+    """
+    Load a CSV of expenses for ``user_id`` through a COPY into a staging table.
+
+    The file is read and validated IMPORT_CHUNK_ROWS at a time (in a worker
+    thread, so parsing never blocks the event loop) and each chunk is sent with
+    a binary COPY into a temporary staging table. A single INSERT ... SELECT
+    then moves the staged rows into ``expenses`` and one upsert folds them
+    into the daily rollups. Only one chunk is ever held in memory, and the
+    whole import is one transaction the caller commits.
+
+    :raises ImportFormatError: when the header lacks a required column.
+    """
+    started = time.perf_counter()
+    stream = io.TextIOWrapper(upload, encoding="utf-8-sig", newline="")
+    # The wrapper closes ``upload`` when it is collected unless detached, so
+    # detach it whether or not the import gets through
+    try:
+        reader = csv.DictReader(stream)
+        fieldnames = await run_in_threadpool(lambda: reader.fieldnames)
+        missing = REQUIRED_COLUMNS - {name.strip().lower() for name in fieldnames or ()}
+        if missing:
+            raise ImportFormatError(f"CSV is missing column(s): {', '.join(sorted(missing))}")
+        reader.fieldnames = [name.strip().lower() for name in fieldnames]
+
+        await db.execute(text(
+            f"CREATE TEMPORARY TABLE {STAGING_TABLE} "
+            "(amount float8, description text, category text, date timestamptz) ON COMMIT DROP"
+        ))
+        raw = await (await db.connection()).get_raw_connection()
+        driver_connection = raw.driver_connection
+
+        staged, rejected, errors = 0, 0, []
+        exhausted = False
+        while not exhausted:
+            records, chunk_errors, exhausted = await run_in_threadpool(_read_chunk, reader, IMPORT_CHUNK_ROWS)
+            if records:
+                await driver_connection.copy_records_to_table(STAGING_TABLE, records=records, columns=STAGING_COLUMNS)
+                staged += len(records)
+            rejected += len(chunk_errors)
+            errors.extend(chunk_errors[:MAX_REPORTED_ERRORS - len(errors)])
+    finally:
+        stream.detach()
+
+    owner = literal(user_id, Integer).label("user_id")
+    category = cast(staging.c.category, Enum(ExpenseCategory)).label("category")
+    await db.execute(insert(Expense).from_select(
+        ["user_id", "amount", "description", "category", "date"],
+        select(owner, staging.c.amount, staging.c.description, category, staging.c.date),
+    ))
+    await db.execute(rollup_upsert(select(
+        owner, staging.c.date.label("ts"), category, staging.c.amount, literal(1, Integer).label("n"),
+    ).subquery("changes")))
+
+    seconds = time.perf_counter() - started
+    return ImportResult(
+        imported=staged,
+        rejected=rejected,
+        errors=errors,
+        seconds=round(seconds, 3),
+        rows_per_sec=round(staged / seconds, 1) if seconds else 0.0,
+    )
@@ -0,0 +1,199 @@
+"""
+Cross-worker cache invalidation over PostgreSQL LISTEN/NOTIFY.
+
+Writers publish ``(kind, user_id, version)`` events on CHANNEL inside their
+own transaction, so an event is delivered exactly when the change commits:
+
+- ``expenses``: the user's expense data moved to ``version`` (published by
+  the data_version bump every expense mutation runs, see app.versioning)
+- ``user``: the user row itself changed or was deleted (published from the
+  User ORM events, e.g. a password rehash at login)
+
+Every worker runs one InvalidationListener. It keeps a dedicated asyncpg
+connection LISTENing and hands each event to the handlers registered with
+subscribe(). While that connection is down, events are lost, so the
+listener flushes every subscribed cache once per CACHE_FLUSH_INTERVAL_SECONDS
+until it is back. It flushes once more after reconnecting.
+"""
+
+import asyncio
+import json
+import logging
+from typing import Awaitable, Callable, NamedTuple, Optional
+
+import asyncpg
+from sqlalchemy import Text, cast, event, func, literal, select
+
+from app.config import settings
+from app.metrics import cache_flushes, cache_invalidation_events, register_gauge
+from app.models import User
+
+# Read settings (see app.config)
+CACHE_FLUSH_INTERVAL_SECONDS = settings.cache_flush_interval_seconds
+
+CHANNEL = "cache_invalidation"
+
+logger = logging.getLogger("app.invalidation")
+
+
+class InvalidationEvent(NamedTuple):
+    kind: str
+    user_id: int
+    version: Optional[int] = None
+
+
+EventHandler = Callable[[InvalidationEvent], None]
+
+_handlers: dict[str, list[EventHandler]] = {}
+_flush_handlers: list[Callable[[], None]] = []
+
+
+def subscribe(kind: str, handler: EventHandler, flush: Optional[Callable[[], None]] = None) -> None:
+    """
+    Call ``handler`` for every ``kind`` event, and ``flush`` when all events may have been missed.
+
+    Handlers run on the event loop and must not block.
+    """
+    _handlers.setdefault(kind, []).append(handler)
+    if flush is not None:
+        _flush_handlers.append(flush)
+
+
+def dispatch(invalidation: InvalidationEvent) -> None:
+    cache_invalidation_events.inc(invalidation.kind)
+    for handler in _handlers.get(invalidation.kind, ()):
+        handler(invalidation)
+
+
+def flush_all() -> None:
+    cache_flushes.inc()
+    for flush in _flush_handlers:
+        flush()
+
+
+def notify_expression(kind: str, user_id, version=None):
+    """
+    ``pg_notify`` of one event, for the SELECT list or RETURNING clause of a write.
+
+    ``user_id`` and ``version`` may be columns (e.g. of the UPDATE this is
+    returned from) or plain values.
+    """
+    payload = func.json_build_object(
+        "kind", kind, "user_id", user_id, "version", version if version is not None else literal(None, Text)
+    )
+    return func.pg_notify(CHANNEL, cast(payload, Text))
+
+
+def publish_statement(kind: str, user_id: int, version: Optional[int] = None):
+    """A standalone SELECT publishing one event when its transaction commits."""
+    return select(notify_expression(kind, user_id, version))
+
+
+def parse_event(payload: str) -> InvalidationEvent:
+    data = json.loads(payload)
+    return InvalidationEvent(data["kind"], int(data["user_id"]), data.get("version"))
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _publish_user_change(mapper, connection, target) -> None:
+    connection.execute(publish_statement("user", target.id))
+
+
+async def connect_listener() -> asyncpg.Connection:
+    """
+    Open the LISTEN connection.
+
+    It goes to DB_LISTEN_HOST/DB_LISTEN_PORT, which default to the normal
+    database address. Point them at Postgres directly when the app connects
+    through PgBouncer in transaction mode, which cannot hold a LISTEN.
+    """
+    return await asyncpg.connect(
+        user=settings.postgres_user,
+        password=settings.postgres_password,
+        database=settings.postgres_db,
+        host=settings.db_listen_host,
+        port=int(settings.db_listen_port),
+    )
+
+
+class InvalidationListener:
+    """
+    Background task that LISTENs on CHANNEL and dispatches what arrives.
+
+    :param connect: Opens a new asyncpg connection; called again after every disconnect.
+    :param on_event: Receives each InvalidationEvent.
+    :param on_flush: Called whenever events may have been missed.
+    :param interval: Seconds between reconnect attempts (each preceded by a
+        flush), and between liveness pings of an idle connection.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Awaitable[asyncpg.Connection]] = connect_listener,
+        on_event: EventHandler = dispatch,
+        on_flush: Callable[[], None] = flush_all,
+        interval: float = CACHE_FLUSH_INTERVAL_SECONDS,
+    ):
+        self.connect = connect
+        self.on_event = on_event
+        self.on_flush = on_flush
+        self.interval = interval
+        self.connected = False
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self._listen()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning(json.dumps({"event": "listener_down", "error": repr(exc)}))
+            self.on_flush()
+            await asyncio.sleep(self.interval)
+
+    async def _listen(self) -> None:
+        connection = await self.connect()
+        lost = asyncio.Event()
+        connection.add_termination_listener(lambda _: lost.set())
+        try:
+            await connection.add_listener(CHANNEL, self._on_notify)
+            # Anything committed before LISTEN took effect was not seen
+            self.on_flush()
+            self.connected = True
+            while not lost.is_set():
+                try:
+                    await asyncio.wait_for(lost.wait(), self.interval)
+                except asyncio.TimeoutError:
+                    # A half-open TCP connection never reports termination
+                    await connection.fetchval("SELECT 1", timeout=self.interval)
+            raise ConnectionError("listener connection closed")
+        finally:
+            self.connected = False
+            connection.terminate()
+
+    def _on_notify(self, connection, pid: int, channel: str, payload: str) -> None:
+        try:
+            self.on_event(parse_event(payload))
+        except Exception:
+            logger.exception("invalidation handler failed for %r", payload)
+
+
+listener = InvalidationListener()
+register_gauge(
+    "cache_invalidation_listener_connected", "1 while this worker's LISTEN connection is up.",
+    lambda: int(listener.connected),
+)
@@ -0,0 +1,200 @@
+"""
+Per-router and global concurrency limits with bounded, deadline-aware queues.
+
+Every request to a limited router first takes a slot from that router's
+ConcurrencyLimiter, then one from the global limiter, and holds both until
+its response has been sent. A request that finds no free slot waits in a
+FIFO queue, and is answered ``503`` with Retry-After straight away when:
+
+- the queue is already full (``queue_full``)
+- the limiter's recent slot hold times say it would wait longer than its
+  budget (``deadline``)
+
+A request that queued but was not admitted within its budget gets the same
+503 (``timeout``). So a login storm fills the small auth limiter and is shed
+there, and the expense reads keep their own slots. /health and /metrics are
+never limited.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Optional
+
+from fastapi import status
+from fastapi.responses import JSONResponse
+
+from app.config import settings
+from app.metrics import load_shed_queue_wait, load_shed_rejections, track_limiter
+
+# Read settings (see app.config)
+LOAD_SHED_RETRY_AFTER = settings.load_shed_retry_after
+
+# Weight of the newest hold time in the moving average used for wait estimates
+_HOLD_TIME_WEIGHT = 0.2
+
+
+class Overloaded(Exception):
+    def __init__(self, limiter: str, reason: str):
+        super().__init__(f"{limiter}: {reason}")
+        self.limiter = limiter
+        self.reason = reason
+
+
+class ConcurrencyLimiter:
+    """
+    At most ``limit`` holders, at most ``queue_limit`` waiters, at most ``max_wait`` seconds queued.
+
+    Only used from the event loop, so plain counters need no lock. A
+    ``limit`` of 0 turns the limiter off.
+    """
+
+    def __init__(self, name: str, limit: int, queue_limit: int, max_wait: float):
+        self.name = name
+        self.limit = limit
+        self.queue_limit = queue_limit
+        self.max_wait = max_wait
+        self.in_flight = 0
+        # Moving average of how long a slot is held, in seconds
+        self.hold_time = 0.0
+        self._waiters: deque[asyncio.Future] = deque()
+        track_limiter(self)
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def expected_wait(self, position: int) -> float:
+        """Seconds until the waiter at queue ``position`` (1-based) should get a slot."""
+        return position / max(self.limit, 1) * self.hold_time
+
+    async def acquire(self, budget: Optional[float] = None) -> None:
+        """
+        Take a slot, waiting at most ``budget`` seconds (and never more than max_wait).
+
+        :raises Overloaded: When the request is shed instead.
+        """
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            return
+
+        budget = self.max_wait if budget is None else min(budget, self.max_wait)
+        if len(self._waiters) >= self.queue_limit:
+            raise self._reject("queue_full")
+        if self.expected_wait(len(self._waiters) + 1) > budget:
+            raise self._reject("deadline")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(waiter, budget)
+        except asyncio.TimeoutError:
+            self._forget(waiter)
+            raise self._reject("timeout")
+        except BaseException:
+            # Cancelled (e.g. the client went away); give back a slot handed over meanwhile
+            self._forget(waiter)
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        load_shed_queue_wait.observe(time.perf_counter() - start, self.name)
+
+    def release(self, held: Optional[float] = None) -> None:
+        """
+        Give a slot back, handing it straight to the oldest waiter if there is one.
+
+        :param held: Seconds the slot was held, for the wait estimates.
+        """
+        if held is not None:
+            self.hold_time += _HOLD_TIME_WEIGHT * (held - self.hold_time)
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def _forget(self, waiter: asyncio.Future) -> None:
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def _reject(self, reason: str) -> Overloaded:
+        load_shed_rejections.inc(self.name, reason)
+        return Overloaded(self.name, reason)
+
+
+global_limiter = ConcurrencyLimiter(
+    "global", settings.max_concurrency, settings.max_queue, settings.max_queue_wait_ms / 1000,
+)
+auth_limiter = ConcurrencyLimiter(
+    "auth", settings.auth_max_concurrency, settings.auth_max_queue, settings.auth_max_queue_wait_ms / 1000,
+)
+expenses_limiter = ConcurrencyLimiter(
+    "expenses", settings.expenses_max_concurrency, settings.expenses_max_queue,
+    settings.expenses_max_queue_wait_ms / 1000,
+)
+
+
+class LoadSheddingMiddleware:
+    """
+    Pure ASGI middleware applying the limiters to each HTTP request.
+
+    :param routes: Path prefix (a router's prefix) to that router's limiter.
+    :param global_limiter: Applied to every limited request after its router's.
+    :param exempt: Path prefixes that are never limited.
+    """
+
+    def __init__(
+        self,
+        app,
+        routes: dict[str, ConcurrencyLimiter],
+        global_limiter: Optional[ConcurrencyLimiter] = None,
+        exempt: tuple[str, ...] = ("/health", "/metrics"),
+    ):
+        self.app = app
+        self.routes = routes
+        self.global_limiter = global_limiter
+        self.exempt = exempt
+
+    def limiters_for(self, path: str) -> list[ConcurrencyLimiter]:
+        if path.startswith(self.exempt):
+            return []
+        limiters = [limiter for prefix, limiter in self.routes.items()
+                    if path == prefix or path.startswith(prefix + "/")][:1]
+        if self.global_limiter is not None:
+            limiters.append(self.global_limiter)
+        return [limiter for limiter in limiters if limiter.limit > 0]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limiters = self.limiters_for(scope["path"])
+        acquired = []
+        # The router's wait budget covers both queues
+        deadline = time.monotonic() + (limiters[0].max_wait if limiters else 0)
+        try:
+            for limiter in limiters:
+                try:
+                    await limiter.acquire(max(deadline - time.monotonic(), 0) if acquired else None)
+                except Overloaded:
+                    await self._shed(scope, receive, send)
+                    return
+                acquired.append((limiter, time.perf_counter()))
+            await self.app(scope, receive, send)
+        finally:
+            now = time.perf_counter()
+            for limiter, start in reversed(acquired):
+                limiter.release(now - start)
+
+    async def _shed(self, scope, receive, send):
+        response = JSONResponse(
+            {"detail": "Server busy, try again shortly"},
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={"Retry-After": str(LOAD_SHED_RETRY_AFTER)},
+        )
+        await response(scope, receive, send)
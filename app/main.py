@@ -1,12 +1,67 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from app.auth import warm_up_auth
+from app.config import settings
+from app.database import async_engine, replica_async_engine, warm_up_pool
+from app.invalidation import listener as invalidation_listener
+from app.load_shedding import LoadSheddingMiddleware, auth_limiter, expenses_limiter, global_limiter
+from app.metrics import CONTENT_TYPE, MetricsMiddleware, registry
+from app.partitions import maintain_partitions
 from app.routers import expenses, auth
+from app.sql_stats import SQLStatsMiddleware
+from app.stats import warm_up_stats
+from app.token_cache import token_cache
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # uvicorn only accepts connections once this returns, so everything the
+    # first requests would otherwise pay for happens here: DB_POOL_WARMUP
+    # connections, the bcrypt/JWT and numpy imports and the hashing threads
+    if settings.prewarm:
+        warm_ups = [warm_up_pool(), warm_up_auth(), warm_up_stats()]
+        if replica_async_engine is not None:
+            warm_ups.append(warm_up_pool(replica_async_engine))
+        await asyncio.gather(*warm_ups)
+    # Evict this worker's caches when other workers commit changes
+    if settings.cache_invalidation:
+        invalidation_listener.start()
+    # Keep this month's and the next few months' expense partitions in place
+    partition_maintenance = None
+    if settings.expense_partition_check_hours > 0:
+        partition_maintenance = asyncio.create_task(maintain_partitions(async_engine))
+    yield
+    if partition_maintenance is not None:
+        partition_maintenance.cancel()
+        await asyncio.gather(partition_maintenance, return_exceptions=True)
+    await invalidation_listener.stop()
+    await async_engine.dispose()
+    if replica_async_engine is not None:
+        await replica_async_engine.dispose()
+
 
 app = FastAPI(
     title="Expense Tracker API",
     description="Manage your personal expenses with JWT-secured endpoints.",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
+# Per-router and global concurrency limits; added first so it runs innermost
+# and the 503s it sheds still show up in the request metrics
+app.add_middleware(
+    LoadSheddingMiddleware,
+    routes={auth.router.prefix: auth_limiter, expenses.router.prefix: expenses_limiter},
+    global_limiter=global_limiter,
+)
+# Per-route request counts, latency histograms and in-flight requests
+app.add_middleware(MetricsMiddleware)
+# X-DB-Queries / X-DB-Time-Ms headers, N+1 and slow-query logging
+app.add_middleware(SQLStatsMiddleware)
+
 # Mount the auth router under /auth
 app.include_router(auth.router)
 
@@ -21,3 +76,21 @@ async def health_check():
     Returns 200 if the application is up.
     """
     return {"status": "ok"}
+
+
+@app.get("/health/token-cache", tags=["Health"])
+async def token_cache_stats():
+    """
+    Hit/miss counters of the verified-token cache used by get_current_user.
+    Every hit is a JWT decode and user lookup that did not happen.
+    """
+    return token_cache.stats()
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    Prometheus text exposition of request, DB pool and bcrypt metrics
+    for this process.
+    """
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,329 @@
+"""
+In-process metrics served in the Prometheus text format at ``/metrics``.
+
+A deliberately small implementation (counters, gauges, histograms with fixed
+buckets) so recording stays in the sub-microsecond range and the app needs
+no client library. Metrics are per process; with several uvicorn workers,
+scrape each one (or aggregate in Prometheus).
+
+MetricsMiddleware records every HTTP request under its route template, the
+pool classes time connection checkouts, and app.auth observes bcrypt time.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Iterable, Optional
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; request latency from 1ms to 10s
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Seconds; pool waits are usually zero, and anything above a second is an outage
+POOL_WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+# Seconds; one bcrypt call at the default 12 rounds is roughly 0.2s
+BCRYPT_BUCKETS = (0.01, 0.05, 0.1, 0.2, 0.3, 0.5, 1.0, 2.0, 5.0)
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        # Observed from the event loop and from the bcrypt threads
+        self._lock = threading.Lock()
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+    def render(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *label_values, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values) -> float:
+        return self._values.get(label_values, 0)
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        if not items and not self.label_names:
+            items = [((), 0)]
+        return self.header() + [
+            f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"
+            for labels, value in items
+        ]
+
+
+class Gauge(Counter):
+    """A value that goes up and down; ``callback`` computes it at scrape time instead."""
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = (),
+                 callback: Optional[Callable[[], dict[tuple, float]]] = None):
+        super().__init__(name, documentation, labels)
+        self.callback = callback
+
+    def dec(self, *label_values, amount: float = 1) -> None:
+        self.inc(*label_values, amount=-amount)
+
+    def render(self) -> list[str]:
+        if self.callback is not None:
+            with self._lock:
+                self._values = dict(self.callback())
+        return super().render()
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = (),
+                 buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last one is +Inf), sum, count]
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, *label_values) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *label_values) -> int:
+        series = self._series.get(label_values)
+        return series[2] if series else 0
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = sorted((labels, ([*series[0]], series[1], series[2])) for labels, series in self._series.items())
+        lines = self.header()
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, float("inf")), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(float(bound))}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, labels)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    "http_requests_total", "HTTP requests by route template and status code.", ("method", "route", "status"),
+))
+http_request_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency, including streamed bodies.", ("method", "route"),
+))
+http_in_progress = registry.register(Gauge(
+    "http_requests_in_progress", "HTTP requests currently being served.",
+))
+db_pool_checkouts = registry.register(Counter(
+    "db_pool_checkouts_total", "Connections handed out by the pool.", ("pool",),
+))
+db_pool_checkout_wait = registry.register(Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection.", ("pool",),
+    buckets=POOL_WAIT_BUCKETS,
+))
+db_pool_timeouts = registry.register(Counter(
+    "db_pool_checkout_timeouts_total", "Checkouts that gave up after pool_timeout.", ("pool",),
+))
+password_hash_duration = registry.register(Histogram(
+    "password_hash_seconds", "Time spent in bcrypt, per call, excluding queueing.", ("operation",),
+    buckets=BCRYPT_BUCKETS,
+))
+load_shed_rejections = registry.register(Counter(
+    "load_shed_rejections_total", "Requests answered 503 by a concurrency limiter.", ("limiter", "reason"),
+))
+load_shed_queue_wait = registry.register(Histogram(
+    "load_shed_queue_wait_seconds", "Time admitted requests spent queued for a concurrency slot.", ("limiter",),
+    buckets=POOL_WAIT_BUCKETS,
+))
+cache_invalidation_events = registry.register(Counter(
+    "cache_invalidation_events_total", "Invalidation events received over LISTEN/NOTIFY.", ("kind",),
+))
+cache_flushes = registry.register(Counter(
+    "cache_full_flushes_total", "Full flushes of the in-process caches because invalidation events may have been missed.",
+))
+db_reads = registry.register(Counter(
+    "db_reads_total", "Read requests by the database serving them.", ("target", "reason"),
+))
+
+# Engines whose pool size/overflow gauges are reported, by pool label
+_tracked_engines: dict[str, object] = {}
+
+
+def _pool_gauge(read: Callable) -> Callable[[], dict[tuple, float]]:
+    def collect():
+        values = {}
+        for name, engine in _tracked_engines.items():
+            pool = engine.pool
+            if hasattr(pool, "checkedout"):
+                values[(name,)] = read(pool)
+        return values
+    return collect
+
+
+registry.register(Gauge(
+    "db_pool_size", "Configured pool size.", ("pool",), callback=_pool_gauge(lambda pool: pool.size()),
+))
+registry.register(Gauge(
+    "db_pool_checked_out", "Connections currently checked out.", ("pool",),
+    callback=_pool_gauge(lambda pool: pool.checkedout()),
+))
+registry.register(Gauge(
+    "db_pool_checked_in", "Idle connections in the pool.", ("pool",),
+    callback=_pool_gauge(lambda pool: pool.checkedin()),
+))
+registry.register(Gauge(
+    "db_pool_overflow", "Connections opened beyond pool_size (negative while the pool fills up).", ("pool",),
+    callback=_pool_gauge(lambda pool: pool.overflow()),
+))
+
+
+# Concurrency limiters whose in-flight/queued gauges are reported, by name
+_tracked_limiters: dict[str, object] = {}
+
+registry.register(Gauge(
+    "load_shed_in_flight", "Requests holding a concurrency slot.", ("limiter",),
+    callback=lambda: {(name,): limiter.in_flight for name, limiter in _tracked_limiters.items()},
+))
+registry.register(Gauge(
+    "load_shed_queue_depth", "Requests waiting for a concurrency slot.", ("limiter",),
+    callback=lambda: {(name,): limiter.queued for name, limiter in _tracked_limiters.items()},
+))
+
+
+def track_limiter(limiter) -> None:
+    """Report a ConcurrencyLimiter's in-flight and queue-depth gauges under limiter=its name."""
+    _tracked_limiters[limiter.name] = limiter
+
+
+def track_engine(engine, name: str) -> None:
+    """Report ``engine``'s pool gauges under pool=``name``; accepts sync or async engines."""
+    _tracked_engines[name] = getattr(engine, "sync_engine", engine)
+
+
+def register_gauge(name: str, documentation: str, read: Callable[[], float]) -> None:
+    """Report a single value computed at scrape time."""
+    registry.register(Gauge(name, documentation, callback=lambda: {(): read()}))
+
+
+class _TimedCheckoutMixin:
+    """Times QueuePool._do_get, the only place a checkout can block."""
+    metrics_label = "default"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            db_pool_timeouts.inc(self.metrics_label)
+            raise
+        finally:
+            db_pool_checkout_wait.observe(time.perf_counter() - start, self.metrics_label)
+        db_pool_checkouts.inc(self.metrics_label)
+        return record
+
+
+class InstrumentedQueuePool(_TimedCheckoutMixin, QueuePool):
+    metrics_label = "sync"
+
+
+class InstrumentedAsyncQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    metrics_label = "async"
+
+
+class InstrumentedReplicaAsyncQueuePool(InstrumentedAsyncQueuePool):
+    metrics_label = "replica"
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording count, latency and status per route.
+
+    Requests are labelled with the matched route's path template (e.g.
+    ``/expenses/{expense_id}``), never the raw path, so the number of series
+    stays bounded; requests that match no route share route="unmatched".
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            http_in_progress.dec()
+            route = scope.get("route")
+            template = getattr(route, "path_format", None) or "unmatched"
+            http_requests.inc(scope["method"], template, status_code)
+            http_request_duration.observe(elapsed, scope["method"], template)
@@ -1,10 +1,14 @@
 from enum import Enum as PyEnum
-from sqlalchemy import Column, Integer, String, Float, Enum, DateTime, ForeignKey, Text, func
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Computed, Integer, String, Float, Enum, Date, DateTime, ForeignKey, Index, Text, func
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.ext.declarative import declarative_base
 
 Base = declarative_base()
 
+# Text search configuration of Expense.search_vector; queries must use the same
+TEXT_SEARCH_CONFIG = "english"
+
 
 # ---- 2. Expense Model ---- #
 class ExpenseCategory(str, PyEnum):
@@ -21,11 +25,13 @@ class ExpenseCategory(str, PyEnum):
 class User(Base):
     __tablename__ = "users"  # Table name in PostgreSQL
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     email = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
     name = Column(String, nullable=True)  # Optional field
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # Bumped by every expense mutation; read endpoints derive their ETags from it
+    data_version = Column(Integer, nullable=False, server_default="0")
 
     # Establish one-to-many relationship with Expense
     expenses = relationship("Expense", back_populates="owner")
@@ -33,17 +39,60 @@ class User(Base):
 
 # ---- 3. Expense Model ---- #
 class Expense(Base):
+    """
+    One expense. The table is partitioned by month on ``date`` (see app.partitions).
+
+    Postgres requires the partition key in the primary key, so the table's key
+    is (id, date); ids still come from one sequence, and the ORM identifies
+    rows by id alone.
+    """
     __tablename__ = "expenses"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
     amount = Column(Float, nullable=False)  # e.g., 20.50
     description = Column(Text, nullable=True)  # Optional
     category = Column(Enum(ExpenseCategory), nullable=False)  # Uses the Enum
-    date = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)  # When expense occurred
+    date = Column(DateTime(timezone=True), server_default=func.now(), primary_key=True)  # When expense occurred
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)  # When record was created
+    # Maintained by Postgres from description; only read by search, so not loaded with the row
+    search_vector = deferred(Column(
+        TSVECTOR, Computed(f"to_tsvector('{TEXT_SEARCH_CONFIG}', coalesce(description, ''))", persisted=True)
+    ))
 
     # ForeignKey to link to User
-    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
 
     # Establish many-to-one relationship with User
     owner = relationship("User", back_populates="expenses")
+
+    __table_args__ = (
+        # Serves list_expenses' user filter, date range and (date desc, id desc)
+        # keyset order without a sort, the FK lookups from users, and (through
+        # the included columns) index-only scans for per-day/category aggregates
+        Index(
+            "ix_expenses_user_id_date_id", "user_id", "date", "id",
+            postgresql_include=["category", "amount"],
+        ),
+        # Full-text search over descriptions; the planner ANDs it with the
+        # user index above for per-user searches
+        Index("ix_expenses_search_vector", "search_vector", postgresql_using="gin"),
+        {"postgresql_partition_by": "RANGE (date)"},
+    )
+    __mapper_args__ = {"primary_key": [id]}
+
+
+# ---- 4. Daily Rollup Model ---- #
+class ExpenseDailyRollup(Base):
+    """
+    Per user, day and category sum/count of expenses.
+
+    Kept in step with ``expenses`` by the routers (see app/rollups.py) so
+    summaries read O(days) rollup rows instead of O(expenses) raw rows.
+    """
+    __tablename__ = "expense_daily_rollups"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)  # Expense.date cast to DATE in the session time zone
+    category = Column(Enum(ExpenseCategory), primary_key=True)
+    total = Column(Float, nullable=False, server_default="0")
+    count = Column(Integer, nullable=False, server_default="0")
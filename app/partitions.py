@@ -0,0 +1,172 @@
+"""
+Monthly range partitions of ``expenses``.
+
+``expenses`` is partitioned by RANGE on ``date``: one partition per calendar
+month (UTC), named ``expenses_YYYY_MM``, plus ``expenses_default`` for rows
+of any month that has no partition yet. Queries with a date range only touch
+the partitions that range overlaps.
+
+Partitions are created by the ``ensure_expense_partitions(first, last)``
+database function, defined below and by the partitioning migration. It
+creates any missing month from ``first`` to ``last``, first moving that
+month's rows out of the default partition, and is safe to call concurrently.
+Every worker calls it at startup and then every EXPENSE_PARTITION_CHECK_HOURS
+for the current month and the next EXPENSE_PARTITION_MONTHS_AHEAD, so new
+rows normally land in a real partition. It can also be run from cron::
+
+    python -m app.partitions ensure [--months-ahead N]
+    python -m app.partitions list
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import re
+import sys
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import DDL, Connection, event, func, select, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import settings
+from app.models import Expense
+
+# Read settings (see app.config)
+EXPENSE_PARTITION_MONTHS_AHEAD = settings.expense_partition_months_ahead
+EXPENSE_PARTITION_CHECK_HOURS = settings.expense_partition_check_hours
+
+DEFAULT_PARTITION = "expenses_default"
+_PARTITION_NAME = re.compile(r"expenses_(\d{4}_\d{2}|default)")
+
+# Same definition as in the partitioning migration
+ENSURE_PARTITIONS_FUNCTION = """
+CREATE OR REPLACE FUNCTION ensure_expense_partitions(first_month date, last_month date)
+RETURNS integer
+LANGUAGE plpgsql AS $$
+DECLARE
+    month date := date_trunc('month', first_month);
+    lower_bound timestamptz;
+    upper_bound timestamptz;
+    partition_name text;
+    created integer := 0;
+BEGIN
+    -- Every worker runs this at startup; let one at a time through
+    PERFORM pg_advisory_xact_lock(hashtext('ensure_expense_partitions'));
+    WHILE month <= last_month LOOP
+        partition_name := 'expenses_' || to_char(month, 'YYYY_MM');
+        IF to_regclass(partition_name) IS NULL THEN
+            lower_bound := month::timestamp AT TIME ZONE 'UTC';
+            upper_bound := (month + interval '1 month')::timestamp AT TIME ZONE 'UTC';
+            -- Build the partition detached, moving in the month's rows from the
+            -- default partition, so attaching it only takes a brief lock
+            EXECUTE format(
+                'CREATE TABLE %I (LIKE expenses INCLUDING DEFAULTS INCLUDING GENERATED)', partition_name
+            );
+            EXECUTE format(
+                'WITH moved AS ('
+                '  DELETE FROM expenses_default WHERE date >= $1 AND date < $2'
+                '  RETURNING id, amount, description, category, date, created_at, user_id'
+                ') INSERT INTO %I (id, amount, description, category, date, created_at, user_id) '
+                'SELECT * FROM moved', partition_name
+            ) USING lower_bound, upper_bound;
+            EXECUTE format(
+                'ALTER TABLE expenses ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                partition_name, lower_bound, upper_bound
+            );
+            created := created + 1;
+        END IF;
+        month := month + interval '1 month';
+    END LOOP;
+    RETURN created;
+END
+$$
+"""
+
+logger = logging.getLogger("app.partitions")
+
+# Tables made with metadata.create_all (the tests) get the same setup as the migration
+event.listen(Expense.__table__, "after_create", DDL(
+    f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF expenses DEFAULT"
+))
+event.listen(Expense.__table__, "after_create", DDL(ENSURE_PARTITIONS_FUNCTION.replace("%", "%%")))
+event.listen(Expense.__table__, "after_drop", DDL("DROP FUNCTION IF EXISTS ensure_expense_partitions"))
+
+
+def is_expense_partition(name: str) -> bool:
+    return bool(_PARTITION_NAME.fullmatch(name))
+
+
+def add_months(day: date, months: int) -> date:
+    """The first of the month ``months`` after ``day``'s month."""
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def ensure_partitions_statement(first: date, last: date):
+    """SELECT creating the missing monthly partitions from ``first``'s month to ``last``'s; returns how many."""
+    return select(func.ensure_expense_partitions(first, last))
+
+
+def upcoming_months(months_ahead: int = EXPENSE_PARTITION_MONTHS_AHEAD, today: Optional[date] = None) -> tuple[date, date]:
+    today = today or date.today()
+    return add_months(today, 0), add_months(today, months_ahead)
+
+
+async def ensure_upcoming_partitions(target: AsyncEngine, months_ahead: int = EXPENSE_PARTITION_MONTHS_AHEAD) -> int:
+    """
+    Create the partitions of this month and the next ``months_ahead``, if missing.
+
+    :return: The number of partitions created.
+    """
+    async with target.begin() as connection:
+        created = await connection.scalar(ensure_partitions_statement(*upcoming_months(months_ahead)))
+    if created:
+        logger.info(json.dumps({"event": "partitions_created", "table": "expenses", "count": created}))
+    return created
+
+
+async def maintain_partitions(target: AsyncEngine, interval: float = EXPENSE_PARTITION_CHECK_HOURS * 3600) -> None:
+    """Run ensure_upcoming_partitions now and every ``interval`` seconds; failures are logged and retried."""
+    while True:
+        try:
+            await ensure_upcoming_partitions(target)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("creating expense partitions failed")
+        await asyncio.sleep(interval)
+
+
+def list_partitions(connection: Connection) -> list[tuple[str, Optional[str], int]]:
+    """(name, bounds, estimated rows) of every partition of ``expenses``, in bound order."""
+    return connection.execute(text(
+        "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint "
+        "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'expenses'::regclass ORDER BY c.relname"
+    )).all()
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    from app.database import engine
+
+    parser = argparse.ArgumentParser(prog="python -m app.partitions", description="Maintain the expenses partitions.")
+    parser.add_argument("command", choices=["ensure", "list"])
+    parser.add_argument("--months-ahead", type=int, default=EXPENSE_PARTITION_MONTHS_AHEAD)
+    args = parser.parse_args(argv)
+
+    engine.echo = False
+    with engine.begin() as connection:
+        if args.command == "ensure":
+            created = connection.scalar(ensure_partitions_statement(*upcoming_months(args.months_ahead)))
+            print(f"created {created} partitions")
+            return 0
+
+        for name, bounds, rows in list_partitions(connection):
+            print(f"{name}: {bounds} (~{max(rows, 0)} rows)")
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""
+Read/write routing between the primary and an optional read replica.
+
+With DB_REPLICA_URL set, the read-only expense endpoints take their session
+from get_read_db, which hands out a replica session, and everything else
+keeps using the primary. A replica lags the primary, so a user who just
+wrote would not see the write there. To keep reads-your-writes, each worker
+remembers when every user last wrote and pins them to the primary for
+DB_REPLICA_PIN_SECONDS afterwards:
+
+- a write through get_write_db pins its user right away
+- every committed expense mutation, from any worker, pins its user when the
+  ``expenses`` invalidation event arrives (see app.invalidation)
+- if events may have been missed, every user is pinned for the window
+
+The window has to exceed the replica's replay lag (``now() -
+pg_last_xact_replay_timestamp()`` on the replica) for the guarantee to hold.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Annotated, AsyncIterator, Optional
+
+from fastapi import Depends, Request
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.auth import get_current_user
+from app.config import settings
+from app.database import get_async_db, get_async_sessionmaker, get_replica_db, get_replica_sessionmaker
+from app.invalidation import InvalidationEvent, subscribe
+from app.metrics import db_reads
+from app.token_cache import Principal
+
+# Read settings (see app.config)
+DB_REPLICA_PIN_SECONDS = settings.db_replica_pin_seconds
+
+# Methods that never write, so may be served from the replica
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+class WriteTracker:
+    """
+    When each user last wrote, as far as this worker has heard, for ``window`` seconds.
+
+    Entries are kept in write order and dropped once older than the window.
+    """
+
+    def __init__(self, window: float = DB_REPLICA_PIN_SECONDS):
+        self.window = window
+        self._writes: OrderedDict[int, float] = OrderedDict()
+        self._all_until = 0.0
+
+    def record(self, user_id: int) -> None:
+        now = time.monotonic()
+        self._writes[user_id] = now
+        self._writes.move_to_end(user_id)
+        while self._writes:
+            oldest, at = next(iter(self._writes.items()))
+            if now - at < self.window:
+                break
+            del self._writes[oldest]
+
+    def pin_all(self) -> None:
+        """Pin every user, for when writes may have gone unheard."""
+        self._all_until = time.monotonic() + self.window
+
+    def pinned(self, user_id: int) -> bool:
+        now = time.monotonic()
+        if now < self._all_until:
+            return True
+        at = self._writes.get(user_id)
+        return at is not None and now - at < self.window
+
+    def clear(self) -> None:
+        self._writes.clear()
+        self._all_until = 0.0
+
+
+write_tracker = WriteTracker()
+
+
+def _on_expenses_event(invalidation: InvalidationEvent) -> None:
+    write_tracker.record(invalidation.user_id)
+
+
+subscribe("expenses", _on_expenses_event, flush=write_tracker.pin_all)
+
+
+def use_replica(request: Request, user_id: int, has_replica: bool) -> bool:
+    """Whether this request may read from the replica; counts the decision in db_reads_total."""
+    if not has_replica:
+        db_reads.inc("primary", "no_replica")
+        return False
+    if request.method not in SAFE_METHODS:
+        db_reads.inc("primary", "unsafe_method")
+        return False
+    if write_tracker.pinned(user_id):
+        db_reads.inc("primary", "pinned")
+        return False
+    db_reads.inc("replica", "default")
+    return True
+
+
+async def get_read_db(
+    request: Request,
+    current_user: Annotated[Principal, Depends(get_current_user)],
+    primary: Annotated[AsyncSession, Depends(get_async_db)],
+    replica: Annotated[Optional[AsyncSession], Depends(get_replica_db)],
+) -> AsyncIterator[AsyncSession]:
+    """
+    The session for a read-only endpoint: the replica's unless the user is pinned to the primary.
+
+    Sessions only connect on first use, so the one not handed out costs nothing.
+    """
+    yield replica if use_replica(request, current_user.id, replica is not None) else primary
+
+
+def get_read_sessionmaker(
+    request: Request,
+    current_user: Annotated[Principal, Depends(get_current_user)],
+    primary: Annotated[async_sessionmaker[AsyncSession], Depends(get_async_sessionmaker)],
+    replica: Annotated[Optional[async_sessionmaker[AsyncSession]], Depends(get_replica_sessionmaker)],
+) -> async_sessionmaker[AsyncSession]:
+    """get_read_db for work that outlives the request, such as a streamed export."""
+    return replica if use_replica(request, current_user.id, replica is not None) else primary
+
+
+async def get_write_db(
+    current_user: Annotated[Principal, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_async_db)],
+) -> AsyncIterator[AsyncSession]:
+    """The primary's session for an endpoint that writes; pins the user from start to finish."""
+    write_tracker.record(current_user.id)
+    try:
+        yield db
+    finally:
+        write_tracker.record(current_user.id)
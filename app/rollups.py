@@ -0,0 +1,200 @@
+"""
+Incremental maintenance of ``expense_daily_rollups``.
+
+Every expense mutation turns into signed changes ``(user_id, ts, category,
+amount, n)``: +amount/+1 for an expense that appears, -amount/-1 for one that
+goes away, both for an update. rollup_upsert folds any source of such rows
+into the rollups with one INSERT ... SELECT ... ON CONFLICT DO UPDATE in the
+caller's transaction, deleting the rows whose last expense went away so a
+rollup row exists exactly for the (user, day, category) keys with expenses.
+
+The rollups can be rebuilt from and checked against the raw rows::
+
+    python -m app.rollups rebuild [--user-id N]
+    python -m app.rollups check [--user-id N]
+"""
+
+import argparse
+import sys
+from typing import Optional
+
+from sqlalchemy import Connection, Date, DateTime, Enum, Float, Integer, and_, cast, column, delete, func, literal, or_, select, text, values
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Expense, ExpenseCategory, ExpenseDailyRollup
+
+# Totals are float sums built up incrementally, so allow for rounding drift
+TOTAL_TOLERANCE = 1e-6
+
+
+def expense_change(user_id: int, ts, category: ExpenseCategory, amount: float, n: int = 1) -> tuple:
+    """One signed change; pass ``n=-1`` and ``-amount`` for an expense being removed."""
+    return user_id, ts, category, amount, n
+
+
+def rollup_upsert(source):
+    """
+    Fold a source of (user_id, ts, category, amount, n) rows into the rollups.
+
+    ``ts`` is cast to DATE in SQL, the same way rebuild_rollups buckets raw
+    expenses, so incremental and rebuilt rollups always agree on the day.
+
+    Rows whose count the changes bring to zero are deleted by a DELETE CTE
+    instead, float leftovers of their total included. The upsert skips the
+    keys it deleted; a statement cannot delete a row its own upsert updated.
+    A row another transaction changed meanwhile is rechecked by the DELETE
+    and, if it no longer empties, falls through to the upsert.
+    """
+    day = cast(source.c.ts, Date)
+    deltas = select(
+        source.c.user_id.label("user_id"), day.label("day"), source.c.category.label("category"),
+        func.sum(source.c.amount).label("total"), func.sum(source.c.n).label("count"),
+    ).group_by(source.c.user_id, day, source.c.category).cte("rollup_deltas")
+    emptied = (
+        delete(ExpenseDailyRollup)
+        .where(
+            ExpenseDailyRollup.user_id == deltas.c.user_id,
+            ExpenseDailyRollup.day == deltas.c.day,
+            ExpenseDailyRollup.category == deltas.c.category,
+            ExpenseDailyRollup.count + deltas.c.count == 0,
+        )
+        .returning(ExpenseDailyRollup.user_id, ExpenseDailyRollup.day, ExpenseDailyRollup.category)
+        .cte("rollup_emptied")
+    )
+    remaining = select(deltas).where(~select(emptied.c.user_id).where(
+        emptied.c.user_id == deltas.c.user_id, emptied.c.day == deltas.c.day, emptied.c.category == deltas.c.category,
+    ).exists())
+    stmt = pg_insert(ExpenseDailyRollup).from_select(
+        ["user_id", "day", "category", "total", "count"], remaining
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=["user_id", "day", "category"],
+        set_={
+            "total": ExpenseDailyRollup.total + stmt.excluded.total,
+            "count": ExpenseDailyRollup.count + stmt.excluded.count,
+        },
+    )
+
+
+async def apply_rollup_changes(db: AsyncSession, changes: list[tuple]) -> None:
+    """
+    Apply expense_change tuples to the rollups in the current transaction.
+
+    :param db: The session the expense mutation itself runs in.
+    :param changes: Tuples built with expense_change.
+    """
+    if not changes:
+        return
+    source = values(
+        column("user_id", Integer),
+        column("ts", DateTime(timezone=True)),
+        column("category", Enum(ExpenseCategory)),
+        column("amount", Float),
+        column("n", Integer),
+        name="changes",
+    ).data(changes)
+    await db.execute(rollup_upsert(source))
+
+
+def _raw_daily_totals(user_id: Optional[int] = None):
+    day = cast(Expense.date, Date)
+    query = select(
+        Expense.user_id.label("user_id"),
+        day.label("day"),
+        Expense.category.label("category"),
+        func.sum(Expense.amount).label("total"),
+        func.count().label("count"),
+    ).group_by(Expense.user_id, day, Expense.category)
+    if user_id is not None:
+        query = query.where(Expense.user_id == user_id)
+    return query
+
+
+def rebuild_rollups(connection: Connection, user_id: Optional[int] = None) -> int:
+    """
+    Recompute the rollups from ``expenses`` (for one user or everyone).
+
+    Takes a SHARE lock on ``expenses`` so no mutation can slip in between the
+    delete and the re-aggregation; the caller commits.
+
+    :return: The number of rollup rows written.
+    """
+    connection.execute(text("LOCK TABLE expenses IN SHARE MODE"))
+    clear = delete(ExpenseDailyRollup)
+    if user_id is not None:
+        clear = clear.where(ExpenseDailyRollup.user_id == user_id)
+    connection.execute(clear)
+    result = connection.execute(
+        pg_insert(ExpenseDailyRollup).from_select(
+            ["user_id", "day", "category", "total", "count"], _raw_daily_totals(user_id)
+        )
+    )
+    return result.rowcount
+
+
+def find_rollup_mismatches(connection: Connection, user_id: Optional[int] = None) -> list:
+    """
+    Compare the rollups with aggregates of the raw rows.
+
+    A rollup row without expenses behind it is a mismatch even when its count
+    and total are zero, since rollup_upsert deletes those. Totals are compared
+    with TOTAL_TOLERANCE, so float noise from incremental sums is not one.
+
+    :return: (user_id, day, category, raw_total, raw_count, rollup_total,
+        rollup_count) for every key where they disagree; empty when consistent.
+    """
+    raw = _raw_daily_totals(user_id).subquery("raw")
+    rollups = select(ExpenseDailyRollup)
+    if user_id is not None:
+        rollups = rollups.where(ExpenseDailyRollup.user_id == user_id)
+    rollups = rollups.subquery("rollups")
+    joined = raw.join(
+        rollups,
+        and_(raw.c.user_id == rollups.c.user_id, raw.c.day == rollups.c.day, raw.c.category == rollups.c.category),
+        full=True,
+    )
+    raw_total = func.coalesce(raw.c.total, 0.0)
+    rollup_total = func.coalesce(rollups.c.total, 0.0)
+    query = select(
+        func.coalesce(raw.c.user_id, rollups.c.user_id),
+        func.coalesce(raw.c.day, rollups.c.day),
+        func.coalesce(raw.c.category, rollups.c.category),
+        raw_total,
+        func.coalesce(raw.c.count, 0),
+        rollup_total,
+        func.coalesce(rollups.c.count, 0),
+    ).select_from(joined).where(or_(
+        raw.c.count.is_distinct_from(rollups.c.count),
+        func.abs(raw_total - rollup_total) > literal(TOTAL_TOLERANCE) * func.greatest(1.0, func.abs(raw_total)),
+    ))
+    return connection.execute(query).all()
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    from app.database import engine
+
+    parser = argparse.ArgumentParser(prog="python -m app.rollups", description="Maintain expense_daily_rollups.")
+    parser.add_argument("command", choices=["rebuild", "check"])
+    parser.add_argument("--user-id", type=int, default=None, help="limit to one user")
+    args = parser.parse_args(argv)
+
+    engine.echo = False
+    with engine.begin() as connection:
+        if args.command == "rebuild":
+            written = rebuild_rollups(connection, args.user_id)
+            print(f"rebuilt {written} rollup rows")
+            return 0
+
+        mismatches = find_rollup_mismatches(connection, args.user_id)
+        for user_id, day, category, raw_total, raw_count, rollup_total, rollup_count in mismatches:
+            print(
+                f"user={user_id} day={day} category={category.value}: "
+                f"raw {raw_total}/{raw_count} != rollup {rollup_total}/{rollup_count}"
+            )
+        print(f"{len(mismatches)} mismatched rollup rows")
+        return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,15 +5,16 @@ from typing import Annotated, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models import User
-from app.database import get_db
-from app.auth import get_password_hash, verify_password, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
+from app.database import get_async_db
+from app.auth import hash_password_in_pool, verify_password_in_pool, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
-db_dependency = Annotated[Session, Depends(get_db)]
+db_dependency = Annotated[AsyncSession, Depends(get_async_db)]
 
 
 # Define request/response schemas (to be expanded later)
@@ -36,34 +37,46 @@ class LoginResponse(BaseModel):
     expires_at: datetime
 
 
+def user_by_email_query(email: str):
+    """Lookup used by login; served by the unique ix_users_email."""
+    return select(User).where(User.email == email)
+
+
+def signup_query(email: str, hashed_password: str, name: Optional[str]):
+    """INSERT ... ON CONFLICT (email) DO NOTHING RETURNING the new user, in one round trip."""
+    return (
+        pg_insert(User)
+        .values(email=email, hashed_password=hashed_password, name=name)
+        .on_conflict_do_nothing(index_elements=["email"])
+        .returning(User.id, User.email, User.name, User.created_at)
+    )
+
+
 @router.post(
     "/signup",
     response_model=SignupResponse,
     status_code=status.HTTP_201_CREATED
 )
 async def signup(req: SignupRequest, db: db_dependency):
-    # Check for existing user
-    existing = db.query(User).filter(User.email == req.email).first()
-    if existing:
+    # A taken email is turned away before hashing, so duplicate signups
+    # cannot fill the bounded hash pool that logins wait on
+    if await db.scalar(select(user_by_email_query(req.email).exists())):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
-
-    # Hash password and create user
-    hashed_pw = get_password_hash(req.password)
-    user = User(email=req.email, hashed_password=hashed_pw, name=req.name)
-    db.add(user)
-    try:
-        db.commit()
-    except IntegrityError:
-        db.rollback()
+    # Hash the password, then insert unless the email is taken; a concurrent
+    # duplicate that got past the check comes back as no row
+    hashed_pw = await hash_password_in_pool(req.password)
+    user = (await db.execute(
+        signup_query(req.email, hashed_pw, req.name)
+    )).one_or_none()
+    if user is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
-
-    db.refresh(user)
+    await db.commit()
 
     return SignupResponse(
         id=user.id,
@@ -76,7 +89,7 @@ async def signup(req: SignupRequest, db: db_dependency):
 @router.post("/login", response_model=LoginResponse)
 async def login(form_data: Annotated[OAuth2PasswordRequestForm, Depends()], db: db_dependency):
     # Fetch user by email
-    user = db.query(User).filter(User.email == form_data.username).first()
+    user = await db.scalar(user_by_email_query(form_data.username))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -85,13 +98,19 @@ async def login(form_data: Annotated[OAuth2PasswordRequestForm, Depends()], db:
         )
 
     # Verify password
-    if not verify_password(form_data.password, user.hashed_password):
+    valid, new_hash = await verify_password_in_pool(form_data.password, user.hashed_password)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials",
             headers={"WWW-Authenticate": "Bearer"}
         )
 
+    # Rehash transparently if BCRYPT_ROUNDS changed since this hash was made
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+
     expires_delta = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": user.email, "user_id": user.id},
@@ -1,21 +1,54 @@
 # app/routers/expenses.py
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from pydantic import BaseModel
-from typing import Annotated, List, Literal, Optional
-from sqlalchemy.orm import Session
-from datetime import date, timedelta
+import base64
+import binascii
+import csv
+import io
+import json
+import re
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response, UploadFile, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+from typing import Annotated, Any, List, Literal, Optional
+from sqlalchemy import Date, LargeBinary, case, cast, delete, func, insert, literal_column, select, tuple_, union_all, update
+from sqlalchemy.dialects.postgresql import to_tsquery
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from starlette.concurrency import run_in_threadpool
+from datetime import date, datetime, timedelta
 
 from app.auth import get_current_user
-from app.database import get_db
-from app.models import Expense, ExpenseCategory, User
+from app.cursors import stream_with_cursor
+from app.token_cache import Principal
+from app.expense_import import ImportFormatError, ImportResult, import_expenses_csv
+from app.models import TEXT_SEARCH_CONFIG, Expense, ExpenseCategory, ExpenseDailyRollup, User
+from app.replicas import get_read_db, get_read_sessionmaker, get_write_db
+from app.rollups import apply_rollup_changes, expense_change, rollup_upsert
+from app.serialization import json_bytes, json_response
+from app.stats import STATS_CATEGORIES, ExpenseStats, stats_from_row
+from app.versioning import bump_data_version, conditional_read, data_version_bump
 # from app.auth import get_current_user  # will inject the logged-in user
 # from app.database import SessionLocal
 
 router = APIRouter(prefix="/expenses", tags=["Expenses"])
-db_dependency = Annotated[Session, Depends(get_db)]
-user_dependency = Annotated[User, Depends(get_current_user)]
+# Writes use the primary; the read-only endpoints may be served by the
+# replica, unless the user wrote recently (see app.replicas)
+db_dependency = Annotated[AsyncSession, Depends(get_write_db)]
+read_db_dependency = Annotated[AsyncSession, Depends(get_read_db)]
+user_dependency = Annotated[Principal, Depends(get_current_user)]
 Period = Literal["past_week", "past_month", "past_3_months"]
+ExportFormat = Literal["ndjson", "csv"]
+Granularity = Literal["day", "week", "month"]
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+MAX_BATCH_SIZE = 1000
+MAX_SEARCH_LENGTH = 200
+DEFAULT_STATS_DAYS = 90
+MAX_STATS_DAYS = 3660
+# Only the newest matches are ranked, which bounds the work of a broad query;
+# search pages cannot reach past them
+SEARCH_CANDIDATES = 1000
+# Words of a search query; "_" is left out because the tsquery parser splits on it
+_SEARCH_TERM = re.compile(r"[^\W_]+")
 
 
 class ExpenseIn(BaseModel):
@@ -32,21 +65,56 @@ class ExpenseOut(ExpenseIn):
     date: date
     description: Optional[str] = None
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
-@router.get(
-    "/",
-    response_model=List[ExpenseOut]
-)
-async def list_expenses(
-    db: db_dependency,
-    current_user: user_dependency,
-    period: Optional[Period] = None,
-    start_date: Optional[date] = None,
-    end_date: Optional[date] = None,
-):
+def parse_expense_date(value: str) -> date:
+    """Parse the YYYY-MM-DD date of an incoming expense or raise a 400."""
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid date: {value}"
+        )
+
+
+def parse_category(value: str) -> ExpenseCategory:
+    """Parse an expense category or raise a 400."""
+    try:
+        return ExpenseCategory(value)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid category: {value}"
+        )
+
+
+def encode_cursor(expense_date: datetime, expense_id: int) -> str:
+    """Opaque keyset cursor pointing just past (date, id) in (date desc, id desc) order."""
+    raw = json.dumps([expense_date.isoformat(), expense_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Inverse of encode_cursor; raises a 400 for anything it did not produce."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        expense_date, expense_id = json.loads(raw)
+        return datetime.fromisoformat(expense_date), int(expense_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def resolve_date_range(
+    period: Optional[Period],
+    start_date: Optional[date],
+    end_date: Optional[date],
+) -> tuple[Optional[date], Optional[date]]:
+    """Turn the period/start_date/end_date query parameters into a (start, end) pair."""
     today = date.today()
     if period:
         if period == "past_week":
@@ -63,15 +131,432 @@ async def list_expenses(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="start_date cannot be after end_date"
             )
+    return start_date, end_date
+
+
+def filter_by_date_range(query, start_date: Optional[date], end_date: Optional[date]):
+    """Restrict a select on Expense to the resolved date range."""
+    if start_date:
+        query = query.where(Expense.date >= start_date)
+    if end_date:
+        query = query.where(Expense.date <= end_date)
+    return query
+
+
+def serialize_expense_rows(rows) -> bytes:
+    """
+    JSON array of ExpenseOut objects from (id, amount, category, date, description) rows.
+
+    Keys are in ExpenseOut field order and dates are the day of the stored
+    midnight timestamp, as ExpenseOut's validation would give.
+    """
+    return json_bytes(
+        [
+            {
+                "amount": row.amount,
+                "category": row.category.value,
+                "date": row.date.date(),
+                "description": row.description,
+                "id": row.id,
+            }
+            for row in rows
+        ],
+        floats=[row.amount for row in rows],
+    )
+
+
+def list_expenses_query(
+    user_id: int,
+    start_date: Optional[date],
+    end_date: Optional[date],
+    after: Optional[tuple[datetime, int]],
+    limit: int,
+):
+    """The page query of list_expenses; ``after`` is a decoded cursor."""
+    query = filter_by_date_range(
+        select(Expense.id, Expense.amount, Expense.category, Expense.date, Expense.description)
+        .where(Expense.user_id == user_id),
+        start_date,
+        end_date,
+    )
+    if after:
+        # The row comparison alone does not prune partitions; the plain bound
+        # on date lets later pages skip every month newer than the cursor
+        query = query.where(tuple_(Expense.date, Expense.id) < after, Expense.date <= after[0])
+    return query.order_by(Expense.date.desc(), Expense.id.desc()).limit(limit)
+
+
+@router.get(
+    "/",
+    response_model=List[ExpenseOut]
+)
+async def list_expenses(
+    db: read_db_dependency,
+    current_user: user_dependency,
+    request: Request,
+    response: Response,
+    period: Optional[Period] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+):
+    """
+    One page of the user's expenses, newest first.
+
+    Pages are keyset-based on (date, id), so every page is an index range scan
+    on ix_expenses_user_id_date_id no matter how deep the client goes. When
+    more rows remain, the X-Next-Cursor header holds the cursor for the next page.
+
+    Responses carry an ETag; If-None-Match with a current one gets a 304.
+
+    Rows are fetched as column tuples and encoded straight to JSON bytes
+    (see app.serialization); the body is byte-for-byte what validating them
+    through ExpenseOut would produce.
+    """
+    start_date, end_date = resolve_date_range(period, start_date, end_date)
+    not_modified = await conditional_read(request, response, db, current_user.id)
+    if not_modified:
+        return not_modified
+    after = decode_cursor(cursor) if cursor else None
+
+    # Fetch one extra row to learn whether another page exists
+    query = list_expenses_query(current_user.id, start_date, end_date, after, limit + 1)
+    rows = (await db.execute(query)).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1].date, rows[-1].id)
+    return json_response(serialize_expense_rows(rows), response)
+
+
+class ExpenseSearchHit(ExpenseOut):
+    rank: float
+
+
+def prefix_tsquery(q: str) -> Optional[str]:
+    """
+    Turn free text into a tsquery matching every word, the last one as a prefix.
 
-    query = db.query(Expense).filter(Expense.user_id == current_user.id)
+    ``"coffee sh"`` becomes ``"coffee & sh:*"``, which suits search-as-you-type
+    and keeps the GIN scan cheap: a prefix term has to collect every lexeme it
+    covers, so only the word still being typed is one. Only letters and digits
+    survive, so user input can never inject tsquery operators. None when
+    nothing searchable is left.
+    """
+    terms = _SEARCH_TERM.findall(q)
+    if not terms:
+        return None
+    return " & ".join([*terms[:-1], f"{terms[-1]}:*"])
+
+
+def search_expenses_query(
+    user_id: int,
+    terms: str,
+    start_date: Optional[date],
+    end_date: Optional[date],
+    category: Optional[ExpenseCategory],
+    limit: int,
+    offset: int,
+):
+    """
+    Ranked matches of a prefix_tsquery among the user's expenses.
+
+    The @@ match is served by the GIN index on search_vector, ANDed with the
+    user's rows. Only the newest SEARCH_CANDIDATES matches are ranked, so
+    ``offset + limit`` must not exceed SEARCH_CANDIDATES; older matches are
+    never returned.
+    """
+    tsquery = to_tsquery(TEXT_SEARCH_CONFIG, terms)
+    candidates = filter_by_date_range(
+        select(Expense.id, Expense.amount, Expense.category, Expense.date, Expense.description, Expense.search_vector)
+        .where(Expense.user_id == user_id, Expense.search_vector.bool_op("@@")(tsquery)),
+        start_date,
+        end_date,
+    )
+    if category is not None:
+        candidates = candidates.where(Expense.category == category)
+    candidates = (
+        candidates.order_by(Expense.date.desc(), Expense.id.desc()).limit(SEARCH_CANDIDATES).subquery("candidates")
+    )
+    rank = func.ts_rank_cd(candidates.c.search_vector, tsquery)
+    return (
+        select(
+            candidates.c.id, candidates.c.amount, candidates.c.category, candidates.c.date,
+            candidates.c.description, rank.label("rank"),
+        )
+        .order_by(rank.desc(), candidates.c.date.desc(), candidates.c.id.desc())
+        .limit(limit)
+        .offset(offset)
+    )
+
+
+@router.get(
+    "/search",
+    response_model=List[ExpenseSearchHit]
+)
+async def search_expenses(
+    db: read_db_dependency,
+    current_user: user_dependency,
+    request: Request,
+    response: Response,
+    q: Annotated[str, Query(min_length=1, max_length=MAX_SEARCH_LENGTH)],
+    period: Optional[Period] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    category: Optional[str] = None,
+    limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+    offset: Annotated[int, Query(ge=0)] = 0,
+):
+    """
+    Full-text search over descriptions, best matches first.
+
+    Every word of ``q`` must match, the last one as a prefix (English stemming
+    applies), so "coff" finds "Coffee with Sam". Combines with the list endpoint's date
+    filters and a category. Responses carry an ETag like the list endpoint.
+
+    Only the newest SEARCH_CANDIDATES matches are ranked, so paging stops
+    there: an ``offset + limit`` beyond it is a 400 rather than a short or
+    empty page. Narrow the search to reach older matches.
+    """
+    terms = prefix_tsquery(q)
+    if terms is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Search query has no searchable words"
+        )
+    if offset + limit > SEARCH_CANDIDATES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Search pages stop at the newest {SEARCH_CANDIDATES} matches; narrow the search instead"
+        )
+    start_date, end_date = resolve_date_range(period, start_date, end_date)
+    expense_category = parse_category(category) if category is not None else None
+    not_modified = await conditional_read(request, response, db, current_user.id)
+    if not_modified:
+        return not_modified
+
+    query = search_expenses_query(
+        current_user.id, terms, start_date, end_date, expense_category, limit, offset
+    )
+    return (await db.execute(query)).all()  # ExpenseSearchHit reads rows with from_attributes
+
+
+class CategorySummary(BaseModel):
+    category: str
+    total: float
+    count: int
+    average: float
+
+
+class PeriodSummary(BaseModel):
+    period: date   # first day of the day/week/month bucket
+    total: float
+    count: int
+    average: float
+
+
+class ExpenseSummary(BaseModel):
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    granularity: Granularity
+    total: float
+    count: int
+    average: float
+    by_category: List[CategorySummary]
+    by_period: List[PeriodSummary]
+
+
+def summary_query(
+    user_id: int,
+    granularity: Granularity,
+    start_date: Optional[date],
+    end_date: Optional[date],
+):
+    """The single GROUPING SETS query behind summarize_expenses."""
+    # granularity is one of the Granularity literals, so inlining it is safe and
+    # keeps the SELECT and GROUP BY expressions textually identical
+    bucket = cast(
+        func.date_trunc(literal_column(f"'{granularity}'"), ExpenseDailyRollup.day), Date
+    ).label("bucket")
+    query = select(
+        ExpenseDailyRollup.category,
+        bucket,
+        func.coalesce(func.sum(ExpenseDailyRollup.total), 0.0).label("total"),
+        func.coalesce(func.sum(ExpenseDailyRollup.count), 0).label("count"),
+        func.grouping(ExpenseDailyRollup.category, bucket).label("grouping"),
+    ).where(ExpenseDailyRollup.user_id == user_id)
     if start_date:
-        query = query.filter(Expense.date >= start_date)
+        query = query.where(ExpenseDailyRollup.day >= start_date)
     if end_date:
-        query = query.filter(Expense.date <= end_date)
+        query = query.where(ExpenseDailyRollup.day <= end_date)
+    return query.group_by(
+        func.grouping_sets(tuple_(), tuple_(ExpenseDailyRollup.category), tuple_(bucket))
+    )
+
+
+@router.get(
+    "/summary",
+    response_model=ExpenseSummary
+)
+async def summarize_expenses(
+    db: read_db_dependency,
+    current_user: user_dependency,
+    request: Request,
+    response: Response,
+    granularity: Granularity = "month",
+    period: Optional[Period] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+):
+    """
+    Totals, counts and averages per category and per day/week/month.
+
+    Everything is aggregated by Postgres in one GROUP BY GROUPING SETS query
+    over expense_daily_rollups: the grand total, the per-category groups and
+    the per-bucket groups come back as rows of the same result. The query
+    reads at most one row per day and category, however many expenses the
+    range holds. Supports ETag/If-None-Match like list_expenses.
+    """
+    start_date, end_date = resolve_date_range(period, start_date, end_date)
+    not_modified = await conditional_read(request, response, db, current_user.id)
+    if not_modified:
+        return not_modified
+    query = summary_query(current_user.id, granularity, start_date, end_date)
+    summary = ExpenseSummary(
+        start_date=start_date, end_date=end_date, granularity=granularity,
+        total=0.0, count=0, average=0.0, by_category=[], by_period=[],
+    )
+    for row in (await db.execute(query)).all():
+        average = row.total / row.count if row.count else 0.0
+        if row.grouping == 0b11:
+            summary.total, summary.count, summary.average = row.total, row.count, average
+        elif row.grouping == 0b01:
+            summary.by_category.append(CategorySummary(
+                category=row.category.value, total=row.total, count=row.count, average=average
+            ))
+        else:
+            summary.by_period.append(PeriodSummary(
+                period=row.bucket, total=row.total, count=row.count, average=average
+            ))
+    summary.by_category.sort(key=lambda group: group.category)
+    summary.by_period.sort(key=lambda group: group.period)
+    return summary
+
+
+def stats_query(user_id: int, start_date: Optional[date], end_date: Optional[date]):
+    """
+    The user's expenses as four parallel arrays in one row, for stats_from_row.
+
+    Every column comes from ix_expenses_user_id_date_id (category and amount
+    are INCLUDEd). The arrays are sent as bytea in binary array format, which
+    NumPy reads directly; decoding them as lists would build a Python object
+    per expense and value.
+    """
+    day = cast(Expense.date, Date) - literal_column("DATE '1970-01-01'", Date)
+    category = case(*((Expense.category == member, index) for index, member in enumerate(STATS_CATEGORIES)))
+    return filter_by_date_range(
+        select(*(
+            func.array_send(func.array_agg(column), type_=LargeBinary).label(name)
+            for name, column in (("ids", Expense.id), ("days", day), ("amounts", Expense.amount), ("categories", category))
+        )).where(Expense.user_id == user_id),
+        start_date, end_date,
+    )
+
+
+@router.get(
+    "/stats",
+    response_model=ExpenseStats
+)
+async def expense_stats(
+    db: read_db_dependency,
+    current_user: user_dependency,
+    request: Request,
+    response: Response,
+    period: Optional[Period] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    days: Annotated[int, Query(ge=1, le=MAX_STATS_DAYS)] = DEFAULT_STATS_DAYS,
+):
+    """
+    Rolling 7/30-day averages, per-category percentiles, month-over-month
+    changes, a 30-day linear forecast and outliers over the user's history.
+
+    One query pulls the expenses in range as column arrays; the statistics
+    are computed with NumPy off the event loop (see app.stats). ``days``
+    limits how many of the range's last days ``rolling`` lists. Supports
+    ETag/If-None-Match like list_expenses.
+    """
+    start_date, end_date = resolve_date_range(period, start_date, end_date)
+    not_modified = await conditional_read(request, response, db, current_user.id)
+    if not_modified:
+        return not_modified
+    row = (await db.execute(stats_query(current_user.id, start_date, end_date))).one()
+    return await run_in_threadpool(stats_from_row, row, start_date, end_date, days)
+
+
+EXPORT_COLUMNS = ("id", "amount", "category", "date", "description")
+EXPORT_CHUNK_ROWS = 1000
 
-    expenses = query.order_by(Expense.date.desc()).all()
-    return expenses
+
+def _export_row(row) -> tuple:
+    """Plain values of one exported row, shaped like ExpenseOut."""
+    return (row.id, float(row.amount), row.category.value, row.date.date().isoformat(), row.description)
+
+
+def _encode_ndjson(rows) -> str:
+    return "".join(json.dumps(dict(zip(EXPORT_COLUMNS, _export_row(row)))) + "\n" for row in rows)
+
+
+def _encode_csv(rows) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(_export_row(row) for row in rows)
+    return buffer.getvalue()
+
+
+def export_query(user_id: int, start_date: Optional[date], end_date: Optional[date]):
+    """Column-only, newest-first query streamed by export_expenses."""
+    return filter_by_date_range(
+        select(Expense.id, Expense.amount, Expense.category, Expense.date, Expense.description)
+        .where(Expense.user_id == user_id),
+        start_date, end_date,
+    ).order_by(Expense.date.desc(), Expense.id.desc())
+
+
+@router.get("/export")
+async def export_expenses(
+    current_user: user_dependency,
+    session_factory: Annotated[async_sessionmaker[AsyncSession], Depends(get_read_sessionmaker)],
+    export_format: Annotated[ExportFormat, Query(alias="format")] = "ndjson",
+    period: Optional[Period] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+):
+    """
+    Stream the user's full history, newest first, as NDJSON or CSV.
+
+    Rows come off a server-side cursor (DECLARE ... CURSOR, see app/cursors.py)
+    in chunks of EXPORT_CHUNK_ROWS column tuples, so memory stays flat however
+    many rows the user has and the first chunk goes out as soon as Postgres
+    returns it.
+    """
+    start_date, end_date = resolve_date_range(period, start_date, end_date)
+    query = export_query(current_user.id, start_date, end_date)
+    encode = _encode_ndjson if export_format == "ndjson" else _encode_csv
+
+    async def body():
+        if export_format == "csv":
+            yield ",".join(EXPORT_COLUMNS) + "\r\n"
+        # The request's own session is already closed once streaming starts
+        async with session_factory() as session:
+            async for rows in stream_with_cursor(session, query, EXPORT_CHUNK_ROWS, name="expense_export"):
+                yield encode(rows)
+
+    media_type = "application/x-ndjson" if export_format == "ndjson" else "text/csv"
+    return StreamingResponse(
+        body(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="expenses.{export_format}"'},
+    )
 
 
 @router.post(
@@ -98,14 +583,18 @@ async def create_expense(
         user_id=current_user.id,
         amount=exp_in.amount,
         category=category,
-        date=exp_in.date,
+        date=parse_expense_date(exp_in.date),
         description=exp_in.description or ""
     )
     db.add(expense)
+    await apply_rollup_changes(db, [
+        expense_change(current_user.id, expense.date, category, expense.amount)
+    ])
 
     # Commit and refresh to populate the ID
-    db.commit()
-    db.refresh(expense)
+    await bump_data_version(db, current_user.id)
+    await db.commit()
+    await db.refresh(expense)
     return ExpenseOut(
         id=expense.id,
         amount=float(expense.amount),
@@ -115,49 +604,388 @@ async def create_expense(
     )
 
 
-@router.put("/{expense_id}", response_model=ExpenseOut, status_code=status.HTTP_200_OK)
-async def update_expense(expense_id: int, exp_in: ExpenseIn, db: db_dependency, current_user: user_dependency):
-    # 1) Fetch the expense, ensure it exists and belongs to this user
-    expense = db.query(Expense).get(expense_id)
-    if not expense or expense.user_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Expense not found or not owned by user"
-        )
+class BatchCreated(BaseModel):
+    index: int
+    id: int
+
 
-    # 2) Validate category
+class BatchItemError(BaseModel):
+    index: int
+    detail: str
+
+
+class BatchCreateOut(BaseModel):
+    created: List[BatchCreated]
+    errors: List[BatchItemError]
+
+
+def _validate_batch_item(item: Any) -> dict:
+    """Validate one raw batch item into insert parameters, raising ValueError with the reason."""
+    try:
+        exp_in = ExpenseIn.model_validate(item)
+    except ValidationError as exc:
+        raise ValueError("; ".join(
+            f"{'.'.join(str(part) for part in err['loc']) or 'item'}: {err['msg']}" for err in exc.errors()
+        ))
     try:
         category = ExpenseCategory(exp_in.category)
     except ValueError:
+        raise ValueError(f"Invalid category: {exp_in.category}")
+    try:
+        expense_date = date.fromisoformat(exp_in.date)
+    except ValueError:
+        raise ValueError(f"Invalid date: {exp_in.date}")
+    return {
+        "amount": exp_in.amount,
+        "category": category,
+        "date": expense_date,
+        "description": exp_in.description or "",
+    }
+
+
+@router.post(
+    "/batch",
+    status_code=status.HTTP_201_CREATED,
+    response_model=BatchCreateOut
+)
+async def create_expenses_batch(
+    items: Annotated[List[Any], Body(max_length=MAX_BATCH_SIZE)],
+    db: db_dependency,
+    current_user: user_dependency
+):
+    """
+    Create many expenses in one request, e.g. an offline sync from the mobile client.
+
+    Every item is validated on its own; invalid ones are reported by index in
+    ``errors`` and do not stop the rest. The valid ones go in with a single
+    INSERT ... RETURNING id executemany and one commit.
+    """
+    rows, indexes, errors = [], [], []
+    for index, item in enumerate(items):
+        try:
+            rows.append({**_validate_batch_item(item), "user_id": current_user.id})
+            indexes.append(index)
+        except ValueError as exc:
+            errors.append(BatchItemError(index=index, detail=str(exc)))
+
+    created = []
+    if rows:
+        ids = (await db.scalars(
+            insert(Expense).returning(Expense.id, sort_by_parameter_order=True), rows
+        )).all()
+        await apply_rollup_changes(db, [
+            expense_change(current_user.id, row["date"], row["category"], row["amount"]) for row in rows
+        ])
+        await bump_data_version(db, current_user.id)
+        await db.commit()
+        created = [BatchCreated(index=index, id=expense_id) for index, expense_id in zip(indexes, ids)]
+
+    return BatchCreateOut(created=created, errors=errors)
+
+
+@router.post(
+    "/import",
+    status_code=status.HTTP_201_CREATED,
+    response_model=ImportResult
+)
+async def import_expenses(
+    file: UploadFile,
+    db: db_dependency,
+    current_user: user_dependency
+):
+    """
+    Import a CSV (or bank statement export) with date, amount, category and
+    optional description columns.
+
+    Rows are validated and COPYed in fixed-size chunks; invalid rows are
+    reported by line number and skipped. The response includes rows/sec.
+    """
+    try:
+        result = await import_expenses_csv(db, current_user.id, file.file)
+    except (ImportFormatError, UnicodeDecodeError, csv.Error) as exc:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Invalid category: {exp_in.category}"
+            detail=f"Unreadable CSV: {exc}"
+        )
+    await bump_data_version(db, current_user.id)
+    await db.commit()
+    return result
+
+
+def with_rollups_and_version(query, changes, user_id: int):
+    """
+    Attach the rollup upsert of ``changes`` and the data_version bump to
+    ``query`` as data-modifying CTEs.
+
+    PostgreSQL runs every data-modifying CTE exactly once, referenced or not,
+    so a mutation written as a CTE plus its rollup deltas and version bump
+    cost a single round trip. The version is only bumped when ``changes`` is
+    non-empty, i.e. some row actually matched.
+
+    :param query: The SELECT whose rows the caller reads back.
+    :param changes: A CTE of (user_id, ts, category, amount, n) rows, see app.rollups.
+    """
+    bump = data_version_bump(user_id).where(select(changes.c.n).exists())
+    return query.add_cte(rollup_upsert(changes).cte("rollup"), bump.cte("bumped"))
+
+
+def updated_expenses(conditions: list, values: dict):
+    """
+    UPDATE of the expenses matching ``conditions`` as a CTE returning the new
+    rows, plus the CTE of rollup changes it implies (old values out, new in).
+
+    The old values come from a FOR UPDATE sub-select that locks rows in id
+    order, so concurrent writes to the same rows can neither make the rollup
+    deltas stale nor deadlock each other.
+
+    The UPDATE joins on the whole primary key (id, date) and repeats
+    ``conditions``: on the partitioned table id alone is not known to be
+    unique, and without the user's conditions the planner hash-joins against
+    a sequential scan of every partition.
+    """
+    old = (
+        select(Expense.id, Expense.amount, Expense.category, Expense.date)
+        .where(*conditions)
+        .order_by(Expense.id)
+        .with_for_update()
+        .subquery("old")
+    )
+    updated = (
+        update(Expense)
+        .where(Expense.id == old.c.id, Expense.date == old.c.date, *conditions)
+        .values(**values)
+        .returning(
+            Expense.id, Expense.user_id, Expense.amount, Expense.category, Expense.date, Expense.description,
+            old.c.amount.label("old_amount"), old.c.category.label("old_category"), old.c.date.label("old_date"),
         )
+        .cte("updated")
+    )
+    changes = union_all(
+        select(
+            updated.c.user_id, updated.c.old_date.label("ts"), updated.c.old_category.label("category"),
+            (-updated.c.old_amount).label("amount"), literal_column("-1").label("n"),
+        ),
+        select(updated.c.user_id, updated.c.date, updated.c.category, updated.c.amount, literal_column("1")),
+    ).cte("changes")
+    return updated, changes
 
-    # 3) Apply updates
-    expense.amount = exp_in.amount
-    expense.category = category
-    expense.date = exp_in.date
-    expense.description = exp_in.description or ""
 
-    # 4) Commit & refresh
-    db.commit()
-    db.refresh(expense)
+def deleted_expenses(conditions: list):
+    """DELETE of the expenses matching ``conditions`` as a CTE that is also its own rollup changes."""
+    return (
+        delete(Expense)
+        .where(*conditions)
+        .returning(
+            Expense.id, Expense.user_id, Expense.date.label("ts"), Expense.category,
+            (-Expense.amount).label("amount"), literal_column("-1").label("n"),
+        )
+        .cte("deleted")
+    )
+
+
+def update_expense_query(expense_id: int, user_id: int, values: dict):
+    """One-statement update of an owned expense, returning the new row."""
+    updated, changes = updated_expenses([Expense.id == expense_id, Expense.user_id == user_id], values)
+    query = select(
+        updated.c.id, updated.c.amount, updated.c.category, updated.c.date, updated.c.description
+    )
+    return with_rollups_and_version(query, changes, user_id)
+
+
+def delete_expense_query(expense_id: int, user_id: int):
+    """One-statement delete of an owned expense, returning its id."""
+    deleted = deleted_expenses([Expense.id == expense_id, Expense.user_id == user_id])
+    return with_rollups_and_version(select(deleted.c.id), deleted, user_id)
+
+
+def bulk_update_query(conditions: list, values: dict, user_id: int):
+    """One-statement update of the expenses matching ``conditions``, returning how many changed."""
+    updated, changes = updated_expenses(conditions, values)
+    return with_rollups_and_version(select(func.count()).select_from(updated), changes, user_id)
+
+
+def bulk_delete_query(conditions: list, user_id: int):
+    """One-statement delete of the expenses matching ``conditions``, returning how many went."""
+    deleted = deleted_expenses(conditions)
+    return with_rollups_and_version(select(func.count()).select_from(deleted), deleted, user_id)
+
+
+def owned_expense_query(expense_id: int, user_id: int):
+    """Ownership check, only needed on the error path of a PUT."""
+    return select(Expense.id).where(Expense.id == expense_id, Expense.user_id == user_id)
+
+
+def expense_update_values(exp_in: ExpenseIn) -> dict:
+    """Column values for a PUT, or a 400 for an invalid category or date."""
+    return {
+        "amount": exp_in.amount,
+        "category": parse_category(exp_in.category),
+        "date": parse_expense_date(exp_in.date),
+        "description": exp_in.description or "",
+    }
+
+
+class BulkFilter(BaseModel):
+    """Which of the user's expenses a bulk change applies to; all given criteria must match."""
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    category: Optional[str] = None
+    ids: Optional[List[int]] = Field(default=None, max_length=MAX_BATCH_SIZE)
+    min_amount: Optional[float] = None
+    max_amount: Optional[float] = None
+
+
+class BulkSet(BaseModel):
+    category: Optional[str] = None
+    date: Optional[str] = None      # YYYY-MM-DD
+    description: Optional[str] = None
+
+
+class BulkUpdateIn(BaseModel):
+    filter: BulkFilter
+    set: BulkSet
+
+
+class BulkResult(BaseModel):
+    matched: int
+    affected: int
+    dry_run: bool
+
+
+def bulk_filter_conditions(user_id: int, expense_filter: BulkFilter) -> list:
+    """
+    WHERE clauses for a bulk change, always scoped to ``user_id``.
+
+    Raises a 400 for an empty filter, so a bulk request can never touch every
+    expense by accident, and for an invalid category or inverted range.
+    """
+    start_date, end_date = resolve_date_range(None, expense_filter.start_date, expense_filter.end_date)
+    min_amount, max_amount = expense_filter.min_amount, expense_filter.max_amount
+    if min_amount is not None and max_amount is not None and min_amount > max_amount:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="min_amount cannot be above max_amount"
+        )
+
+    conditions = []
+    if start_date:
+        conditions.append(Expense.date >= start_date)
+    if end_date:
+        conditions.append(Expense.date <= end_date)
+    if expense_filter.category is not None:
+        conditions.append(Expense.category == parse_category(expense_filter.category))
+    if expense_filter.ids is not None:
+        conditions.append(Expense.id.in_(expense_filter.ids))
+    if min_amount is not None:
+        conditions.append(Expense.amount >= min_amount)
+    if max_amount is not None:
+        conditions.append(Expense.amount <= max_amount)
+    if not conditions:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Bulk filter needs at least one criterion"
+        )
+    return [Expense.user_id == user_id, *conditions]
+
+
+async def count_matching(db: AsyncSession, conditions: list) -> int:
+    """Dry-run count of the expenses a bulk change would touch."""
+    return await db.scalar(select(func.count()).select_from(Expense).where(*conditions))
+
+
+@router.patch("/bulk", response_model=BulkResult)
+async def bulk_update_expenses(
+    body: BulkUpdateIn,
+    db: db_dependency,
+    current_user: user_dependency,
+    dry_run: bool = False,
+):
+    """
+    Apply ``set`` to every expense matching ``filter``, e.g. move all Others
+    in March to Groceries.
+
+    One set-based UPDATE that also keeps the rollups and data version in
+    step; with ``dry_run`` the matches are only counted.
+    """
+    conditions = bulk_filter_conditions(current_user.id, body.filter)
+    values = body.set.model_dump(exclude_none=True)
+    if not values:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Nothing to update"
+        )
+    if "category" in values:
+        values["category"] = parse_category(values["category"])
+    if "date" in values:
+        values["date"] = parse_expense_date(values["date"])
+
+    if dry_run:
+        return BulkResult(matched=await count_matching(db, conditions), affected=0, dry_run=True)
+
+    affected = await db.scalar(bulk_update_query(conditions, values, current_user.id))
+    await db.commit()
+    return BulkResult(matched=affected, affected=affected, dry_run=False)
+
+
+@router.delete("/bulk", response_model=BulkResult)
+async def bulk_delete_expenses(
+    expense_filter: BulkFilter,
+    db: db_dependency,
+    current_user: user_dependency,
+    dry_run: bool = False,
+):
+    """
+    Delete every expense matching the filter in the request body.
+
+    One set-based DELETE that also keeps the rollups and data version in
+    step; with ``dry_run`` the matches are only counted.
+    """
+    conditions = bulk_filter_conditions(current_user.id, expense_filter)
+    if dry_run:
+        return BulkResult(matched=await count_matching(db, conditions), affected=0, dry_run=True)
+
+    affected = await db.scalar(bulk_delete_query(conditions, current_user.id))
+    await db.commit()
+    return BulkResult(matched=affected, affected=affected, dry_run=False)
+
+
+# The bulk routes above must stay ahead of these, or "/bulk" would be taken
+# for an expense_id
+@router.put("/{expense_id}", response_model=ExpenseOut, status_code=status.HTTP_200_OK)
+async def update_expense(expense_id: int, exp_in: ExpenseIn, db: db_dependency, current_user: user_dependency):
+    not_found = HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="Expense not found or not owned by user"
+    )
+
+    # 1) Validate the payload before touching the row
+    try:
+        values = expense_update_values(exp_in)
+    except HTTPException:
+        # A missing or foreign expense is still a 404 whatever the payload
+        if await db.scalar(owned_expense_query(expense_id, current_user.id)) is None:
+            raise not_found
+        raise
+
+    # 2) Update, move the expense between rollup buckets and bump the version
+    #    in one statement; no row back means missing or not owned
+    row = (await db.execute(update_expense_query(expense_id, current_user.id, values))).one_or_none()
+    if row is None:
+        raise not_found
 
-    return expense  # Pydantic orm_mode will serialize this
+    await db.commit()
+    return row  # ExpenseOut reads it with from_attributes
 
 
 @router.delete("/{expense_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_expense(expense_id: int, db: db_dependency, current_user: user_dependency):
-    # 1) Fetch and authorize
-    expense = db.query(Expense).get(expense_id)
-    if not expense or expense.user_id != current_user.id:
+    # Delete, update the rollups and bump the version in one statement
+    deleted = await db.scalar(delete_expense_query(expense_id, current_user.id))
+    if deleted is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Expense not found",
         )
 
-    # 2) Delete & commit
-    db.delete(expense)
-    db.commit()
+    await db.commit()
     # 204 response has no body
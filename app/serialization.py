@@ -0,0 +1,54 @@
+"""
+Fast JSON encoding for large read responses.
+
+Routers that return many rows can build plain dicts from column tuples and
+encode them here with orjson, skipping per-row Pydantic models and
+jsonable_encoder. The bytes are identical to what FastAPI's JSONResponse
+would send for the same data, so clients cannot tell the paths apart.
+"""
+
+import json
+from typing import Any, Iterable
+
+import orjson
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+
+# Python's float repr (used by json.dumps) switches to exponent notation
+# outside [1e-4, 1e16), and orjson spells exponents differently there
+# ("1e16" instead of "1e+16")
+_PLAIN_FLOAT_MIN = 1e-4
+_PLAIN_FLOAT_MAX = 1e16
+# Headers the new Response computes for itself
+_OWN_HEADERS = {"content-length", "content-type"}
+
+
+def _plain_float(value: float) -> bool:
+    return value == 0.0 or _PLAIN_FLOAT_MIN <= abs(value) < _PLAIN_FLOAT_MAX
+
+
+def json_bytes(content: Any, floats: Iterable[float] = ()) -> bytes:
+    """
+    Encode ``content`` exactly as JSONResponse would.
+
+    orjson already matches json.dumps(ensure_ascii=False, separators=(",", ":"))
+    for strings, ints, dates and plain floats; if any of ``floats`` (every float
+    in ``content``) would be written in exponent notation, or is NaN/inf, the
+    stdlib encoder is used instead, raising on NaN/inf like JSONResponse does.
+    """
+    if all(_plain_float(value) for value in floats):
+        return orjson.dumps(content)
+    return json.dumps(
+        jsonable_encoder(content), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def json_response(body: bytes, response: Response) -> Response:
+    """
+    Wrap pre-encoded JSON, keeping the headers set on the endpoint's ``response``.
+
+    Returning a Response bypasses response_model validation and the headers of
+    the injected Response parameter, so those are copied over here.
+    """
+    headers = {key: value for key, value in response.headers.items() if key not in _OWN_HEADERS}
+    return Response(content=body, status_code=response.status_code or 200, media_type="application/json", headers=headers)
@@ -0,0 +1,155 @@
+"""
+Per-request SQL counters and the slow-query log.
+
+Cursor-execute hooks on every Engine time each statement. While a request
+is being served (see SQLStatsMiddleware) the count and DB time are added to
+that request's QueryStats, which is reported as response headers::
+
+    X-DB-Queries: 3
+    X-DB-Time-Ms: 1.84
+
+A request that runs more than MAX_QUERIES_PER_REQUEST statements is logged
+as a likely N+1 pattern, and any statement slower than SLOW_QUERY_MS is
+logged with its normalized SQL. Both are one JSON object per line on the
+``app.sql`` logger.
+"""
+
+import json
+import logging
+import re
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import settings
+
+# Read settings (see app.config)
+SLOW_QUERY_MS = settings.slow_query_ms
+MAX_QUERIES_PER_REQUEST = settings.max_queries_per_request
+
+logger = logging.getLogger("app.sql")
+
+# asyncpg and psycopg2 placeholders; statements arrive already compiled
+_BIND_PARAM = re.compile(r"\$\d+|%\(\w+\)s|%s")
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])")
+_PLACEHOLDER_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+_REPEATED_GROUP = re.compile(r"(\((?:\?|\?, \.\.\.)\))(?:\s*,\s*\1)+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(statement: str) -> str:
+    """
+    Reduce a statement to its shape, so the same query always logs the same.
+
+    Bind parameters and literals become ``?`` and runs of them (IN lists,
+    multi-row VALUES) collapse to ``?, ...``.
+    """
+    sql = _STRING_LITERAL.sub("?", statement)
+    sql = _BIND_PARAM.sub("?", sql)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    sql = _WHITESPACE.sub(" ", sql).strip()
+    sql = _PLACEHOLDER_LIST.sub("?, ...", sql)
+    return _REPEATED_GROUP.sub(r"\1, ...", sql)
+
+
+class QueryStats:
+    """Statements run on behalf of one request."""
+    __slots__ = ("method", "scope", "queries", "seconds")
+
+    def __init__(self, method: str, scope: dict):
+        self.method = method
+        self.scope = scope
+        self.queries = 0
+        self.seconds = 0.0
+
+    @property
+    def route(self) -> str:
+        route = self.scope.get("route")
+        return getattr(route, "path_format", None) or self.scope.get("path", "")
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("sql_stats", default=None)
+
+
+def current_stats() -> Optional[QueryStats]:
+    """The QueryStats of the request being served, if any."""
+    return _current_stats.get()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _record_query(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.seconds += elapsed
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        record = {
+            "event": "slow_query",
+            "duration_ms": round(elapsed * 1000, 2),
+            "sql": normalize_sql(statement),
+            "executemany": executemany,
+        }
+        if stats is not None:
+            record.update(method=stats.method, route=stats.route)
+        logger.warning(json.dumps(record))
+
+
+@event.listens_for(Engine, "handle_error")
+def _discard_timer(exception_context):
+    started = exception_context.connection.info.get("query_started") if exception_context.connection else None
+    if started:
+        started.pop()
+
+
+class SQLStatsMiddleware:
+    """
+    Pure ASGI middleware that collects QueryStats for each HTTP request.
+
+    The headers cover the statements run before the response starts, which is
+    all of them except those of a streamed body; the N+1 check runs once the
+    response has finished and sees everything.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats(scope["method"], scope)
+        token = _current_stats.set(stats)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", ()),
+                    (b"x-db-queries", str(stats.queries).encode()),
+                    (b"x-db-time-ms", f"{stats.seconds * 1000:.2f}".encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_stats.reset(token)
+            if stats.queries > MAX_QUERIES_PER_REQUEST:
+                logger.warning(json.dumps({
+                    "event": "too_many_queries",
+                    "method": stats.method,
+                    "route": stats.route,
+                    "queries": stats.queries,
+                    "db_ms": round(stats.seconds * 1000, 2),
+                    "threshold": MAX_QUERIES_PER_REQUEST,
+                }))
@@ -0,0 +1,323 @@
+"""
+Spending statistics over a user's expense history, computed with NumPy.
+
+GET /expenses/stats fetches the user's expenses as four parallel Postgres
+arrays in a single row (see stats_query in app.routers.expenses): ids, days
+since 1970-01-01, amounts and category indexes. Each comes back in Postgres'
+binary array format (array_send), which decode_array reads into a NumPy
+array without a Python object per element. compute_stats then works on
+whole arrays: bincount for the daily and monthly totals, a cumulative sum for
+the rolling averages, one sort for every category's percentiles and medians,
+and a least-squares line for the forecast. Nothing loops over expenses in
+Python; the loops left are over days shown, months and categories.
+
+numpy is imported on first use, like passlib and jose in app.auth; the
+lifespan pre-warm loads it (warm_up_stats).
+"""
+
+from datetime import date, timedelta
+from typing import TYPE_CHECKING, Any, List, Optional, Sequence
+
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+
+from app.models import ExpenseCategory
+
+if TYPE_CHECKING:
+    import numpy as np
+
+EPOCH = date(1970, 1, 1)
+# Category index i in stats_query's result is STATS_CATEGORIES[i]
+STATS_CATEGORIES = tuple(ExpenseCategory)
+ROLLING_WINDOWS = (7, 30)
+PERCENTILES = (25, 50, 75, 90, 95)
+# The forecast extends a line fitted to the last FORECAST_FIT_DAYS daily totals
+FORECAST_FIT_DAYS = 90
+FORECAST_DAYS = 30
+# Modified z-score (Iglewicz & Hoaglin) above which an expense is flagged,
+# and the fewest expenses a category needs for its median to mean anything
+OUTLIER_SCORE = 3.5
+OUTLIER_MIN_COUNT = 5
+MAX_OUTLIERS = 20
+# Scale MAD and mean absolute deviation to a normal distribution's standard deviation
+MAD_SCALE = 1.4826
+MEAN_AD_SCALE = 1.2533
+
+
+class RollingDay(BaseModel):
+    day: date
+    total: float
+    average_7d: float
+    average_30d: float
+
+
+class CategoryStats(BaseModel):
+    category: str
+    count: int
+    total: float
+    mean: float
+    p25: float
+    p50: float
+    p75: float
+    p90: float
+    p95: float
+
+
+class MonthStats(BaseModel):
+    month: date    # first day of the calendar month
+    total: float
+    count: int
+    change: Optional[float] = None       # total minus the previous month's total
+    change_pct: Optional[float] = None   # change as a percentage of the previous month's total
+
+
+class Forecast(BaseModel):
+    fit_days: int
+    horizon_days: int
+    daily_trend: float       # change in daily spend per day along the fitted line
+    projected_total: float   # spend over the horizon_days days after end_date
+
+
+class Outlier(BaseModel):
+    id: int
+    date: date
+    category: str
+    amount: float
+    score: float
+
+
+class ExpenseStats(BaseModel):
+    start_date: date
+    end_date: date
+    count: int
+    total: float
+    rolling: List[RollingDay]
+    by_category: List[CategoryStats]
+    by_month: List[MonthStats]
+    forecast: Optional[Forecast]
+    outlier_count: int
+    outliers: List[Outlier]
+
+
+def decode_array(data: Optional[bytes], element: str) -> "np.ndarray":
+    """
+    A one-dimensional Postgres array in binary send format, as a NumPy array.
+
+    The format is a header (dimension count, null flag, element type, then
+    size and lower bound per dimension) followed by each element as a 4-byte
+    length and its big-endian value. With fixed-width elements and no NULLs
+    that is a record array, so one frombuffer reads it.
+
+    :param data: array_send() output; None (array_agg over no rows) reads as empty.
+    :param element: Big-endian NumPy type of the elements, e.g. ``">i4"`` for integer[].
+    """
+    import numpy as np
+
+    native = np.dtype(element).newbyteorder("=")
+    if data is None:
+        return np.empty(0, dtype=native)
+    header = np.frombuffer(data, dtype=">i4", count=3)
+    dimensions, has_nulls = int(header[0]), int(header[1])
+    if dimensions > 1 or has_nulls:
+        raise ValueError("expected a one-dimensional array without NULLs")
+    records = np.frombuffer(data, dtype=[("length", ">i4"), ("value", element)], offset=12 + 8 * dimensions)
+    return records["value"].astype(native)
+
+
+def group_quantiles(values: "np.ndarray", groups: "np.ndarray", counts: "np.ndarray", quantiles) -> "np.ndarray":
+    """
+    Quantiles of ``values`` within each group, interpolated linearly like numpy.percentile.
+
+    :param groups: Group index of each value.
+    :param counts: Number of values in each group (bincount of ``groups``).
+    :param quantiles: Percentages, 0-100.
+    :return: A (groups, quantiles) array; rows of empty groups are 0.
+    """
+    import numpy as np
+
+    # Sorting by value, then stably by group (a radix sort for small integer
+    # types), orders every group's values; group g then occupies
+    # ordered[offsets[g]:offsets[g] + counts[g]]
+    by_value = np.argsort(values)
+    ordered = values[by_value[np.argsort(groups[by_value], kind="stable")]]
+    offsets = np.cumsum(counts) - counts
+    present = counts > 0
+    sizes = counts[present, None]
+    positions = (sizes - 1) * (np.asarray(quantiles, dtype=np.float64) / 100)
+    lower = np.floor(positions).astype(np.int64)
+    upper = np.minimum(lower + 1, sizes - 1)
+    base = offsets[present, None]
+    below, above = ordered[base + lower], ordered[base + upper]
+    result = np.zeros((len(counts), len(quantiles)))
+    result[present] = below + (above - below) * (positions - lower)
+    return result
+
+
+def trailing_means(daily: "np.ndarray", window: int) -> "np.ndarray":
+    """Mean of each day and the ``window - 1`` before it, over as many as the range has."""
+    import numpy as np
+
+    sums = np.concatenate(([0.0], np.cumsum(daily)))
+    ends = np.arange(1, len(daily) + 1)
+    starts = np.maximum(ends - window, 0)
+    return (sums[ends] - sums[starts]) / (ends - starts)
+
+
+def compute_stats(
+    ids: Sequence[int],
+    days: Sequence[int],
+    amounts: Sequence[float],
+    categories: Sequence[int],
+    start_date: Optional[date],
+    end_date: Optional[date],
+    rolling_days: int,
+    today: Optional[date] = None,
+) -> ExpenseStats:
+    """
+    Statistics over the expenses given as parallel arrays (or sequences).
+
+    The range runs from ``start_date`` (default: the first expense) to
+    ``end_date`` (default: today, or the last expense if later); days and
+    months without expenses count as zero spend.
+
+    :param days: Days since 1970-01-01 of each expense.
+    :param categories: Index into STATS_CATEGORIES of each expense.
+    :param rolling_days: How many of the range's last days ``rolling`` covers.
+    """
+    import numpy as np
+
+    ids, days = (np.asarray(values, dtype=np.int64) for values in (ids, days))
+    amounts = np.asarray(amounts, dtype=np.float64)
+    # Few enough categories for int8, which group_quantiles sorts fastest
+    categories = np.asarray(categories, dtype=np.int8)
+    today = today or date.today()
+
+    last = (end_date - EPOCH).days if end_date else max((today - EPOCH).days, int(days.max(initial=0)))
+    first = (start_date - EPOCH).days if start_date else int(days.min(initial=last))
+    last = max(last, first)
+    span = last - first + 1
+    offsets = days - first
+
+    # Daily totals and trailing averages
+    daily = np.bincount(offsets, weights=amounts, minlength=span)
+    averages = [trailing_means(daily, window)[-rolling_days:] for window in ROLLING_WINDOWS]
+    shown = np.arange(last - min(rolling_days, span) + 1, last + 1).astype("datetime64[D]")
+    rolling = [
+        RollingDay(day=day, total=total, average_7d=average_7d, average_30d=average_30d)
+        for day, total, average_7d, average_30d in zip(
+            shown.tolist(), daily[-rolling_days:].tolist(), *(a.tolist() for a in averages)
+        )
+    ]
+
+    # Per-category totals and percentiles
+    counts = np.bincount(categories, minlength=len(STATS_CATEGORIES))
+    totals = np.bincount(categories, weights=amounts, minlength=len(STATS_CATEGORIES))
+    quantiles = group_quantiles(amounts, categories, counts, PERCENTILES)
+    by_category = [
+        CategoryStats(
+            category=STATS_CATEGORIES[index].value,
+            count=count,
+            total=total,
+            mean=total / count,
+            **dict(zip((f"p{p}" for p in PERCENTILES), values)),
+        )
+        for index, count, total, values in zip(
+            range(len(STATS_CATEGORIES)), counts.tolist(), totals.tolist(), quantiles.tolist()
+        )
+        if count
+    ]
+    by_category.sort(key=lambda group: group.category)
+
+    # Calendar-month totals and changes, summed from the daily series
+    first_month = np.datetime64(EPOCH + timedelta(days=first), "M")
+    last_month = np.datetime64(EPOCH + timedelta(days=last), "M")
+    months = np.arange(first_month, last_month + 1).astype("datetime64[D]")
+    # Where each month starts in the range; the first month starts with it
+    month_starts = np.maximum((months - np.datetime64(EPOCH + timedelta(days=first))).astype(np.int64), 0)
+    month_totals = np.add.reduceat(daily, month_starts)
+    month_counts = np.add.reduceat(np.bincount(offsets, minlength=span), month_starts)
+    changes = np.diff(month_totals)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change_pcts = changes / month_totals[:-1] * 100
+    months = months.tolist()
+    by_month = [MonthStats(month=months[0], total=float(month_totals[0]), count=int(month_counts[0]))]
+    by_month += [
+        MonthStats(
+            month=month, total=total, count=count, change=change,
+            change_pct=change_pct if previous else None,
+        )
+        for month, total, count, previous, change, change_pct in zip(
+            months[1:], month_totals[1:].tolist(), month_counts[1:].tolist(),
+            month_totals[:-1].tolist(), changes.tolist(), change_pcts.tolist(),
+        )
+    ]
+
+    # Linear trend of recent daily totals, extended FORECAST_DAYS ahead
+    forecast = None
+    fit_days = min(span, FORECAST_FIT_DAYS)
+    if fit_days >= 2:
+        slope, intercept = np.polyfit(np.arange(fit_days), daily[-fit_days:], 1)
+        ahead = intercept + slope * np.arange(fit_days, fit_days + FORECAST_DAYS)
+        forecast = Forecast(
+            fit_days=fit_days,
+            horizon_days=FORECAST_DAYS,
+            daily_trend=float(slope),
+            projected_total=float(np.clip(ahead, 0, None).sum()),
+        )
+
+    # Expenses far above their category's median, in robust standard deviations
+    medians = quantiles[:, PERCENTILES.index(50)]
+    deviations = np.abs(amounts - medians[categories])
+    mads = group_quantiles(deviations, categories, counts, (50,))[:, 0]
+    mean_deviations = np.bincount(categories, weights=deviations, minlength=len(STATS_CATEGORIES)) / np.maximum(counts, 1)
+    scales = np.where(mads > 0, MAD_SCALE * mads, MEAN_AD_SCALE * mean_deviations)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scores = np.where(scales[categories] > 0, (amounts - medians[categories]) / scales[categories], 0.0)
+    flagged = np.flatnonzero((scores > OUTLIER_SCORE) & (counts[categories] >= OUTLIER_MIN_COUNT))
+    top = flagged[np.argsort(-scores[flagged], kind="stable")[:MAX_OUTLIERS]]
+    outliers = [
+        Outlier(
+            id=expense_id, date=EPOCH + timedelta(days=day),
+            category=STATS_CATEGORIES[category].value, amount=amount, score=round(score, 2),
+        )
+        for expense_id, day, category, amount, score in zip(
+            ids[top].tolist(), days[top].tolist(), categories[top].tolist(),
+            amounts[top].tolist(), scores[top].tolist(),
+        )
+    ]
+
+    return ExpenseStats(
+        start_date=EPOCH + timedelta(days=first),
+        end_date=EPOCH + timedelta(days=last),
+        count=len(amounts),
+        total=float(amounts.sum()),
+        rolling=rolling,
+        by_category=by_category,
+        by_month=by_month,
+        forecast=forecast,
+        outlier_count=len(flagged),
+        outliers=outliers,
+    )
+
+
+def stats_from_row(
+    row: Any, start_date: Optional[date], end_date: Optional[date], rolling_days: int
+) -> ExpenseStats:
+    """compute_stats over the arrays of a stats_query row."""
+    return compute_stats(
+        decode_array(row.ids, ">i4"),
+        decode_array(row.days, ">i4"),
+        decode_array(row.amounts, ">f8"),
+        decode_array(row.categories, ">i4"),
+        start_date, end_date, rolling_days,
+    )
+
+
+async def warm_up_stats() -> None:
+    """
+    Import numpy and run compute_stats once, off the event loop.
+
+    Called from the app's lifespan so the first GET /expenses/stats does not
+    pay for the import.
+    """
+    await run_in_threadpool(compute_stats, [1], [0], [1.0], [0], EPOCH, EPOCH + timedelta(days=1), 1)
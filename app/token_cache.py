@@ -0,0 +1,124 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from sqlalchemy import event
+
+from app.config import settings
+from app.invalidation import subscribe
+from app.models import User
+
+# Read settings (see app.config)
+TOKEN_CACHE_SIZE = settings.token_cache_size
+TOKEN_CACHE_TTL_SECONDS = settings.token_cache_ttl_seconds
+
+
+class Principal(NamedTuple):
+    """The authenticated user as the routers see it, without an ORM session."""
+    id: int
+    email: str
+    name: Optional[str] = None
+
+
+class TokenCache:
+    """
+    Bounded LRU cache of verified JWTs.
+
+    Each entry keeps the decoded claims and the Principal they resolve to, and
+    lives until the earlier of ``ttl`` seconds or the token's own ``exp``.
+    Entries are dropped per user when that user is updated or deleted.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, tuple[float, dict, Principal]]" = OrderedDict()
+        self._tokens_by_user: dict[int, set[str]] = {}
+        # ORM events can fire from threadpool-run sync sessions
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[Principal]:
+        """
+        Return the cached Principal for a token, or None on a miss.
+
+        :param token: The raw bearer token.
+        """
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= time.time():
+                self._remove(token)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, token: str, claims: dict, principal: Principal) -> None:
+        """
+        Cache a verified token.
+
+        :param token: The raw bearer token.
+        :param claims: The verified claims, including ``exp``.
+        :param principal: The user the token resolved to.
+        """
+        deadline = time.time() + self.ttl
+        if claims.get("exp") is not None:
+            deadline = min(deadline, float(claims["exp"]))
+        with self._lock:
+            if token in self._entries:
+                self._remove(token)
+            self._entries[token] = (deadline, claims, principal)
+            self._tokens_by_user.setdefault(principal.id, set()).add(token)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate_user(self, user_id: int) -> None:
+        """Drop every cached token that resolves to ``user_id``."""
+        with self._lock:
+            for token in list(self._tokens_by_user.get(user_id, ())):
+                self._remove(token)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def stats(self) -> dict:
+        """Hit/miss counters; every hit is a user lookup the DB did not serve."""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _remove(self, token: str) -> None:
+        _, _, principal = self._entries.pop(token)
+        tokens = self._tokens_by_user.get(principal.id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[principal.id]
+
+
+token_cache = TokenCache(maxsize=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL_SECONDS)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_changed_user(mapper, connection, target) -> None:
+    token_cache.invalidate_user(target.id)
+
+
+# Changes committed by other workers arrive over LISTEN/NOTIFY
+subscribe("user", lambda invalidation: token_cache.invalidate_user(invalidation.user_id), flush=token_cache.clear)
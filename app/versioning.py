@@ -0,0 +1,93 @@
+"""
+Per-user data versions and the ETags derived from them.
+
+``users.data_version`` is bumped in the same transaction as every expense
+mutation, so (user, version, request URL) identifies the exact content a
+read endpoint would return. Reads compare that against If-None-Match with a
+single primary-key lookup and answer 304 before running their real query.
+"""
+
+import hashlib
+from datetime import date
+from typing import Optional
+
+from fastapi import Request, Response, status
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.invalidation import notify_expression
+from app.models import User
+
+
+def data_version_bump(user_id: int):
+    """
+    The UPDATE behind bump_data_version, for callers that embed it in a larger
+    statement (e.g. as a data-modifying CTE).
+
+    It returns the new version and publishes it as an ``expenses``
+    invalidation event (see app.invalidation), which other workers receive
+    once the transaction commits. A Core UPDATE, so it does not fire the User
+    ORM events that would evict the user from the token cache.
+    """
+    return (
+        update(User)
+        .where(User.id == user_id)
+        .values(data_version=User.data_version + 1)
+        .returning(User.data_version, notify_expression("expenses", User.id, User.data_version))
+    )
+
+
+async def bump_data_version(db: AsyncSession, user_id: int) -> int:
+    """
+    Mark the user's expense data as changed; call inside the mutation's transaction.
+
+    :return: The new version.
+    """
+    return await db.scalar(data_version_bump(user_id))
+
+
+async def current_data_version(db: AsyncSession, user_id: int) -> Optional[int]:
+    """The user's current data version, or None if the user is gone."""
+    return await db.scalar(select(User.data_version).where(User.id == user_id))
+
+
+def make_etag(request: Request, user_id: int, version: int) -> str:
+    """
+    Weak ETag for a read of the user's data at ``version``.
+
+    The URL (path and query) is part of it so each page or filter gets its own
+    tag. So is today's date, because relative periods like past_week move
+    every day without any write.
+    """
+    key = f"{request.url.path}?{request.url.query}|{date.today().isoformat()}"
+    digest = hashlib.blake2b(key.encode(), digest_size=8).hexdigest()
+    return f'W/"{user_id}.{version}.{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Weak comparison of ``etag`` against the request's If-None-Match header."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    wanted = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == wanted for candidate in header.split(","))
+
+
+async def conditional_read(
+    request: Request, response: Response, db: AsyncSession, user_id: int
+) -> Optional[Response]:
+    """
+    Validate a conditional GET against the user's data version.
+
+    Sets ETag on ``response`` and returns a ready 304 when the client's copy is
+    current, or None when the caller should build the full response.
+    """
+    version = await current_data_version(db, user_id)
+    etag = make_etag(request, user_id, version or 0)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
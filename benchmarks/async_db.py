@@ -0,0 +1,96 @@
+"""
+Concurrent-request throughput: sync Session vs AsyncSession.
+
+Mounts two tiny endpoints that run the same slow query, one through the
+blocking ``SessionLocal`` inside an ``async def`` handler (how the routers
+used to work) and one through ``AsyncSessionLocal``, then fires concurrent
+requests at each from the same event loop and reports requests/sec.
+
+Needs the Postgres from ``.env``::
+
+    python -m benchmarks.async_db --requests 200 --concurrency 20 --delay 0.05
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import text
+
+from app.database import AsyncSessionLocal, SessionLocal, async_engine, engine
+
+SLOW_QUERY = text("SELECT pg_sleep(:delay)")
+
+
+def build_app(delay: float) -> FastAPI:
+    bench_app = FastAPI()
+
+    @bench_app.get("/sync")
+    async def sync_path():
+        db = SessionLocal()
+        try:
+            db.execute(SLOW_QUERY, {"delay": delay})
+        finally:
+            db.close()
+        return {"ok": True}
+
+    @bench_app.get("/async")
+    async def async_path():
+        async with AsyncSessionLocal() as db:
+            await db.execute(SLOW_QUERY, {"delay": delay})
+        return {"ok": True}
+
+    return bench_app
+
+
+async def run(path: str, bench_app: FastAPI, requests: int, concurrency: int) -> dict:
+    transport = httpx.ASGITransport(app=bench_app)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one():
+            async with semaphore:
+                resp = await client.get(path)
+                resp.raise_for_status()
+
+        # Warm the pools so connection setup is not part of the measurement
+        await asyncio.gather(*(one() for _ in range(concurrency)))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "path": path,
+        "requests": requests,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "requests_per_sec": round(requests / elapsed, 1),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--delay", type=float, default=0.05, help="seconds per simulated query")
+    args = parser.parse_args()
+
+    engine.echo = False
+    async_engine.echo = False
+    bench_app = build_app(args.delay)
+    results = [
+        await run("/sync", bench_app, args.requests, args.concurrency),
+        await run("/async", bench_app, args.requests, args.concurrency),
+    ]
+    print(json.dumps(results, indent=2))
+
+    await async_engine.dispose()
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
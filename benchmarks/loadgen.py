@@ -0,0 +1,242 @@
+"""
+Scripted load against a running API: login, expense CRUD and /health.
+
+Each of ``--concurrency`` virtual users logs in as one of the accounts made
+by ``benchmarks.seed`` and then loops over operations drawn from ``--mix``
+(weights per operation) until ``--requests`` have been sent in total or
+``--duration`` seconds have passed. Updates and deletes only touch expenses
+the virtual user created itself. Operation choices are driven by ``--seed``
+so two runs send the same traffic.
+
+The report (see benchmarks.report) is printed and optionally written with
+``--output``; ``--baseline`` compares against a saved report and exits 1 on
+a regression beyond ``--tolerance``::
+
+    python -m benchmarks.seed --users 50 --expenses 500
+    python -m benchmarks.loadgen --start-server --concurrency 20 --requests 5000 \\
+        --output current.json --baseline benchmarks/baseline.json
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Optional
+
+import httpx
+
+from app.models import ExpenseCategory
+from benchmarks.report import build_report, compare_reports
+from benchmarks.seed import DEFAULT_PASSWORD, DEFAULT_PREFIX, bench_email
+
+DEFAULT_MIX = {"list": 50, "create": 15, "update": 10, "delete": 10, "health": 10, "login": 5}
+SERVER_START_TIMEOUT = 30.0
+
+
+def parse_mix(spec: str) -> dict[str, int]:
+    """Parse ``list=50,create=15,...``; unknown operations are rejected."""
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"unknown operation {name!r}")
+        mix[name] = int(weight)
+    return mix
+
+
+class Recorder:
+    """Latency samples and error counts per operation."""
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+
+    async def timed(self, name: str, expected: int, send) -> Optional[httpx.Response]:
+        """Time ``send()``; returns the response, or None when it failed or had another status."""
+        start = time.perf_counter()
+        try:
+            resp = await send()
+        except httpx.HTTPError:
+            resp = None
+        self.latencies[name].append(time.perf_counter() - start)
+        if resp is None or resp.status_code != expected:
+            self.errors[name] += 1
+            return None
+        return resp
+
+
+class VirtualUser:
+    def __init__(self, client: httpx.AsyncClient, email: str, password: str, recorder: Recorder, rng: random.Random):
+        self.client = client
+        self.email = email
+        self.password = password
+        self.recorder = recorder
+        self.rng = rng
+        self.headers: dict[str, str] = {}
+        self.owned: list[int] = []
+
+    async def login(self, record: bool = True) -> None:
+        async def send():
+            return await self.client.post("/auth/login", data={"username": self.email, "password": self.password})
+
+        if record:
+            resp = await self.recorder.timed("login", 200, send)
+        else:
+            resp = await send()
+            resp = resp if resp.status_code == 200 else None
+        if resp is not None:
+            self.headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+    def expense_payload(self) -> dict:
+        return {
+            "amount": round(self.rng.uniform(1, 200), 2),
+            "category": self.rng.choice(list(ExpenseCategory)).value,
+            "date": (date.today() - timedelta(days=self.rng.randrange(365))).isoformat(),
+            "description": "load test",
+        }
+
+    async def step(self, operation: str) -> None:
+        if operation in ("update", "delete") and not self.owned:
+            operation = "create"
+        if operation == "login":
+            await self.login()
+        elif operation == "health":
+            await self.recorder.timed("health", 200, lambda: self.client.get("/health"))
+        elif operation == "list":
+            await self.recorder.timed("list", 200, lambda: self.client.get("/expenses/", headers=self.headers))
+        elif operation == "create":
+            resp = await self.recorder.timed("create", 201, lambda: self.client.post(
+                "/expenses/", json=self.expense_payload(), headers=self.headers
+            ))
+            if resp is not None:
+                self.owned.append(resp.json()["id"])
+        elif operation == "update":
+            expense_id = self.rng.choice(self.owned)
+            await self.recorder.timed("update", 200, lambda: self.client.put(
+                f"/expenses/{expense_id}", json=self.expense_payload(), headers=self.headers
+            ))
+        elif operation == "delete":
+            expense_id = self.owned.pop(self.rng.randrange(len(self.owned)))
+            await self.recorder.timed("delete", 204, lambda: self.client.delete(
+                f"/expenses/{expense_id}", headers=self.headers
+            ))
+
+
+async def run_load(args) -> dict:
+    recorder = Recorder()
+    operations, weights = zip(*args.mix.items())
+    budget = {"remaining": args.requests}
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        users = [
+            VirtualUser(client, bench_email(args.prefix, i % args.users), args.password, recorder, random.Random(args.seed + i))
+            for i in range(args.concurrency)
+        ]
+        # Initial logins are setup, not part of the measurement
+        await asyncio.gather(*(user.login(record=False) for user in users))
+        if not all(user.headers for user in users):
+            raise SystemExit(f"login failed; run `python -m benchmarks.seed --users {args.users}` first")
+
+        start = time.perf_counter()
+        deadline = start + args.duration if args.duration else None
+
+        async def drive(user: VirtualUser) -> None:
+            while True:
+                if deadline is not None:
+                    if time.perf_counter() >= deadline:
+                        return
+                elif budget["remaining"] <= 0:
+                    return
+                else:
+                    budget["remaining"] -= 1
+                await user.step(user.rng.choices(operations, weights)[0])
+
+        await asyncio.gather(*(drive(user) for user in users))
+        seconds = time.perf_counter() - start
+
+    config = {
+        "base_url": args.base_url,
+        "concurrency": args.concurrency,
+        "requests": None if args.duration else args.requests,
+        "duration": args.duration,
+        "mix": args.mix,
+        "users": args.users,
+        "seed": args.seed,
+    }
+    return build_report(recorder.latencies, recorder.errors, seconds, config)
+
+
+def start_server(base_url: str, workers: int) -> subprocess.Popen:
+    """Run uvicorn on ``base_url``'s host and port and wait for /health."""
+    url = httpx.URL(base_url)
+    server = subprocess.Popen([
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--host", url.host, "--port", str(url.port or 80),
+        "--workers", str(workers), "--log-level", "warning", "--no-access-log",
+    ])
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise SystemExit(f"uvicorn exited with {server.returncode}")
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1).status_code == 200:
+                return server
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    server.terminate()
+    raise SystemExit("uvicorn did not become healthy in time")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--start-server", action="store_true", help="run uvicorn for the duration of the test")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers with --start-server")
+    parser.add_argument("--concurrency", type=int, default=20, help="virtual users")
+    parser.add_argument("--requests", type=int, default=2000, help="total requests (ignored with --duration)")
+    parser.add_argument("--duration", type=float, default=None, help="run for this many seconds instead")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="e.g. list=50,create=15,update=10")
+    parser.add_argument("--users", type=int, default=100, help="seeded accounts to log in as")
+    parser.add_argument("--prefix", default=DEFAULT_PREFIX)
+    parser.add_argument("--password", default=DEFAULT_PASSWORD)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-request timeout in seconds")
+    parser.add_argument("--output", help="write the report here")
+    parser.add_argument("--baseline", help="compare against this saved report")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed regression as a fraction")
+    args = parser.parse_args()
+
+    server = start_server(args.base_url, args.workers) if args.start_server else None
+    try:
+        report = asyncio.run(run_load(args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_reports(report, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"no regressions against {args.baseline}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
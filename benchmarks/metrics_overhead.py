@@ -0,0 +1,75 @@
+"""
+Per-request cost of MetricsMiddleware.
+
+Calls a trivial routed FastAPI app directly over ASGI (no sockets, no
+database) many times with and without the middleware and reports the
+difference in microseconds per request::
+
+    python -m benchmarks.metrics_overhead --requests 20000
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from fastapi import FastAPI
+
+from app.metrics import MetricsMiddleware
+
+
+def build_app() -> FastAPI:
+    bench_app = FastAPI()
+
+    @bench_app.get("/items/{item_id}")
+    async def item(item_id: int):
+        return {"id": item_id}
+
+    return bench_app
+
+
+async def time_requests(asgi_app, requests: int) -> float:
+    """Seconds to serve ``requests`` GETs through ``asgi_app``."""
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    def scope(i: int) -> dict:
+        return {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": f"/items/{i}", "raw_path": f"/items/{i}".encode(),
+            "query_string": b"", "headers": [], "client": ("127.0.0.1", 1), "server": ("bench", 80),
+        }
+
+    start = time.perf_counter()
+    for i in range(requests):
+        await asgi_app(scope(i), receive, send)
+    return time.perf_counter() - start
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=5, help="best of this many rounds")
+    args = parser.parse_args()
+
+    plain = build_app()
+    instrumented = MetricsMiddleware(build_app())
+    # Warm up routing and the metric series
+    await time_requests(plain, 1000)
+    await time_requests(instrumented, 1000)
+
+    plain_seconds = min([await time_requests(plain, args.requests) for _ in range(args.rounds)])
+    instrumented_seconds = min([await time_requests(instrumented, args.requests) for _ in range(args.rounds)])
+    print(json.dumps({
+        "requests": args.requests,
+        "plain_us_per_request": round(plain_seconds / args.requests * 1e6, 2),
+        "instrumented_us_per_request": round(instrumented_seconds / args.requests * 1e6, 2),
+        "overhead_us_per_request": round((instrumented_seconds - plain_seconds) / args.requests * 1e6, 2),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
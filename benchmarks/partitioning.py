@@ -0,0 +1,161 @@
+"""
+Range-query latency: one heap table vs monthly partitions.
+
+Copies ``expenses`` into two scratch schemas: ``bench_heap.expenses``, laid
+out as before the partitioning migration, and ``bench_partitioned.expenses``,
+partitioned by month as after it, with the same indexes. The app's own query
+builders (list_expenses_query, search_expenses_query) then run against each
+through asyncpg, with ``search_path`` picking the copy, for random users that
+own expenses. Seed data first (see benchmarks.seed); the schemas are dropped
+at the end unless ``--keep``::
+
+    python -m benchmarks.seed --users 1000 --expenses 1000
+    python -m benchmarks.partitioning --repeat 200
+
+Prints p50/p95 milliseconds per query shape and layout as JSON.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.database import ASYNC_DATABASE_URL, engine
+from app.partitions import add_months
+from app.routers.expenses import list_expenses_query, prefix_tsquery, search_expenses_query
+from benchmarks.report import percentile
+
+LAYOUTS = ("bench_heap", "bench_partitioned")
+COLUMNS = "id, amount, description, category, date, created_at, user_id"
+PAGE = 51
+
+
+def query_shapes(today: date) -> dict:
+    """Query name to a builder taking a user id; every list shape is one page of list_expenses."""
+    six_months_ago = add_months(today, -6)
+    nine_months_ago = datetime.combine(add_months(today, -9), dt_time(), timezone.utc)
+    return {
+        "past_week": lambda uid: list_expenses_query(uid, today - timedelta(days=7), today, None, PAGE),
+        "past_month": lambda uid: list_expenses_query(uid, today - timedelta(days=30), today, None, PAGE),
+        "past_3_months": lambda uid: list_expenses_query(uid, today - timedelta(days=90), today, None, PAGE),
+        "one_month_6_months_back": lambda uid: list_expenses_query(
+            uid, six_months_ago, add_months(six_months_ago, 1) - timedelta(days=1), None, PAGE,
+        ),
+        "page_9_months_back": lambda uid: list_expenses_query(uid, None, None, (nine_months_ago, 2**31 - 1), PAGE),
+        "first_page_no_range": lambda uid: list_expenses_query(uid, None, None, None, PAGE),
+        "search_no_range": lambda uid: search_expenses_query(
+            uid, prefix_tsquery("coffee 7"), None, None, None, 20, 0,
+        ),
+    }
+
+
+def build_layouts(connection) -> int:
+    """Create both scratch copies of ``expenses``; returns the rows copied."""
+    for schema in LAYOUTS:
+        connection.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+        connection.execute(text(f"CREATE SCHEMA {schema}"))
+
+    connection.execute(text(
+        "CREATE TABLE bench_heap.expenses (LIKE public.expenses INCLUDING DEFAULTS INCLUDING GENERATED)"
+    ))
+    connection.execute(text("ALTER TABLE bench_heap.expenses ADD PRIMARY KEY (id)"))
+
+    connection.execute(text(
+        "CREATE TABLE bench_partitioned.expenses (LIKE public.expenses INCLUDING DEFAULTS INCLUDING GENERATED) "
+        "PARTITION BY RANGE (date)"
+    ))
+    connection.execute(text("ALTER TABLE bench_partitioned.expenses ADD PRIMARY KEY (id, date)"))
+    connection.execute(text("CREATE TABLE bench_partitioned.expenses_default PARTITION OF bench_partitioned.expenses DEFAULT"))
+    months = connection.scalars(text(
+        "SELECT DISTINCT CAST(date_trunc('month', date AT TIME ZONE 'UTC') AS date) FROM public.expenses"
+    )).all()
+    for month in months:
+        connection.execute(text(
+            f"CREATE TABLE bench_partitioned.expenses_{month:%Y_%m} PARTITION OF bench_partitioned.expenses "
+            f"FOR VALUES FROM ('{month} 00:00+00') TO ('{add_months(month, 1)} 00:00+00')"
+        ))
+
+    copied = 0
+    for schema in LAYOUTS:
+        copied = connection.execute(text(
+            f"INSERT INTO {schema}.expenses ({COLUMNS}) SELECT {COLUMNS} FROM public.expenses"
+        )).rowcount
+        connection.execute(text(
+            f"CREATE INDEX ix_expenses_user_id_date_id ON {schema}.expenses (user_id, date, id) "
+            "INCLUDE (category, amount)"
+        ))
+        connection.execute(text(
+            f"CREATE INDEX ix_expenses_search_vector ON {schema}.expenses USING gin (search_vector)"
+        ))
+    return copied
+
+
+async def time_layout(schema: str, shapes: dict, user_ids: list[int], repeat: int) -> dict:
+    """p50/p95 milliseconds per shape, querying ``schema``.expenses over one connection."""
+    layout_engine = create_async_engine(
+        ASYNC_DATABASE_URL, connect_args={"server_settings": {"search_path": f"{schema}, public"}},
+    )
+    results = {}
+    try:
+        async with layout_engine.connect() as connection:
+            for name, build in shapes.items():
+                # Enough runs for asyncpg's prepared statements to switch to generic plans
+                for user_id in user_ids[:10]:
+                    (await connection.execute(build(user_id))).all()
+                samples = []
+                for i in range(repeat):
+                    statement = build(user_ids[i % len(user_ids)])
+                    start = time.perf_counter()
+                    (await connection.execute(statement)).all()
+                    samples.append((time.perf_counter() - start) * 1000)
+                samples.sort()
+                results[name] = {"p50_ms": round(percentile(samples, 50), 3), "p95_ms": round(percentile(samples, 95), 3)}
+    finally:
+        await layout_engine.dispose()
+    return results
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=200, help="queries per shape and layout")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", action="store_true", help="keep the scratch schemas")
+    parser.add_argument("--reuse", action="store_true", help="time existing scratch schemas without rebuilding")
+    args = parser.parse_args()
+
+    engine.echo = False
+    if not args.reuse:
+        start = time.perf_counter()
+        with engine.begin() as connection:
+            copied = build_layouts(connection)
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            for schema in LAYOUTS:
+                # Sets the visibility map too, so index-only scans are possible on both
+                connection.execute(text(f"VACUUM ANALYZE {schema}.expenses"))
+        print(f"copied {copied} expenses into {', '.join(LAYOUTS)} in {time.perf_counter() - start:.1f}s")
+
+    with engine.connect() as connection:
+        user_ids = connection.scalars(text("SELECT DISTINCT user_id FROM bench_heap.expenses")).all()
+    rng = random.Random(args.seed)
+    rng.shuffle(user_ids)
+
+    shapes = query_shapes(date.today())
+    results = {schema: await time_layout(schema, shapes, user_ids, args.repeat) for schema in LAYOUTS}
+    print(json.dumps({
+        name: {schema: results[schema][name] for schema in LAYOUTS} for name in shapes
+    }, indent=2))
+
+    if not args.keep:
+        with engine.begin() as connection:
+            for schema in LAYOUTS:
+                connection.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
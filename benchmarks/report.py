@@ -0,0 +1,87 @@
+"""
+Latency/throughput summaries for the load generator, and baseline comparison.
+
+A report is plain JSON so it can be saved as a baseline and diffed::
+
+    {"config": {...}, "seconds": 30.0,
+     "total": {"count": ..., "errors": ..., "error_rate": ..., "throughput_rps": ...,
+               "p50_ms": ..., "p95_ms": ..., "p99_ms": ...},
+     "operations": {"list": {...same keys...}, "create": {...}, ...}}
+"""
+
+import math
+from typing import Iterable
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile of already sorted ``samples`` (0.0 when empty)."""
+    if not samples:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(samples)))
+    return samples[min(rank, len(samples)) - 1]
+
+
+def summarize_samples(latencies: Iterable[float], errors: int, seconds: float) -> dict:
+    """
+    Summarize one operation (or all of them).
+
+    :param latencies: Seconds per completed request, errors included.
+    :param errors: Requests that failed or returned an unexpected status.
+    :param seconds: Wall-clock length of the run, for throughput.
+    """
+    ordered = sorted(latencies)
+    count = len(ordered)
+    summary = {
+        "count": count,
+        "errors": errors,
+        "error_rate": round(errors / count, 4) if count else 0.0,
+        "throughput_rps": round(count / seconds, 1) if seconds else 0.0,
+    }
+    for pct in PERCENTILES:
+        summary[f"p{pct}_ms"] = round(percentile(ordered, pct) * 1000, 2)
+    return summary
+
+
+def build_report(latencies: dict[str, list[float]], errors: dict[str, int], seconds: float, config: dict) -> dict:
+    """Per-operation and overall summaries for a finished run."""
+    everything = [sample for samples in latencies.values() for sample in samples]
+    return {
+        "config": config,
+        "seconds": round(seconds, 3),
+        "total": summarize_samples(everything, sum(errors.values()), seconds),
+        "operations": {
+            name: summarize_samples(samples, errors.get(name, 0), seconds)
+            for name, samples in sorted(latencies.items())
+        },
+    }
+
+
+def compare_reports(current: dict, baseline: dict, tolerance: float = 0.1) -> list[str]:
+    """
+    Describe every regression of ``current`` against ``baseline``.
+
+    A regression is a p50/p95/p99 more than ``tolerance`` (a fraction) above
+    the baseline, throughput more than ``tolerance`` below it, or an error rate
+    that went up. Operations missing from either side are skipped.
+
+    :return: One human-readable line per regression; empty when none.
+    """
+    regressions = []
+    sections = {"total": (current.get("total"), baseline.get("total"))}
+    for name, summary in current.get("operations", {}).items():
+        sections[name] = (summary, baseline.get("operations", {}).get(name))
+
+    for name, (now, before) in sections.items():
+        if not now or not before:
+            continue
+        for pct in PERCENTILES:
+            key = f"p{pct}_ms"
+            if before[key] and now[key] > before[key] * (1 + tolerance):
+                regressions.append(f"{name} {key}: {before[key]} -> {now[key]}")
+        if before["throughput_rps"] and now["throughput_rps"] < before["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name} throughput_rps: {before['throughput_rps']} -> {now['throughput_rps']}")
+        if now["error_rate"] > before["error_rate"]:
+            regressions.append(f"{name} error_rate: {before['error_rate']} -> {now['error_rate']}")
+    return regressions
@@ -0,0 +1,112 @@
+"""
+Seed the database with benchmark users and expenses.
+
+Creates ``--users`` accounts named ``<prefix><i>@example.com`` (all with the
+same password) and ``--expenses`` rows for each, spread over the last year,
+then folds them into the daily rollups. Existing accounts with the prefix are
+removed first, so re-running gives the same shape of data every time; the
+amounts, categories and dates come from ``--seed``.
+
+    python -m benchmarks.seed --users 100 --expenses 1000
+"""
+
+import argparse
+import time
+
+from sqlalchemy import Connection, Integer, delete, insert, literal, select, text
+
+from app.models import Expense, User
+from app.rollups import rollup_upsert
+
+DEFAULT_PREFIX = "bench"
+DEFAULT_PASSWORD = "Bench$pass1"
+# Descriptions are two of these plus a number, so full-text search has
+# realistic term frequencies to work with
+DESCRIPTION_WORDS = (
+    "coffee", "lunch", "dinner", "groceries", "market", "rent", "electricity", "internet",
+    "phone", "taxi", "train", "fuel", "parking", "cinema", "concert", "books", "pharmacy",
+    "dentist", "gym", "shoes", "jacket", "laptop", "headphones", "gift", "hotel", "flight",
+)
+
+
+def bench_email(prefix: str, index: int) -> str:
+    return f"{prefix}{index}@example.com"
+
+
+def seed(
+    connection: Connection,
+    users: int,
+    expenses_per_user: int,
+    password_hash: str,
+    prefix: str = DEFAULT_PREFIX,
+    seed_value: float = 0.42,
+) -> list[int]:
+    """
+    Replace the ``prefix`` accounts with fresh ones and their expenses; the caller commits.
+
+    :param password_hash: Stored for every account, so bcrypt runs once per seeding.
+    :param seed_value: Passed to Postgres' setseed() for reproducible rows.
+    :return: The new user ids, in account order.
+    """
+    connection.execute(delete(User).where(User.email.like(f"{prefix}%@example.com")))
+    user_ids = connection.scalars(
+        insert(User).returning(User.id, sort_by_parameter_order=True),
+        [{"email": bench_email(prefix, i), "hashed_password": password_hash} for i in range(users)],
+    ).all()
+    if not user_ids or expenses_per_user <= 0:
+        return list(user_ids)
+
+    connection.execute(select(text("setseed(:seed)")), {"seed": seed_value})
+    connection.execute(
+        text(
+            "INSERT INTO expenses (user_id, amount, description, category, date) "
+            "SELECT u.id, round((random() * 200)::numeric, 2), "
+            "       w.words[1 + floor(random() * cardinality(w.words))::int] || ' ' || "
+            "       w.words[1 + floor(random() * cardinality(w.words))::int] || ' ' || n, "
+            "       (enum_range(NULL::expensecategory))"
+            "           [1 + floor(random() * array_length(enum_range(NULL::expensecategory), 1))::int], "
+            "       (current_date - floor(random() * 365)::int)::timestamptz "
+            "FROM unnest(CAST(:user_ids AS integer[])) AS u(id) "
+            "CROSS JOIN generate_series(1, :per_user) AS n "
+            "CROSS JOIN (SELECT CAST(:words AS text[]) AS words) AS w"
+        ),
+        {"user_ids": list(user_ids), "per_user": expenses_per_user, "words": list(DESCRIPTION_WORDS)},
+    )
+    connection.execute(rollup_upsert(select(
+        Expense.user_id,
+        Expense.date.label("ts"),
+        Expense.category,
+        Expense.amount,
+        literal(1, Integer).label("n"),
+    ).where(Expense.user_id.in_(user_ids)).subquery("changes")))
+    return list(user_ids)
+
+
+def main() -> None:
+    from app.auth import get_password_hash
+    from app.database import engine
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--expenses", type=int, default=1000, help="expenses per user")
+    parser.add_argument("--prefix", default=DEFAULT_PREFIX)
+    parser.add_argument("--password", default=DEFAULT_PASSWORD)
+    parser.add_argument("--seed", type=float, default=0.42, help="random seed in [-1, 1]")
+    args = parser.parse_args()
+
+    engine.echo = False
+    start = time.perf_counter()
+    with engine.begin() as connection:
+        user_ids = seed(connection, args.users, args.expenses, get_password_hash(args.password), args.prefix, args.seed)
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("ANALYZE users, expenses, expense_daily_rollups"))
+    print(
+        f"seeded {len(user_ids)} users x {args.expenses} expenses "
+        f"({bench_email(args.prefix, 0)} .. {bench_email(args.prefix, len(user_ids) - 1)}) "
+        f"in {time.perf_counter() - start:.1f}s"
+    )
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
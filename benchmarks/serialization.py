@@ -0,0 +1,83 @@
+"""
+List-response encoding: per-row ExpenseOut validation vs column tuples + orjson.
+
+Builds ``--rows`` expenses in memory and times both ways of turning them into
+the GET /expenses/ body: the previous path (ORM objects validated into
+ExpenseOut, jsonable_encoder, JSONResponse) and serialize_expense_rows. No
+database is involved; the two bodies are checked to be byte-identical::
+
+    python -m benchmarks.serialization --rows 10000
+"""
+
+import argparse
+import json
+import random
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from app.models import Expense, ExpenseCategory
+from app.routers.expenses import ExpenseOut, serialize_expense_rows
+
+ExpenseRow = namedtuple("ExpenseRow", "id amount category date description")
+
+
+def build_rows(count: int, seed: int = 7) -> list[ExpenseRow]:
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    categories = list(ExpenseCategory)
+    return [
+        ExpenseRow(
+            id=i,
+            amount=round(rng.uniform(1, 500), 2),
+            category=rng.choice(categories),
+            date=start + timedelta(days=rng.randrange(365)),
+            description=f"expense number {i}",
+        )
+        for i in range(count, 0, -1)
+    ]
+
+
+def model_path(expenses: list[Expense]) -> bytes:
+    """What FastAPI did with response_model=List[ExpenseOut] and ORM objects."""
+    validated = TypeAdapter(List[ExpenseOut]).validate_python(expenses, from_attributes=True)
+    return JSONResponse(jsonable_encoder(validated)).body
+
+
+def best_of(rounds: int, func, *args) -> float:
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=5, help="best of this many rounds")
+    args = parser.parse_args()
+
+    rows = build_rows(args.rows)
+    expenses = [Expense(**row._asdict()) for row in rows]
+    assert model_path(expenses) == serialize_expense_rows(rows), "bodies differ"
+
+    model_seconds = best_of(args.rounds, model_path, expenses)
+    fast_seconds = best_of(args.rounds, serialize_expense_rows, rows)
+    print(json.dumps({
+        "rows": args.rows,
+        "model_path_ms": round(model_seconds * 1000, 2),
+        "fast_path_ms": round(fast_seconds * 1000, 2),
+        "speedup": round(model_seconds / fast_seconds, 1),
+        "body_bytes": len(serialize_expense_rows(rows)),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+Spending statistics: NumPy over column arrays vs a pure-Python reference.
+
+Seeds a scratch user with ``--rows`` expenses, then times both ways of
+answering GET /expenses/stats for them, each with its own query:
+
+- ``numpy``: stats_query (one row of arrays) and app.stats.stats_from_row
+- ``python``: every Expense loaded as an ORM object, then reference_stats,
+  which loops over them
+
+The two results are checked to agree before timing. The scratch user is
+deleted at the end::
+
+    python -m benchmarks.stats --rows 100000
+
+Prints best-of-``--rounds`` milliseconds for the query and the computation
+of each way as JSON.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Optional
+
+from sqlalchemy import delete, select, text
+
+from app.database import AsyncSessionLocal, async_engine, engine
+from app.models import Expense, User
+from app.routers.expenses import stats_query
+from app.stats import (
+    FORECAST_DAYS, FORECAST_FIT_DAYS, MAX_OUTLIERS, OUTLIER_MIN_COUNT, OUTLIER_SCORE, PERCENTILES,
+    ROLLING_WINDOWS, MAD_SCALE, MEAN_AD_SCALE, CategoryStats, ExpenseStats, Forecast, MonthStats, Outlier, RollingDay,
+    stats_from_row,
+)
+
+BENCH_EMAIL = "stats-bench@example.com"
+
+
+def quantile(ordered: list[float], pct: float) -> float:
+    """Linearly interpolated percentile of sorted ``ordered``, as numpy.percentile computes it."""
+    position = (len(ordered) - 1) * pct / 100
+    lower = math.floor(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def add_month(month: date) -> date:
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def reference_stats(
+    expenses: list, start_date: Optional[date], end_date: Optional[date], rolling_days: int, today: date,
+) -> ExpenseStats:
+    """compute_stats' results, computed by looping over Expense objects (or rows with the same attributes)."""
+    expense_days = [expense.date.date() for expense in expenses]
+    last = end_date or max([today, *expense_days])
+    first = start_date or min(expense_days, default=last)
+    last = max(last, first)
+    span = (last - first).days + 1
+
+    daily = [0.0] * span
+    for expense, day in zip(expenses, expense_days):
+        daily[(day - first).days] += expense.amount
+    rolling = []
+    for offset in range(max(span - rolling_days, 0), span):
+        averages = []
+        for window in ROLLING_WINDOWS:
+            days = daily[max(offset + 1 - window, 0):offset + 1]
+            averages.append(sum(days) / len(days))
+        rolling.append(RollingDay(
+            day=first + timedelta(days=offset), total=daily[offset],
+            average_7d=averages[0], average_30d=averages[1],
+        ))
+
+    by_amount = defaultdict(list)
+    for expense in expenses:
+        by_amount[expense.category].append(expense.amount)
+    by_category, medians, scales = [], {}, {}
+    for category, amounts in by_amount.items():
+        ordered = sorted(amounts)
+        by_category.append(CategoryStats(
+            category=category.value, count=len(amounts), total=sum(amounts), mean=sum(amounts) / len(amounts),
+            **{f"p{pct}": quantile(ordered, pct) for pct in PERCENTILES},
+        ))
+        medians[category] = quantile(ordered, 50)
+        deviations = [abs(amount - medians[category]) for amount in amounts]
+        mad = quantile(sorted(deviations), 50)
+        scales[category] = MAD_SCALE * mad if mad > 0 else MEAN_AD_SCALE * sum(deviations) / len(deviations)
+    by_category.sort(key=lambda group: group.category)
+
+    month_totals, month_counts = defaultdict(float), defaultdict(int)
+    for expense, day in zip(expenses, expense_days):
+        month_totals[day.replace(day=1)] += expense.amount
+        month_counts[day.replace(day=1)] += 1
+    by_month, month, previous = [], first.replace(day=1), None
+    while month <= last:
+        total = month_totals[month]
+        change = None if previous is None else total - previous
+        change_pct = change / previous * 100 if previous else None
+        by_month.append(MonthStats(
+            month=month, total=total, count=month_counts[month], change=change, change_pct=change_pct,
+        ))
+        month, previous = add_month(month), total
+
+    forecast = None
+    fit_days = min(span, FORECAST_FIT_DAYS)
+    if fit_days >= 2:
+        recent = daily[-fit_days:]
+        mean_x, mean_y = (fit_days - 1) / 2, sum(recent) / fit_days
+        slope = (
+            sum((x - mean_x) * (y - mean_y) for x, y in enumerate(recent))
+            / sum((x - mean_x) ** 2 for x in range(fit_days))
+        )
+        intercept = mean_y - slope * mean_x
+        forecast = Forecast(
+            fit_days=fit_days, horizon_days=FORECAST_DAYS, daily_trend=slope,
+            projected_total=sum(max(intercept + slope * x, 0.0) for x in range(fit_days, fit_days + FORECAST_DAYS)),
+        )
+
+    flagged = []
+    for expense, day in zip(expenses, expense_days):
+        scale = scales[expense.category]
+        score = (expense.amount - medians[expense.category]) / scale if scale > 0 else 0.0
+        if score > OUTLIER_SCORE and len(by_amount[expense.category]) >= OUTLIER_MIN_COUNT:
+            flagged.append((score, expense, day))
+    flagged.sort(key=lambda item: -item[0])
+    outliers = [
+        Outlier(id=expense.id, date=day, category=expense.category.value, amount=expense.amount, score=round(score, 2))
+        for score, expense, day in flagged[:MAX_OUTLIERS]
+    ]
+
+    return ExpenseStats(
+        start_date=first, end_date=last, count=len(expenses), total=sum(expense.amount for expense in expenses),
+        rolling=rolling, by_category=by_category, by_month=by_month, forecast=forecast,
+        outlier_count=len(flagged), outliers=outliers,
+    )
+
+
+def assert_same(left, right, path: str = "") -> None:
+    """Compare two model_dump() results, floats to within rounding error."""
+    if isinstance(left, dict):
+        assert left.keys() == right.keys(), path
+        for key in left:
+            assert_same(left[key], right[key], f"{path}.{key}")
+    elif isinstance(left, list):
+        assert len(left) == len(right), path
+        for index, (a, b) in enumerate(zip(left, right)):
+            assert_same(a, b, f"{path}[{index}]")
+    elif isinstance(left, float) and isinstance(right, float):
+        # Scores are rounded to 0.01, so a rounding error can move them by that much
+        assert math.isclose(left, right, rel_tol=1e-9, abs_tol=0.01 if path.endswith("score") else 1e-6), path
+    else:
+        assert left == right, f"{path}: {left!r} != {right!r}"
+
+
+def seed_user(rows: int) -> int:
+    """A scratch user with ``rows`` expenses spread over the last two years; returns its id."""
+    with engine.begin() as connection:
+        connection.execute(delete(User).where(User.email == BENCH_EMAIL))
+        user_id = connection.scalar(text(
+            "INSERT INTO users (email, hashed_password) VALUES (:email, 'x') RETURNING id"
+        ), {"email": BENCH_EMAIL})
+        connection.execute(text(
+            "INSERT INTO expenses (user_id, amount, description, category, date) "
+            "SELECT :user_id, round((random() * random() * 300)::numeric, 2), 'bench item ' || n, "
+            "       (enum_range(NULL::expensecategory))[1 + n % 7], "
+            "       date_trunc('day', now() - random() * interval '730 days') "
+            "FROM generate_series(1, :rows) n"
+        ), {"user_id": user_id, "rows": rows})
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        # As autovacuum would have by now: sets the visibility map, so the
+        # index-only scan skips the heap
+        connection.execute(text("VACUUM ANALYZE expenses"))
+    return user_id
+
+
+async def fetch_arrays(user_id: int):
+    async with AsyncSessionLocal() as session:
+        return (await session.execute(stats_query(user_id, None, None))).one()
+
+
+async def fetch_objects(user_id: int) -> list:
+    async with AsyncSessionLocal() as session:
+        return (await session.scalars(select(Expense).where(Expense.user_id == user_id))).all()
+
+
+async def best_of(rounds: int, func, *args) -> tuple[float, object]:
+    timings, result = [], None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = func(*args)
+        if asyncio.iscoroutine(result):
+            result = await result
+        timings.append(time.perf_counter() - start)
+    return round(min(timings) * 1000, 2), result
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--rounds", type=int, default=5, help="best of this many rounds")
+    parser.add_argument("--days", type=int, default=90, help="the endpoint's days parameter")
+    args = parser.parse_args()
+
+    engine.echo = async_engine.echo = False
+    user_id = seed_user(args.rows)
+    today = date.today()
+    try:
+        array_query_ms, row = await best_of(args.rounds, fetch_arrays, user_id)
+        numpy_ms, stats = await best_of(args.rounds, stats_from_row, row, None, None, args.days)
+        object_query_ms, expenses = await best_of(args.rounds, fetch_objects, user_id)
+        python_ms, reference = await best_of(args.rounds, reference_stats, expenses, None, None, args.days, today)
+        assert_same(stats.model_dump(), reference.model_dump())
+    finally:
+        with engine.begin() as connection:
+            connection.execute(delete(User).where(User.email == BENCH_EMAIL))
+        await async_engine.dispose()
+        engine.dispose()
+
+    print(json.dumps({
+        "rows": args.rows,
+        "numpy": {"query_ms": array_query_ms, "compute_ms": numpy_ms, "total_ms": round(array_query_ms + numpy_ms, 2)},
+        "python": {"query_ms": object_query_ms, "compute_ms": python_ms, "total_ms": round(object_query_ms + python_ms, 2)},
+        "speedup": round((object_query_ms + python_ms) / (array_query_ms + numpy_ms), 1),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,9 +1,20 @@
+locals {
+  deployment_maximum_percent = 200
+  # Old and new tasks overlap during a deployment
+  max_running_tasks = ceil(var.desired_count * local.deployment_maximum_percent / 100)
+  # One uvicorn process per task, each with its own pool plus the cache
+  # invalidation LISTEN connection. Behind PgBouncer the pool goes through
+  # PgBouncer, but the LISTEN connection still goes to Postgres directly
+  direct_db_connections_per_task = var.db_pgbouncer ? 1 : var.db_pool_size + var.db_max_overflow + 1
+  max_db_connections             = local.max_running_tasks * local.direct_db_connections_per_task
+}
+
 resource "aws_ecs_service" "app" {
   name            = local.repo_sanitized
   cluster         = aws_ecs_cluster.app.id          #Tells ECS which cluster to run in
   task_definition = aws_ecs_task_definition.app.arn #Tells ECS which task definition to use
   launch_type     = "FARGATE"                       # Use Fargate for serverless container management
-  desired_count   = 1                               # Number of tasks to run; scale as needed
+  desired_count   = var.desired_count               # Number of tasks to run; scale as needed
 
   # 3.3.1 Network settings for Fargate (awsvpc)
   network_configuration {
@@ -22,9 +33,17 @@ resource "aws_ecs_service" "app" {
 
   # 3.3.2 Deployment settings (optional tuning)
   deployment_minimum_healthy_percent = 50
-  deployment_maximum_percent         = 200
+  deployment_maximum_percent         = local.deployment_maximum_percent
+
+  # 3.3.3 Refuse to scale past what Postgres will accept directly
+  lifecycle {
+    precondition {
+      condition     = local.max_db_connections <= var.db_connection_budget
+      error_message = "desired_count x (db_pool_size + db_max_overflow + 1), or x 1 with db_pgbouncer, doubled during deployments, exceeds db_connection_budget."
+    }
+  }
 
-  # 3.3.3 Ensure IAM exec role is ready first
+  # 3.3.4 Ensure IAM exec role is ready first
   depends_on = [
     aws_iam_role_policy_attachment.ecs_task_exec_attach
   ]
@@ -51,6 +51,14 @@ resource "aws_ecs_task_definition" "app" {
           protocol      = "tcp"
         }
       ]
+      # Connection pool per task; see the budget check in ecs-service.tf
+      environment = [
+        { name = "DB_POOL_SIZE", value = tostring(var.db_pool_size) },
+        { name = "DB_MAX_OVERFLOW", value = tostring(var.db_max_overflow) },
+        { name = "DB_POOL_WARMUP", value = tostring(var.db_pool_warmup) },
+        { name = "DB_STATEMENT_TIMEOUT_MS", value = tostring(var.db_statement_timeout_ms) },
+        { name = "DB_PGBOUNCER", value = tostring(var.db_pgbouncer) },
+      ]
       logConfiguration = {
         logDriver = "awslogs"
         options = {
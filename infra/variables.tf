@@ -72,3 +72,46 @@ variable "ACCESS_TOKEN_EXPIRE_MINUTES" {
 #   description = "The ID of the public Route 53 Hosted Zone (e.g. Z123ABC4DEF567)"
 #   type        = string
 # }
+
+# Service size and database connection budget
+variable "desired_count" {
+  description = "Number of ECS tasks to run"
+  type        = number
+  default     = 1
+}
+
+variable "db_pool_size" {
+  description = "Persistent DB connections per task (DB_POOL_SIZE)"
+  type        = number
+  default     = 5
+}
+
+variable "db_max_overflow" {
+  description = "Extra DB connections a task may open under load (DB_MAX_OVERFLOW)"
+  type        = number
+  default     = 10
+}
+
+variable "db_pool_warmup" {
+  description = "DB connections opened at startup, before taking traffic (DB_POOL_WARMUP)"
+  type        = number
+  default     = 2
+}
+
+variable "db_statement_timeout_ms" {
+  description = "Statement timeout in milliseconds, 0 for none (DB_STATEMENT_TIMEOUT_MS)"
+  type        = number
+  default     = 0
+}
+
+variable "db_pgbouncer" {
+  description = "Connect through PgBouncer in transaction pooling mode (DB_PGBOUNCER)"
+  type        = bool
+  default     = false
+}
+
+variable "db_connection_budget" {
+  description = "Connections the app may hold in total; Postgres max_connections minus admin/migration headroom"
+  type        = number
+  default     = 80
+}
@@ -4,12 +4,9 @@ from logging.config import fileConfig
 from sqlalchemy import engine_from_config, pool
 from alembic import context
 
-# 1) Load .env so that DATABASE_URL is available
-from dotenv import load_dotenv
-load_dotenv()
-
-# 2) Import your Base.metadata and DATABASE_URL
+# 1) Import your Base.metadata and DATABASE_URL (app.config loads .env)
 from app.models import Base
+from app.partitions import is_expense_partition
 from app.database import DATABASE_URL
 
 # this is the Alembic Config object, which provides
@@ -28,6 +25,12 @@ config.set_main_option("sqlalchemy.url", DATABASE_URL)
 # target_metadata = mymodel.Base.metadata
 target_metadata = Base.metadata
 
+
+def include_object(object, name, type_, reflected, compare_to):
+    """Leave the monthly expenses partitions (created at runtime, see app.partitions) out of autogenerate."""
+    return not (type_ == "table" and reflected and compare_to is None and is_expense_partition(name))
+
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -50,6 +53,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -73,7 +77,7 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata, include_object=include_object
         )
 
         with context.begin_transaction():
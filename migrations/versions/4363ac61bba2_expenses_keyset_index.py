@@ -0,0 +1,28 @@
+"""expenses keyset index
+
+Revision ID: 4363ac61bba2
+Revises: 81fd446c1ade
+Create Date: 2026-10-18 09:12:41.208733
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4363ac61bba2'
+down_revision: Union[str, None] = '81fd446c1ade'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_expenses_user_id_date_id', 'expenses', ['user_id', 'date', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_expenses_user_id_date_id', table_name='expenses')
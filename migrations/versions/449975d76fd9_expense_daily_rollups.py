@@ -0,0 +1,43 @@
+"""expense daily rollups
+
+Revision ID: 449975d76fd9
+Revises: 4363ac61bba2
+Create Date: 2026-10-18 11:47:05.613920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '449975d76fd9'
+down_revision: Union[str, None] = '4363ac61bba2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('expense_daily_rollups',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('category', postgresql.ENUM('GROCERIES', 'LEISURE', 'ELECTRONICS', 'UTILITIES', 'CLOTHING', 'HEALTH', 'OTHERS', name='expensecategory', create_type=False), nullable=False),
+    sa.Column('total', sa.Float(), server_default='0', nullable=False),
+    sa.Column('count', sa.Integer(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'day', 'category')
+    )
+    # Backfill from existing expenses (same bucketing as app.rollups.rebuild_rollups)
+    op.execute(
+        "INSERT INTO expense_daily_rollups (user_id, day, category, total, count) "
+        "SELECT user_id, CAST(date AS DATE), category, sum(amount), count(*) "
+        "FROM expenses GROUP BY user_id, CAST(date AS DATE), category"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('expense_daily_rollups')
@@ -0,0 +1,39 @@
+"""index audit
+
+Revision ID: 9e1b7c3d5a20
+Revises: c58f0bf289ac
+Create Date: 2026-10-18 14:21:07.512904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e1b7c3d5a20'
+down_revision: Union[str, None] = 'c58f0bf289ac'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Duplicates of the primary keys, and a prefix of the composite index
+    op.drop_index('ix_users_id', table_name='users')
+    op.drop_index('ix_expenses_id', table_name='expenses')
+    op.drop_index('ix_expenses_user_id', table_name='expenses')
+    # Cover the summary/export columns so those reads can stay index-only
+    op.drop_index('ix_expenses_user_id_date_id', table_name='expenses')
+    op.create_index('ix_expenses_user_id_date_id', 'expenses', ['user_id', 'date', 'id'], unique=False,
+                    postgresql_include=['category', 'amount'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_expenses_user_id_date_id', table_name='expenses')
+    op.create_index('ix_expenses_user_id_date_id', 'expenses', ['user_id', 'date', 'id'], unique=False)
+    op.create_index('ix_expenses_user_id', 'expenses', ['user_id'], unique=False)
+    op.create_index('ix_expenses_id', 'expenses', ['id'], unique=False)
+    op.create_index('ix_users_id', 'users', ['id'], unique=False)
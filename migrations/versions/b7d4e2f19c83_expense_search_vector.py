@@ -0,0 +1,37 @@
+"""expense search vector
+
+Revision ID: b7d4e2f19c83
+Revises: 9e1b7c3d5a20
+Create Date: 2026-10-18 16:02:44.183520
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d4e2f19c83'
+down_revision: Union[str, None] = '9e1b7c3d5a20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # A stored generated column rewrites the table once, under an exclusive lock
+    op.add_column('expenses', sa.Column(
+        'search_vector', postgresql.TSVECTOR(),
+        sa.Computed("to_tsvector('english', coalesce(description, ''))", persisted=True),
+        nullable=True,
+    ))
+    op.create_index('ix_expenses_search_vector', 'expenses', ['search_vector'], unique=False,
+                    postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_expenses_search_vector', table_name='expenses', postgresql_using='gin')
+    op.drop_column('expenses', 'search_vector')
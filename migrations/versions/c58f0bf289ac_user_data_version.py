@@ -0,0 +1,28 @@
+"""user data version
+
+Revision ID: c58f0bf289ac
+Revises: 449975d76fd9
+Create Date: 2026-10-18 13:02:19.440158
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c58f0bf289ac'
+down_revision: Union[str, None] = '449975d76fd9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('data_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'data_version')
@@ -0,0 +1,146 @@
+"""partition expenses by month
+
+Revision ID: d3a8f5c20e17
+Revises: b7d4e2f19c83
+Create Date: 2026-10-18 19:12:36.402158
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3a8f5c20e17'
+down_revision: Union[str, None] = 'b7d4e2f19c83'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Months created past the current one (EXPENSE_PARTITION_MONTHS_AHEAD's default)
+MONTHS_AHEAD = 3
+
+COLUMNS = "id, amount, description, category, date, created_at, user_id"
+
+# Same definition as app.partitions.ENSURE_PARTITIONS_FUNCTION
+ENSURE_PARTITIONS_FUNCTION = """
+CREATE OR REPLACE FUNCTION ensure_expense_partitions(first_month date, last_month date)
+RETURNS integer
+LANGUAGE plpgsql AS $$
+DECLARE
+    month date := date_trunc('month', first_month);
+    lower_bound timestamptz;
+    upper_bound timestamptz;
+    partition_name text;
+    created integer := 0;
+BEGIN
+    -- Every worker runs this at startup; let one at a time through
+    PERFORM pg_advisory_xact_lock(hashtext('ensure_expense_partitions'));
+    WHILE month <= last_month LOOP
+        partition_name := 'expenses_' || to_char(month, 'YYYY_MM');
+        IF to_regclass(partition_name) IS NULL THEN
+            lower_bound := month::timestamp AT TIME ZONE 'UTC';
+            upper_bound := (month + interval '1 month')::timestamp AT TIME ZONE 'UTC';
+            -- Build the partition detached, moving in the month's rows from the
+            -- default partition, so attaching it only takes a brief lock
+            EXECUTE format(
+                'CREATE TABLE %I (LIKE expenses INCLUDING DEFAULTS INCLUDING GENERATED)', partition_name
+            );
+            EXECUTE format(
+                'WITH moved AS ('
+                '  DELETE FROM expenses_default WHERE date >= $1 AND date < $2'
+                '  RETURNING id, amount, description, category, date, created_at, user_id'
+                ') INSERT INTO %I (id, amount, description, category, date, created_at, user_id) '
+                'SELECT * FROM moved', partition_name
+            ) USING lower_bound, upper_bound;
+            EXECUTE format(
+                'ALTER TABLE expenses ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                partition_name, lower_bound, upper_bound
+            );
+            created := created + 1;
+        END IF;
+        month := month + interval '1 month';
+    END LOOP;
+    RETURN created;
+END
+$$
+"""
+
+
+def create_expenses_table(*args, **kw) -> None:
+    op.create_table('expenses',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('expenses_id_seq'::regclass)"), nullable=False),
+    sa.Column('amount', sa.Float(), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('category', postgresql.ENUM('GROCERIES', 'LEISURE', 'ELECTRONICS', 'UTILITIES', 'CLOTHING', 'HEALTH', 'OTHERS', name='expensecategory', create_type=False), nullable=False),
+    sa.Column('date', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('search_vector', postgresql.TSVECTOR(),
+              sa.Computed("to_tsvector('english', coalesce(description, ''))", persisted=True), nullable=True),
+    # Named explicitly: with the old table's expenses_user_id_fkey still
+    # around, Postgres would pick expenses_user_id_fkey1
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], name='expenses_user_id_fkey', ondelete='CASCADE'),
+    *args,
+    **kw,
+    )
+
+
+def create_expenses_indexes() -> None:
+    op.create_index('ix_expenses_user_id_date_id', 'expenses', ['user_id', 'date', 'id'], unique=False,
+                    postgresql_include=['category', 'amount'])
+    op.create_index('ix_expenses_search_vector', 'expenses', ['search_vector'], unique=False,
+                    postgresql_using='gin')
+
+
+def set_aside_old_table(name: str) -> None:
+    """Rename ``expenses`` and its indexes out of the way; the id sequence stays, unowned."""
+    op.execute(f"ALTER TABLE expenses RENAME TO {name}")
+    op.execute(f"ALTER TABLE {name} RENAME CONSTRAINT expenses_pkey TO {name}_pkey")
+    op.execute(f"ALTER INDEX ix_expenses_user_id_date_id RENAME TO ix_{name}_user_id_date_id")
+    op.execute(f"ALTER INDEX ix_expenses_search_vector RENAME TO ix_{name}_search_vector")
+    op.execute("ALTER SEQUENCE expenses_id_seq OWNED BY NONE")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Copy-and-swap: writes to expenses are blocked until this commits
+    set_aside_old_table('expenses_heap')
+    create_expenses_table(
+        sa.PrimaryKeyConstraint('id', 'date', name='expenses_pkey'),
+        postgresql_partition_by='RANGE (date)',
+    )
+    op.execute("CREATE TABLE expenses_default PARTITION OF expenses DEFAULT")
+    op.execute(ENSURE_PARTITIONS_FUNCTION)
+    # A partition for every month holding rows, plus the next few; both are
+    # still empty, so nothing has to move out of the default partition
+    op.execute(
+        "SELECT ensure_expense_partitions(month, month) FROM ("
+        "  SELECT DISTINCT CAST(date_trunc('month', date AT TIME ZONE 'UTC') AS date) AS month FROM expenses_heap"
+        ") months"
+    )
+    op.execute(
+        f"SELECT ensure_expense_partitions(current_date, CAST(current_date + interval '{MONTHS_AHEAD} months' AS date))"
+    )
+    # Load before indexing: one index build per partition beats row-by-row maintenance
+    op.execute(f"INSERT INTO expenses ({COLUMNS}) SELECT {COLUMNS} FROM expenses_heap")
+    create_expenses_indexes()
+    op.execute("ALTER SEQUENCE expenses_id_seq OWNED BY expenses.id")
+    op.drop_table('expenses_heap')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER TABLE expenses RENAME TO expenses_partitioned")
+    op.execute("ALTER INDEX expenses_pkey RENAME TO expenses_partitioned_pkey")
+    op.execute("ALTER INDEX ix_expenses_user_id_date_id RENAME TO ix_expenses_partitioned_user_id_date_id")
+    op.execute("ALTER INDEX ix_expenses_search_vector RENAME TO ix_expenses_partitioned_search_vector")
+    op.execute("ALTER SEQUENCE expenses_id_seq OWNED BY NONE")
+    create_expenses_table(sa.PrimaryKeyConstraint('id', name='expenses_pkey'))
+    op.execute(f"INSERT INTO expenses ({COLUMNS}) SELECT {COLUMNS} FROM expenses_partitioned")
+    create_expenses_indexes()
+    op.execute("ALTER SEQUENCE expenses_id_seq OWNED BY expenses.id")
+    # Drops every partition with it
+    op.drop_table('expenses_partitioned')
+    op.execute("DROP FUNCTION ensure_expense_partitions")
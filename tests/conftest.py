@@ -4,11 +4,13 @@ import os
 from dotenv import load_dotenv
 import pytest
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from fastapi.testclient import TestClient
 
 from app.main import app
-from app.database import get_db
+from app.database import get_async_db, get_async_sessionmaker, get_db
 from app.models import Base   # your declarative_base()
 
 # 1) Load .env so we pick up POSTGRES_USER, etc.
@@ -27,6 +29,7 @@ DATABASE_URL = (
     f"{POSTGRES_PORT}/"
     f"{POSTGRES_DB}"
 )
+ASYNC_DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
 
 
 # 2) Create a SQLAlchemy engine pointing at your Dockerized Postgres
@@ -38,6 +41,13 @@ def engine():
     )
 
 
+# Async engine for the routers. NullPool because every TestClient runs its own
+# event loop and asyncpg connections cannot be shared across loops.
+@pytest.fixture(scope="session")
+def async_engine():
+    return create_async_engine(ASYNC_DATABASE_URL, poolclass=NullPool)
+
+
 # 3) Drop & recreate all tables once before any tests run
 @pytest.fixture(scope="session", autouse=True)
 def setup_database(engine):
@@ -60,16 +70,40 @@ def db_session(engine):
         session.close()
 
 
-# 5) Override FastAPI’s get_db and give a TestClient that uses it
+# 5) Override FastAPI’s get_db/get_async_db and give a TestClient that uses them
 @pytest.fixture
-def client(db_session, monkeypatch):
+def client(db_session, async_engine, monkeypatch):
     def override_get_db():
         try:
             yield db_session
         finally:
             db_session.rollback()  # roll back after each request
 
+    AsyncTestingSession = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with AsyncTestingSession() as session:
+            try:
+                yield session
+            finally:
+                await session.rollback()  # roll back after each request
+
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_async_sessionmaker] = lambda: AsyncTestingSession
     with TestClient(app) as c:
         yield c
     app.dependency_overrides.clear()
+
+
+# 6) Sign up and log in as any user: auth_headers(email, password) returns
+#    the Authorization header for their bearer token
+def _login_headers(client, email, password):
+    client.post("/auth/signup", json={"email": email, "password": password})
+    token = client.post("/auth/login", data={"username": email, "password": password}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def auth_headers(client):
+    return lambda email, password: _login_headers(client, email, password)
@@ -50,3 +50,99 @@ def test_login_returns_jwt_and_expires(client):
     assert isinstance(data["access_token"], str) and data["access_token"]
     assert data.get("token_type") == "bearer"
     assert "expires_at" in data
+
+
+def test_login_rehashes_outdated_cost_factor(client, db_session):
+    from passlib.context import CryptContext
+    from app.auth import BCRYPT_ROUNDS
+
+    # 1) Insert a user whose hash was made with a different cost factor
+    email = "erin@example.com"
+    password = "Rehash$Me5"
+    old_rounds = 4 if BCRYPT_ROUNDS != 4 else 5
+    old_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=old_rounds).hash(password)
+    db_session.add(User(email=email, hashed_password=old_hash))
+    db_session.commit()
+
+    # 2) Logging in still works and swaps in a hash at the configured cost
+    response = client.post("/auth/login", data={"username": email, "password": password})
+    assert response.status_code == 200
+
+    db_session.expire_all()
+    new_hash = db_session.query(User).filter_by(email=email).first().hashed_password
+    assert new_hash != old_hash
+    assert new_hash.split("$")[2] == f"{BCRYPT_ROUNDS:02d}"
+
+
+def test_login_sheds_load_when_hash_pool_is_full(client, monkeypatch):
+    import app.auth
+
+    email = "frank@example.com"
+    password = "Busy$Pool6"
+    client.post("/auth/signup", json={"email": email, "password": password})
+
+    # Pretend every worker and queue slot is already taken
+    monkeypatch.setattr(app.auth, "_hash_pending", app.auth.PASSWORD_HASH_WORKERS + app.auth.PASSWORD_HASH_QUEUE_LIMIT)
+    response = client.post("/auth/login", data={"username": email, "password": password})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(app.auth.PASSWORD_HASH_RETRY_AFTER)
+
+
+def test_duplicate_signup_skips_the_hash_pool(client, monkeypatch):
+    import app.auth
+    from app.metrics import password_hash_duration
+
+    body = {"email": "yusuf@example.com", "password": "Twice$Over9"}
+    assert client.post("/auth/signup", json=body).status_code == 201
+
+    # Even with the pool full, a taken email is a 400 and hashes nothing
+    hashes_before = password_hash_duration.count("hash")
+    monkeypatch.setattr(app.auth, "_hash_pending", app.auth.PASSWORD_HASH_WORKERS + app.auth.PASSWORD_HASH_QUEUE_LIMIT)
+    response = client.post("/auth/signup", json=body)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Email already registered"
+    assert password_hash_duration.count("hash") == hashes_before
+
+
+def test_repeated_requests_hit_token_cache(client, auth_headers):
+    headers = auth_headers("grace@example.com", "Cache$Hit7")
+
+    before = client.get("/health/token-cache").json()
+    assert client.get("/expenses/", headers=headers).status_code == 200
+    assert client.get("/expenses/", headers=headers).status_code == 200
+    after = client.get("/health/token-cache").json()
+
+    # First request resolves the token, the second is served from the cache
+    assert after["misses"] == before["misses"] + 1
+    assert after["hits"] == before["hits"] + 1
+
+
+def test_deleted_user_token_is_invalidated(client, db_session, auth_headers):
+    headers = auth_headers("heidi@example.com", "Gone$Soon8")
+    assert client.get("/expenses/", headers=headers).status_code == 200
+
+    db_session.delete(db_session.query(User).filter_by(email="heidi@example.com").first())
+    db_session.commit()
+
+    assert client.get("/expenses/", headers=headers).status_code == 401
+
+
+def test_token_cache_respects_exp_and_maxsize():
+    import time
+    from app.token_cache import Principal, TokenCache
+
+    cache = TokenCache(maxsize=2, ttl=300)
+    alice = Principal(id=1, email="a@example.com")
+
+    # A token past its exp is never served, whatever the TTL says
+    cache.put("expired", {"exp": time.time() - 1}, alice)
+    assert cache.get("expired") is None
+
+    # Least recently used entry goes first once maxsize is exceeded
+    cache.put("t1", {}, alice)
+    cache.put("t2", {}, alice)
+    assert cache.get("t1") == alice
+    cache.put("t3", {}, alice)
+    assert cache.get("t2") is None
+    assert cache.get("t1") == alice
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,55 @@
+# tests/test_benchmarks.py
+
+from sqlalchemy import func, select
+
+from app.models import Expense, User
+from app.rollups import find_rollup_mismatches
+from benchmarks.report import build_report, compare_reports, percentile
+from benchmarks.seed import seed
+
+
+def test_percentile_nearest_rank():
+    samples = sorted(float(i) for i in range(1, 101))
+    assert percentile(samples, 50) == 50.0
+    assert percentile(samples, 95) == 95.0
+    assert percentile(samples, 99) == 99.0
+    assert percentile([0.2], 99) == 0.2
+    assert percentile([], 50) == 0.0
+
+
+def test_report_and_baseline_comparison():
+    baseline = build_report(
+        {"list": [0.01] * 90 + [0.05] * 10, "create": [0.02] * 10},
+        {"create": 1},
+        seconds=2.0,
+        config={},
+    )
+    assert baseline["operations"]["list"]["p50_ms"] == 10.0
+    assert baseline["operations"]["list"]["p95_ms"] == 50.0
+    assert baseline["operations"]["create"]["error_rate"] == 0.1
+    assert baseline["total"]["count"] == 110
+    assert baseline["total"]["throughput_rps"] == 55.0
+
+    assert compare_reports(baseline, baseline) == []
+
+    slower = build_report(
+        {"list": [0.03] * 100, "create": [0.02] * 10},
+        {"create": 1},
+        seconds=2.0,
+        config={},
+    )
+    regressions = compare_reports(slower, baseline, tolerance=0.1)
+    assert "list p50_ms: 10.0 -> 30.0" in regressions
+    assert not any(line.startswith("create") for line in regressions)
+
+
+def test_seed_is_repeatable(engine):
+    with engine.begin() as connection:
+        first = seed(connection, users=3, expenses_per_user=10, password_hash="x", prefix="seedtest")
+        second = seed(connection, users=3, expenses_per_user=10, password_hash="x", prefix="seedtest")
+        assert len(second) == 3
+        assert connection.scalar(select(func.count()).where(User.id.in_(first))) == 0
+        assert connection.scalar(select(func.count()).where(Expense.user_id.in_(second))) == 30
+        for user_id in second:
+            assert find_rollup_mismatches(connection, user_id) == []
+        connection.execute(User.__table__.delete().where(User.id.in_(second)))
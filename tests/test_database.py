@@ -0,0 +1,69 @@
+# tests/test_database.py
+
+import asyncio
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app import database
+from app.database import engine_options, warm_up_pool
+from app.metrics import InstrumentedAsyncQueuePool
+from tests.conftest import ASYNC_DATABASE_URL
+
+
+def test_pooled_profile(monkeypatch):
+    monkeypatch.setattr(database, "DB_STATEMENT_TIMEOUT_MS", 5000)
+    options = engine_options(async_driver=True, pgbouncer=False)
+    assert options["poolclass"] is InstrumentedAsyncQueuePool
+    assert options["pool_size"] == database.DB_POOL_SIZE
+    assert options["pool_recycle"] == database.DB_POOL_RECYCLE
+    assert options["connect_args"] == {"server_settings": {"statement_timeout": "5000"}}
+    assert engine_options(async_driver=False, pgbouncer=False)["connect_args"] == {
+        "options": "-c statement_timeout=5000"
+    }
+
+
+def test_pgbouncer_profile_runs_without_statement_reuse():
+    options = engine_options(async_driver=True, pgbouncer=True)
+    assert options["poolclass"] is NullPool
+    assert "pool_size" not in options
+    assert options["connect_args"]["statement_cache_size"] == 0
+    assert options["connect_args"]["prepared_statement_cache_size"] == 0
+
+    async def run():
+        bouncer_engine = create_async_engine(ASYNC_DATABASE_URL, **options)
+        try:
+            async with bouncer_engine.connect() as conn:
+                # The same statement twice must get two distinct prepared names
+                first = await conn.scalar(text("SELECT :n + 1"), {"n": 1})
+                second = await conn.scalar(text("SELECT :n + 1"), {"n": 2})
+        finally:
+            await bouncer_engine.dispose()
+        return first, second
+
+    assert asyncio.run(run()) == (2, 3)
+
+
+def test_warm_up_fills_pool():
+    async def run():
+        pooled = create_async_engine(ASYNC_DATABASE_URL, poolclass=InstrumentedAsyncQueuePool, pool_size=3)
+        try:
+            opened = await warm_up_pool(pooled, connections=5)
+            return opened, pooled.pool.checkedin(), pooled.pool.checkedout()
+        finally:
+            await pooled.dispose()
+
+    # Capped at pool_size, all returned to the pool ready for use
+    assert asyncio.run(run()) == (3, 3, 0)
+
+
+def test_warm_up_skipped_without_pool():
+    async def run():
+        unpooled = create_async_engine(ASYNC_DATABASE_URL, poolclass=NullPool)
+        try:
+            return await warm_up_pool(unpooled, connections=5)
+        finally:
+            await unpooled.dispose()
+
+    assert asyncio.run(run()) == 0
@@ -5,27 +5,19 @@ from datetime import date, timedelta
 
 
 @pytest.fixture
-def auth_headers(client):
+def dave_headers(auth_headers):
     # Sign up & log in to get a JWT for “dave@example.com”
-    email = "dave@example.com"
-    password = "Password!4"
-    client.post("/auth/signup", json={"email": email, "password": password})
-    login_resp = client.post(
-        "/auth/login",
-        data={"username": email, "password": password},
-    )
-    token = login_resp.json()["access_token"]
-    return {"Authorization": f"Bearer {token}"}
+    return auth_headers("dave@example.com", "Password!4")
 
 
-def test_create_expense(client, auth_headers):
+def test_create_expense(client, dave_headers):
     payload = {
         "amount": 100.0,
         "category": "Groceries",
         "date": str(date.today()),
         "description": "Test expense"
     }
-    resp = client.post("/expenses/", json=payload, headers=auth_headers)
+    resp = client.post("/expenses/", json=payload, headers=dave_headers)
     assert resp.status_code == 201, resp.text
 
     data = resp.json()
@@ -35,8 +27,8 @@ def test_create_expense(client, auth_headers):
     assert isinstance(data["id"], int)
 
 
-def test_list_expenses(client, auth_headers):
-    resp = client.get("/expenses/", headers=auth_headers)
+def test_list_expenses(client, dave_headers):
+    resp = client.get("/expenses/", headers=dave_headers)
     assert resp.status_code == 200, resp.text
 
     data = resp.json()
@@ -48,14 +40,14 @@ def test_list_expenses(client, auth_headers):
         assert field in first
 
 
-def test_update_expense(client, auth_headers):
+def test_update_expense(client, dave_headers):
     # Create a fresh expense
     create = client.post("/expenses/", json={
         "amount": 50.0,
         "category": "Utilities",
         "date": str(date.today()),
         "description": "Original"
-    }, headers=auth_headers)
+    }, headers=dave_headers)
     eid = create.json()["id"]
 
     # Update it
@@ -64,7 +56,7 @@ def test_update_expense(client, auth_headers):
         "category": "Utilities",
         "date": str(date.today()),
         "description": "Updated"
-    }, headers=auth_headers)
+    }, headers=dave_headers)
     assert updated.status_code == 200, updated.text
 
     data = updated.json()
@@ -73,27 +65,27 @@ def test_update_expense(client, auth_headers):
     assert data["description"] == "Updated"
 
 
-def test_delete_expense(client, auth_headers):
+def test_delete_expense(client, dave_headers):
     # Create another expense
     create = client.post("/expenses/", json={
         "amount": 20.0,
         "category": "Leisure",
         "date": str(date.today()),
         "description": "To be deleted"
-    }, headers=auth_headers)
+    }, headers=dave_headers)
     eid = create.json()["id"]
 
     # Delete it
-    delete = client.delete(f"/expenses/{eid}", headers=auth_headers)
+    delete = client.delete(f"/expenses/{eid}", headers=dave_headers)
     assert delete.status_code == 204
 
     # Confirm it's gone
-    all_expenses = client.get("/expenses/", headers=auth_headers).json()
+    all_expenses = client.get("/expenses/", headers=dave_headers).json()
     ids = [e["id"] for e in all_expenses]
     assert eid not in ids
 
 
-def test_filter_expenses_by_period(client, auth_headers):
+def test_filter_expenses_by_period(client, dave_headers):
     # Create one recent and one older expense
     today = date.today()
     old_date = today - timedelta(days=10)
@@ -102,16 +94,16 @@ def test_filter_expenses_by_period(client, auth_headers):
         "category": "Health",
         "date": str(today),
         "description": "Recent"
-    }, headers=auth_headers)
+    }, headers=dave_headers)
     resp2 = client.post("/expenses/", json={
         "amount": 6.0,
         "category": "Health",
         "date": str(old_date),
         "description": "Old"
-    }, headers=auth_headers)
+    }, headers=dave_headers)
 
     # Filter for past_week (7 days)
-    filtered = client.get("/expenses/?period=past_week", headers=auth_headers)
+    filtered = client.get("/expenses/?period=past_week", headers=dave_headers)
     assert filtered.status_code == 200
     data = filtered.json()
     assert all(
@@ -120,7 +112,7 @@ def test_filter_expenses_by_period(client, auth_headers):
     )
 
 
-def test_filter_expenses_by_custom_range(client, auth_headers):
+def test_filter_expenses_by_custom_range(client, dave_headers):
     # Create one today and one far in the past
     today = date.today()
     far_date = today - timedelta(days=30)
@@ -129,18 +121,395 @@ def test_filter_expenses_by_custom_range(client, auth_headers):
         "category": "Others",
         "date": str(today),
         "description": "In range"
-    }, headers=auth_headers)
+    }, headers=dave_headers)
     resp2 = client.post("/expenses/", json={
         "amount": 8.0,
         "category": "Others",
         "date": str(far_date),
         "description": "Out of range"
-    }, headers=auth_headers)
+    }, headers=dave_headers)
 
     # Custom filter: only today
     query = f"/expenses/?start_date={today.isoformat()}&end_date={today.isoformat()}"
-    filtered = client.get(query, headers=auth_headers)
+    filtered = client.get(query, headers=dave_headers)
     assert filtered.status_code == 200
     data = filtered.json()
     # Every returned item must have date == today
     assert all(e["date"] == today.isoformat() for e in data)
+
+
+def test_list_expenses_keyset_pagination(client, auth_headers):
+    # A fresh user so other tests' expenses do not shift the pages
+    email, password = "ivan@example.com", "Pages$9"
+    headers = auth_headers(email, password)
+
+    today = date.today()
+    # Two expenses share a date so the id tie-breaker is exercised
+    for days_ago in (0, 1, 1, 3, 4):
+        client.post("/expenses/", json={
+            "amount": 1.0,
+            "category": "Others",
+            "date": str(today - timedelta(days=days_ago)),
+        }, headers=headers)
+
+    seen, cursor = [], None
+    while True:
+        url = "/expenses/?limit=2" + (f"&cursor={cursor}" if cursor else "")
+        page = client.get(url, headers=headers)
+        assert page.status_code == 200, page.text
+        assert len(page.json()) <= 2
+        seen.extend(page.json())
+        cursor = page.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+
+    assert len(seen) == 5
+    assert len({e["id"] for e in seen}) == 5
+    keys = [(e["date"], e["id"]) for e in seen]
+    assert keys == sorted(keys, reverse=True)
+
+
+def test_list_expenses_rejects_bad_cursor(client, dave_headers):
+    resp = client.get("/expenses/?cursor=not-a-cursor", headers=dave_headers)
+    assert resp.status_code == 400
+
+
+def test_export_expenses_ndjson_and_csv(client, auth_headers):
+    import csv
+    import io
+    import json
+
+    email, password = "judy@example.com", "Export$10"
+    headers = auth_headers(email, password)
+
+    today = date.today()
+    for days_ago, description in ((0, "Recent, with comma"), (2, "Also recent"), (40, "Old")):
+        client.post("/expenses/", json={
+            "amount": 12.5,
+            "category": "Leisure",
+            "date": str(today - timedelta(days=days_ago)),
+            "description": description,
+        }, headers=headers)
+
+    # NDJSON: one ExpenseOut-shaped object per line, newest first
+    resp = client.get("/expenses/export?format=ndjson", headers=headers)
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in resp.text.splitlines()]
+    assert [r["description"] for r in rows] == ["Recent, with comma", "Also recent", "Old"]
+    assert rows[0] == {**rows[0], "amount": 12.5, "category": "Leisure", "date": today.isoformat()}
+
+    # CSV: header plus the rows the period filter keeps
+    resp = client.get("/expenses/export?format=csv&period=past_week", headers=headers)
+    assert resp.status_code == 200
+    records = list(csv.DictReader(io.StringIO(resp.text)))
+    assert [r["description"] for r in records] == ["Recent, with comma", "Also recent"]
+
+
+def test_create_expenses_batch_reports_invalid_items(client, dave_headers):
+    today = str(date.today())
+    items = [
+        {"amount": 3.0, "category": "Groceries", "date": today, "description": "Batch 1"},
+        {"amount": 4.0, "category": "NotACategory", "date": today},
+        {"category": "Health", "date": today},
+        {"amount": 5.0, "category": "Health", "date": "not-a-date"},
+        {"amount": 6.0, "category": "Clothing", "date": today, "description": "Batch 2"},
+    ]
+    resp = client.post("/expenses/batch", json=items, headers=dave_headers)
+    assert resp.status_code == 201, resp.text
+
+    data = resp.json()
+    # Valid items are created even though their neighbours were rejected
+    assert [c["index"] for c in data["created"]] == [0, 4]
+    assert {e["index"] for e in data["errors"]} == {1, 2, 3}
+    assert "Invalid category" in data["errors"][0]["detail"]
+    assert "amount" in data["errors"][1]["detail"]
+
+    listed = {e["id"]: e for e in client.get("/expenses/?limit=1000", headers=dave_headers).json()}
+    for created, item in zip(data["created"], (items[0], items[4])):
+        assert listed[created["id"]]["description"] == item["description"]
+        assert listed[created["id"]]["amount"] == item["amount"]
+
+
+def test_import_expenses_csv(client, auth_headers):
+    email, password = "ken@example.com", "Import$11"
+    headers = auth_headers(email, password)
+
+    csv_body = (
+        "Date,Amount,Category,Description\n"
+        "2024-01-05,12.30,Groceries,\"Market, weekly\"\n"
+        "2024-01-06,abc,Groceries,Bad amount\n"
+        "2024-01-07,99.00,Yachts,Bad category\n"
+        "2024-13-01,5.00,Health,Bad date\n"
+        "2024-01-08,40.00,Utilities,Power\n"
+    )
+    resp = client.post(
+        "/expenses/import",
+        files={"file": ("statement.csv", csv_body, "text/csv")},
+        headers=headers,
+    )
+    assert resp.status_code == 201, resp.text
+    data = resp.json()
+    assert data["imported"] == 2
+    assert data["rejected"] == 3
+    assert [e["line"] for e in data["errors"]] == [3, 4, 5]
+    assert data["rows_per_sec"] >= 0
+
+    listed = client.get("/expenses/", headers=headers).json()
+    assert [(e["date"], e["amount"], e["category"], e["description"]) for e in listed] == [
+        ("2024-01-08", 40.0, "Utilities", "Power"),
+        ("2024-01-05", 12.3, "Groceries", "Market, weekly"),
+    ]
+
+
+def test_import_expenses_requires_columns(client, dave_headers):
+    resp = client.post(
+        "/expenses/import",
+        files={"file": ("statement.csv", "when,how much\n2024-01-01,3\n", "text/csv")},
+        headers=dave_headers,
+    )
+    assert resp.status_code == 400
+    assert "missing column" in resp.json()["detail"]
+
+
+@pytest.mark.parametrize("content, error", [
+    (b"when,how much\n2024-01-01,1.0\n", "ImportFormatError"),
+    # No session to stage into: fails after the header is read
+    (b"date,amount,category\n2024-01-01,1.0,Others\n", "AttributeError"),
+])
+def test_failed_import_detaches_upload(monkeypatch, content, error):
+    import asyncio
+    import io
+    from types import SimpleNamespace
+
+    from app import expense_import
+
+    wrappers = []
+
+    class TrackedWrapper(io.TextIOWrapper):
+        detached = False
+
+        def detach(self):
+            self.detached = True
+            return super().detach()
+
+    def wrap(*args, **kwargs):
+        wrappers.append(TrackedWrapper(*args, **kwargs))
+        return wrappers[-1]
+
+    # An undetached wrapper would close the caller's upload when collected
+    monkeypatch.setattr(expense_import, "io", SimpleNamespace(TextIOWrapper=wrap))
+    upload = io.BytesIO(content)
+    with pytest.raises(Exception) as excinfo:
+        asyncio.run(expense_import.import_expenses_csv(None, 1, upload))
+    assert type(excinfo.value).__name__ == error
+    assert [wrapper.detached for wrapper in wrappers] == [True]
+    assert not upload.closed
+
+
+def test_summarize_expenses(client, auth_headers):
+    email, password = "liam@example.com", "Totals$12"
+    headers = auth_headers(email, password)
+
+    client.post("/expenses/batch", json=[
+        {"amount": 10.0, "category": "Groceries", "date": "2024-03-04"},
+        {"amount": 30.0, "category": "Groceries", "date": "2024-03-20"},
+        {"amount": 5.0, "category": "Health", "date": "2024-03-20"},
+        {"amount": 100.0, "category": "Leisure", "date": "2024-04-02"},
+        {"amount": 999.0, "category": "Leisure", "date": "2024-06-01"},
+    ], headers=headers)
+
+    resp = client.get(
+        "/expenses/summary?granularity=month&start_date=2024-03-01&end_date=2024-04-30",
+        headers=headers,
+    )
+    assert resp.status_code == 200, resp.text
+    data = resp.json()
+    assert (data["total"], data["count"], data["average"]) == (145.0, 4, 36.25)
+    assert data["by_category"] == [
+        {"category": "Groceries", "total": 40.0, "count": 2, "average": 20.0},
+        {"category": "Health", "total": 5.0, "count": 1, "average": 5.0},
+        {"category": "Leisure", "total": 100.0, "count": 1, "average": 100.0},
+    ]
+    assert data["by_period"] == [
+        {"period": "2024-03-01", "total": 45.0, "count": 3, "average": 15.0},
+        {"period": "2024-04-01", "total": 100.0, "count": 1, "average": 100.0},
+    ]
+
+    # Empty ranges still answer with zeroed totals
+    empty = client.get("/expenses/summary?start_date=2020-01-01&end_date=2020-01-31", headers=headers).json()
+    assert (empty["total"], empty["count"], empty["by_category"], empty["by_period"]) == (0.0, 0, [], [])
+
+
+def test_list_and_summary_support_conditional_get(client, auth_headers):
+    email, password = "nina@example.com", "Etag$14"
+    headers = auth_headers(email, password)
+
+    for url in ("/expenses/", "/expenses/summary"):
+        first = client.get(url, headers=headers)
+        etag = first.headers["ETag"]
+
+        # Unchanged data: 304 with no body
+        cached = client.get(url, headers={**headers, "If-None-Match": etag})
+        assert cached.status_code == 304
+        assert cached.content == b""
+
+        # Any expense write moves the version and the old ETag stops matching
+        client.post("/expenses/", json={
+            "amount": 1.0, "category": "Others", "date": str(date.today())
+        }, headers=headers)
+        fresh = client.get(url, headers={**headers, "If-None-Match": etag})
+        assert fresh.status_code == 200
+        assert fresh.headers["ETag"] != etag
+
+    # Different query strings never share a tag
+    page = client.get("/expenses/?limit=1", headers=headers).headers["ETag"]
+    assert page != client.get("/expenses/?limit=2", headers=headers).headers["ETag"]
+
+
+def test_list_expenses_bytes_match_model_serialization(client, db_session, auth_headers):
+    from typing import List
+
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from pydantic import TypeAdapter
+
+    from app.models import Expense, User
+    from app.routers.expenses import ExpenseOut
+
+    email, password = "quinn@example.com", "Bytes$16"
+    headers = auth_headers(email, password)
+
+    # 2023 amounts print the same under orjson; 2022 ones need exponents
+    for amount, description, day in [
+        (12.5, "plain", "2023-03-01"),
+        (0.1, 'quotes " and \\ backslash', "2023-03-01"),
+        (1000000.0, "unicode é ✓ 😀", "2023-03-02"),
+        (1e16, "big", "2022-05-01"),
+        (1.5e-05, "tiny", "2022-05-02"),
+    ]:
+        client.post("/expenses/", json={
+            "amount": amount, "category": "Health", "date": day, "description": description
+        }, headers=headers)
+
+    user_id = db_session.query(User).filter_by(email=email).one().id
+    for start, end in [("2023-01-01", "2023-12-31"), ("2022-01-01", "2022-12-31"), (None, None)]:
+        url = "/expenses/" + (f"?start_date={start}&end_date={end}" if start else "")
+        resp = client.get(url, headers=headers)
+        assert resp.status_code == 200
+        assert resp.headers["content-type"] == "application/json"
+        assert "ETag" in resp.headers
+
+        query = db_session.query(Expense).filter(Expense.user_id == user_id)
+        if start:
+            query = query.filter(Expense.date >= start, Expense.date <= end)
+        orm_rows = query.order_by(Expense.date.desc(), Expense.id.desc()).all()
+        validated = TypeAdapter(List[ExpenseOut]).validate_python(orm_rows, from_attributes=True)
+        assert resp.content == JSONResponse(jsonable_encoder(validated)).body
+
+
+def test_bulk_update_and_delete_by_filter(client, db_session, dave_headers, auth_headers):
+    from app.models import User
+    from app.rollups import find_rollup_mismatches
+
+    email, password = "sybil@example.com", "Bulk$19"
+    headers = auth_headers(email, password)
+
+    created = client.post("/expenses/batch", json=[
+        {"amount": 4.0, "category": "Others", "date": "2024-03-02"},
+        {"amount": 6.0, "category": "Others", "date": "2024-03-30"},
+        {"amount": 9.0, "category": "Others", "date": "2024-04-01"},
+        {"amount": 50.0, "category": "Health", "date": "2024-03-15"},
+        {"amount": 75.0, "category": "Leisure", "date": "2024-03-16"},
+    ], headers=headers).json()["created"]
+    ids = [item["id"] for item in created]
+    # dave's expenses must never be matched
+    client.post("/expenses/", json={
+        "amount": 5.0, "category": "Others", "date": "2024-03-10"
+    }, headers=dave_headers)
+
+    # "Move all Others in March to Groceries": count first, then apply
+    move = {
+        "filter": {"category": "Others", "start_date": "2024-03-01", "end_date": "2024-03-31"},
+        "set": {"category": "Groceries"},
+    }
+    dry = client.patch("/expenses/bulk?dry_run=true", json=move, headers=headers)
+    assert dry.status_code == 200, dry.text
+    assert dry.json() == {"matched": 2, "affected": 0, "dry_run": True}
+
+    resp = client.patch("/expenses/bulk", json=move, headers=headers)
+    assert resp.json() == {"matched": 2, "affected": 2, "dry_run": False}
+    assert resp.headers["X-DB-Queries"] == "1"
+    by_id = {e["id"]: e["category"] for e in client.get("/expenses/", headers=headers).json()}
+    assert by_id == {ids[0]: "Groceries", ids[1]: "Groceries", ids[2]: "Others", ids[3]: "Health", ids[4]: "Leisure"}
+
+    # Delete by id list and amount range together
+    purge = {"ids": ids[2:], "min_amount": 10, "max_amount": 60}
+    resp = client.request("DELETE", "/expenses/bulk?dry_run=true", json=purge, headers=headers)
+    assert resp.json() == {"matched": 1, "affected": 0, "dry_run": True}
+    resp = client.request("DELETE", "/expenses/bulk", json=purge, headers=headers)
+    assert resp.status_code == 200, resp.text
+    assert resp.json() == {"matched": 1, "affected": 1, "dry_run": False}
+    remaining = {e["id"] for e in client.get("/expenses/", headers=headers).json()}
+    assert remaining == {ids[0], ids[1], ids[2], ids[4]}
+
+    user_id = db_session.query(User).filter_by(email=email).one().id
+    assert find_rollup_mismatches(db_session.connection(), user_id) == []
+    assert find_rollup_mismatches(db_session.connection()) == []
+
+    # Guard rails
+    for method, body, detail in [
+        ("DELETE", {}, "Bulk filter needs at least one criterion"),
+        ("PATCH", {"filter": {"ids": ids}, "set": {}}, "Nothing to update"),
+        ("PATCH", {"filter": {"category": "Nope"}, "set": {"description": "x"}}, "Invalid category: Nope"),
+        ("DELETE", {"min_amount": 5, "max_amount": 1}, "min_amount cannot be above max_amount"),
+    ]:
+        resp = client.request(method, "/expenses/bulk", json=body, headers=headers)
+        assert resp.status_code == 400
+        assert resp.json()["detail"] == detail
+
+
+def test_search_expenses(client, dave_headers, auth_headers):
+    email, password = "trent@example.com", "Search$20"
+    headers = auth_headers(email, password)
+
+    ids = [item["id"] for item in client.post("/expenses/batch", json=[
+        {"amount": 4.5, "category": "Leisure", "date": "2024-05-01", "description": "Coffee with Sam"},
+        {"amount": 9.0, "category": "Groceries", "date": "2024-05-03", "description": "Coffee beans, coffee filters"},
+        {"amount": 30.0, "category": "Leisure", "date": "2024-06-10", "description": "Cinema and coffee"},
+        {"amount": 60.0, "category": "Utilities", "date": "2024-05-02", "description": "Electricity bill"},
+        {"amount": 1.0, "category": "Others", "date": "2024-05-02"},
+    ], headers=headers).json()["created"]]
+    # Another user's matching expense never shows up
+    client.post("/expenses/", json={
+        "amount": 2.0, "category": "Leisure", "date": "2024-05-01", "description": "coffee"
+    }, headers=dave_headers)
+
+    # Prefix match on a stemmed word; the twice-mentioned row ranks first
+    resp = client.get("/expenses/search?q=coff", headers=headers)
+    assert resp.status_code == 200, resp.text
+    hits = resp.json()
+    assert [hit["id"] for hit in hits][0] == ids[1]
+    assert sorted(hit["id"] for hit in hits) == sorted(ids[:3])
+    assert hits[0]["rank"] > hits[1]["rank"] > 0
+    assert "ETag" in resp.headers
+
+    # Every word must match, and the date/category filters narrow further
+    assert [h["id"] for h in client.get("/expenses/search?q=coffee+sam", headers=headers).json()] == [ids[0]]
+    narrowed = client.get(
+        "/expenses/search?q=coffee&category=Leisure&start_date=2024-05-01&end_date=2024-05-31", headers=headers
+    ).json()
+    assert [h["id"] for h in narrowed] == [ids[0]]
+    assert client.get("/expenses/search?q=electr&limit=1&offset=1", headers=headers).json() == []
+    # Pages cannot reach past the ranked candidates
+    assert client.get("/expenses/search?q=coffee&limit=100&offset=900", headers=headers).status_code == 200
+    resp = client.get("/expenses/search?q=coffee&limit=100&offset=901", headers=headers)
+    assert resp.status_code == 400
+    assert "newest 1000 matches" in resp.json()["detail"]
+
+    # Operators in the input are just ignored
+    assert [h["id"] for h in client.get("/expenses/search?q=bill:*%20|%20!", headers=headers).json()] == [ids[3]]
+    resp = client.get("/expenses/search?q=%26!%7C", headers=headers)
+    assert resp.status_code == 400
+    assert resp.json()["detail"] == "Search query has no searchable words"
+    assert client.get("/expenses/search?q=x&category=Nope", headers=headers).status_code == 400
@@ -0,0 +1,137 @@
+# tests/test_invalidation.py
+#
+# Two InvalidationListeners stand in for two workers, each with its own token
+# cache, against the test database.
+
+import asyncio
+
+import asyncpg
+import pytest
+from sqlalchemy import select, text
+
+from app.invalidation import InvalidationEvent, InvalidationListener
+from app.models import User
+from app.token_cache import Principal, TokenCache
+from app.versioning import data_version_bump
+from tests.conftest import POSTGRES_DB, POSTGRES_HOST, POSTGRES_PASSWORD, POSTGRES_PORT, POSTGRES_USER
+
+
+class Worker:
+    """One worker's cache and listener; records every connection it opens."""
+
+    def __init__(self, interval: float = 0.1):
+        self.cache = TokenCache(maxsize=100, ttl=300)
+        self.events: list[InvalidationEvent] = []
+        self.flushes = 0
+        self.connections: list[asyncpg.Connection] = []
+        self.listener = InvalidationListener(
+            connect=self.connect, on_event=self.on_event, on_flush=self.on_flush, interval=interval,
+        )
+
+    async def connect(self):
+        connection = await asyncpg.connect(
+            user=POSTGRES_USER, password=POSTGRES_PASSWORD, database=POSTGRES_DB,
+            host=POSTGRES_HOST, port=int(POSTGRES_PORT),
+        )
+        self.connections.append(connection)
+        return connection
+
+    def on_event(self, invalidation: InvalidationEvent):
+        self.events.append(invalidation)
+        if invalidation.kind == "user":
+            self.cache.invalidate_user(invalidation.user_id)
+
+    def on_flush(self):
+        self.flushes += 1
+        self.cache.clear()
+
+
+async def wait_for(condition, timeout: float = 5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.02)
+
+
+@pytest.fixture
+def user_id(db_session):
+    user = User(email="ursula@example.com", hashed_password="x")
+    db_session.add(user)
+    db_session.commit()
+    yield user.id
+    db_session.delete(user)
+    db_session.commit()
+
+
+def test_commits_invalidate_every_worker(engine, db_session, user_id):
+    async def run():
+        workers = [Worker(), Worker()]
+        for worker in workers:
+            worker.listener.start()
+        await wait_for(lambda: all(w.listener.connected for w in workers))
+        for worker in workers:
+            worker.cache.put("token", {}, Principal(user_id, "ursula@example.com"))
+
+        # Rolled back: nothing is published
+        with engine.connect() as connection:
+            connection.execute(data_version_bump(user_id))
+            connection.rollback()
+        # An expense mutation's version bump
+        with engine.begin() as connection:
+            version = connection.execute(data_version_bump(user_id)).scalar_one()
+        await wait_for(lambda: all(w.events for w in workers))
+        for worker in workers:
+            assert worker.events == [InvalidationEvent("expenses", user_id, version)]
+            assert worker.cache.get("token") is not None
+
+        # A change to the user row through the ORM
+        user = db_session.get(User, user_id)
+        user.name = "Ursula"
+        db_session.commit()
+        await wait_for(lambda: all(len(w.events) == 2 for w in workers))
+        for worker in workers:
+            assert worker.events[1] == InvalidationEvent("user", user_id, None)
+            assert worker.cache.get("token") is None
+            await worker.listener.stop()
+            assert not worker.listener.connected
+
+    asyncio.run(run())
+
+
+def test_reconnects_and_flushes_after_disconnect(engine, user_id):
+    async def run():
+        worker = Worker()
+        worker.listener.start()
+        await wait_for(lambda: worker.listener.connected)
+        flushes = worker.flushes
+        worker.cache.put("token", {}, Principal(user_id, "ursula@example.com"))
+
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            connection.execute(select(text("pg_terminate_backend(:pid)")), {"pid": worker.connections[0].get_server_pid()})
+        await wait_for(lambda: len(worker.connections) == 2 and worker.listener.connected)
+        assert worker.flushes >= flushes + 2  # once on the way down, once after LISTEN again
+        assert worker.cache.get("token") is None
+
+        with engine.begin() as connection:
+            connection.execute(data_version_bump(user_id))
+        await wait_for(lambda: worker.events)
+        await worker.listener.stop()
+
+    asyncio.run(run())
+
+
+def test_flushes_periodically_while_database_is_unreachable():
+    async def run():
+        worker = Worker(interval=0.05)
+
+        async def refuse():
+            raise OSError("connection refused")
+
+        worker.listener.connect = refuse
+        worker.listener.start()
+        await asyncio.sleep(0.3)
+        assert worker.flushes >= 3
+        assert not worker.listener.connected
+        await worker.listener.stop()
+
+    asyncio.run(run())
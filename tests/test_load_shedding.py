@@ -0,0 +1,134 @@
+# tests/test_load_shedding.py
+#
+# The limiters are exercised on the event loop directly; the middleware test
+# mounts them on a small app whose /auth route is slow, like bcrypt.
+
+import asyncio
+
+import httpx
+import pytest
+from fastapi import APIRouter, FastAPI
+
+from app.load_shedding import ConcurrencyLimiter, LoadSheddingMiddleware, Overloaded
+from app.metrics import load_shed_rejections, registry
+
+
+def test_limiter_queues_in_order_and_rejects_when_full():
+    async def run():
+        limiter = ConcurrencyLimiter("test_fifo", limit=1, queue_limit=2, max_wait=5)
+        await limiter.acquire()
+        admitted = []
+
+        async def waiter(n):
+            await limiter.acquire()
+            admitted.append(n)
+
+        tasks = [asyncio.create_task(waiter(n)) for n in (1, 2)]
+        await asyncio.sleep(0)
+        assert (limiter.in_flight, limiter.queued) == (1, 2)
+
+        with pytest.raises(Overloaded) as exc:
+            await limiter.acquire()
+        assert exc.value.reason == "queue_full"
+
+        limiter.release(0.01)
+        limiter.release(0.01)
+        await asyncio.gather(*tasks)
+        assert admitted == [1, 2]
+        assert (limiter.in_flight, limiter.queued) == (1, 0)
+        limiter.release(0.01)
+        assert limiter.in_flight == 0
+
+    asyncio.run(run())
+
+
+def test_limiter_rejects_by_deadline_and_timeout():
+    async def run():
+        limiter = ConcurrencyLimiter("test_deadline", limit=1, queue_limit=10, max_wait=0.05)
+        await limiter.acquire()
+
+        # Nothing known about hold times yet: the request queues, then times out
+        timeouts = load_shed_rejections.value("test_deadline", "timeout")
+        with pytest.raises(Overloaded) as exc:
+            await limiter.acquire()
+        assert exc.value.reason == "timeout"
+        assert load_shed_rejections.value("test_deadline", "timeout") == timeouts + 1
+        assert limiter.queued == 0
+
+        # Slots have been held for ~1s, so a 50ms budget is hopeless up front
+        limiter.hold_time = 1.0
+        with pytest.raises(Overloaded) as exc:
+            await limiter.acquire()
+        assert exc.value.reason == "deadline"
+        assert limiter.queued == 0
+        limiter.release()
+        assert limiter.in_flight == 0
+
+    asyncio.run(run())
+
+
+def test_cancelled_waiter_does_not_leak_a_slot():
+    async def run():
+        limiter = ConcurrencyLimiter("test_cancel", limit=1, queue_limit=10, max_wait=5)
+        await limiter.acquire()
+        task = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        limiter.release()
+        assert (limiter.in_flight, limiter.queued) == (0, 0)
+
+    asyncio.run(run())
+
+
+def test_login_storm_is_shed_without_starving_expenses():
+    auth = APIRouter(prefix="/auth")
+    expenses = APIRouter(prefix="/expenses")
+
+    @auth.post("/login")
+    async def login():
+        await asyncio.sleep(0.2)
+        return {"ok": True}
+
+    @expenses.get("/")
+    async def list_expenses():
+        return []
+
+    auth_limiter = ConcurrencyLimiter("test_auth", limit=2, queue_limit=2, max_wait=0.1)
+    expenses_limiter = ConcurrencyLimiter("test_expenses", limit=4, queue_limit=8, max_wait=0.5)
+    global_limiter = ConcurrencyLimiter("test_global", limit=8, queue_limit=16, max_wait=1)
+    app = FastAPI()
+    app.include_router(auth)
+    app.include_router(expenses)
+    app.add_middleware(
+        LoadSheddingMiddleware,
+        routes={auth.prefix: auth_limiter, expenses.prefix: expenses_limiter},
+        global_limiter=global_limiter,
+    )
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            storm = [asyncio.create_task(client.post("/auth/login")) for _ in range(10)]
+            await asyncio.sleep(0.02)
+            reads = await asyncio.gather(*(client.get("/expenses/") for _ in range(5)))
+            logins = await asyncio.gather(*storm)
+
+        assert [r.status_code for r in reads] == [200] * 5
+        codes = [r.status_code for r in logins]
+        # Two run, two queue and time out behind them, the rest are turned away at once
+        assert codes.count(200) == 2
+        assert codes.count(503) == 8
+        shed = next(r for r in logins if r.status_code == 503)
+        assert shed.headers["Retry-After"] == "1"
+        assert shed.json() == {"detail": "Server busy, try again shortly"}
+        assert load_shed_rejections.value("test_auth", "queue_full") == 6
+        assert load_shed_rejections.value("test_auth", "timeout") == 2
+        for limiter in (auth_limiter, expenses_limiter, global_limiter):
+            assert (limiter.in_flight, limiter.queued) == (0, 0)
+
+    asyncio.run(run())
+    exposition = registry.render()
+    assert 'load_shed_queue_depth{limiter="test_auth"} 0' in exposition
+    assert 'load_shed_rejections_total{limiter="test_auth",reason="queue_full"} 6' in exposition
@@ -0,0 +1,86 @@
+# tests/test_metrics.py
+
+import asyncio
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.metrics import (
+    Histogram,
+    InstrumentedQueuePool,
+    db_pool_checkouts,
+    http_request_duration,
+    http_requests,
+    password_hash_duration,
+)
+from app.database import engine_options
+from tests.conftest import ASYNC_DATABASE_URL, DATABASE_URL
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("demo_seconds", "Demo.", ("route",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.5, "/a")
+    histogram.observe(5.0, "/a")
+    assert histogram.render() == [
+        "# HELP demo_seconds Demo.",
+        "# TYPE demo_seconds histogram",
+        'demo_seconds_bucket{route="/a",le="0.1"} 1',
+        'demo_seconds_bucket{route="/a",le="1.0"} 2',
+        'demo_seconds_bucket{route="/a",le="+Inf"} 3',
+        'demo_seconds_sum{route="/a"} 5.55',
+        'demo_seconds_count{route="/a"} 3',
+    ]
+
+
+def test_requests_recorded_by_route_template(client, auth_headers):
+    email, password = "olga@example.com", "Metrics$14"
+    hashes_before = password_hash_duration.count("hash")
+    headers = auth_headers(email, password)
+    assert password_hash_duration.count("hash") == hashes_before + 1
+
+    deletes_before = http_requests.value("DELETE", "/expenses/{expense_id}", 404)
+    client.delete("/expenses/123456789", headers=headers)
+    client.delete("/expenses/987654321", headers=headers)
+    assert http_requests.value("DELETE", "/expenses/{expense_id}", 404) == deletes_before + 2
+    assert http_request_duration.count("DELETE", "/expenses/{expense_id}") >= 2
+
+    unmatched_before = http_requests.value("GET", "unmatched", 404)
+    client.get("/no/such/path")
+    assert http_requests.value("GET", "unmatched", 404) == unmatched_before + 1
+
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = resp.text
+    assert 'http_requests_total{method="DELETE",route="/expenses/{expense_id}",status="404"}' in body
+    assert 'password_hash_seconds_count{operation="verify"}' in body
+    assert "http_requests_in_progress 1" in body  # the /metrics request itself
+    assert 'db_pool_size{pool="async"}' in body
+
+
+def test_pool_checkouts_are_counted():
+    engine = create_engine(DATABASE_URL, poolclass=InstrumentedQueuePool, pool_size=1)
+    before = db_pool_checkouts.value("sync")
+    for _ in range(3):
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+    engine.dispose()
+    assert db_pool_checkouts.value("sync") == before + 3
+
+
+def test_replica_checkouts_are_counted_as_replica():
+    replica = create_async_engine(
+        ASYNC_DATABASE_URL, **engine_options(async_driver=True, pgbouncer=False, replica=True)
+    )
+    replica_before, async_before = db_pool_checkouts.value("replica"), db_pool_checkouts.value("async")
+
+    async def checkouts():
+        for _ in range(2):
+            async with replica.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+        await replica.dispose()
+
+    asyncio.run(checkouts())
+    assert db_pool_checkouts.value("replica") == replica_before + 2
+    assert db_pool_checkouts.value("async") == async_before
@@ -0,0 +1,71 @@
+# tests/test_partitions.py
+
+import asyncio
+from datetime import date
+
+import pytest
+from sqlalchemy import text
+
+from app.partitions import add_months, ensure_partitions_statement, ensure_upcoming_partitions, upcoming_months
+
+
+def partition_of(engine, expense_id: int) -> str:
+    with engine.connect() as connection:
+        return connection.scalar(
+            text("SELECT tableoid::regclass::text FROM expenses WHERE id = :id"), {"id": expense_id}
+        )
+
+
+@pytest.fixture
+def user_headers(auth_headers):
+    return auth_headers("victor@example.com", "Partition$23")
+
+
+@pytest.fixture
+def far_future(engine):
+    """Months no other test touches; their partitions are dropped afterwards."""
+    yield date(2031, 5, 1), date(2031, 6, 1)
+    with engine.begin() as connection:
+        connection.execute(text("DELETE FROM expenses WHERE date >= '2031-01-01'"))
+        connection.execute(text("DROP TABLE IF EXISTS expenses_2031_05, expenses_2031_06"))
+
+
+def test_month_arithmetic():
+    assert add_months(date(2026, 11, 20), 0) == date(2026, 11, 1)
+    assert add_months(date(2026, 11, 20), 3) == date(2027, 2, 1)
+    assert add_months(date(2026, 1, 31), -1) == date(2025, 12, 1)
+    assert upcoming_months(2, today=date(2026, 12, 5)) == (date(2026, 12, 1), date(2027, 2, 1))
+
+
+def test_upcoming_partitions_exist(async_engine, engine):
+    # Already created by the lifespan of earlier clients, or now
+    asyncio.run(ensure_upcoming_partitions(async_engine))
+    first, last = upcoming_months()
+    with engine.connect() as connection:
+        for month in (first, last):
+            assert connection.scalar(text("SELECT to_regclass(:name)"), {"name": f"expenses_{month:%Y_%m}"})
+        assert connection.scalar(ensure_partitions_statement(first, last)) == 0
+
+
+def test_new_partition_takes_rows_from_default(client, user_headers, engine, far_future):
+    resp = client.post("/expenses/", json={
+        "amount": 12.5, "category": "Leisure", "date": "2031-05-10", "description": "festival tickets",
+    }, headers=user_headers)
+    assert resp.status_code == 201, resp.text
+    eid = resp.json()["id"]
+    assert partition_of(engine, eid) == "expenses_default"
+
+    with engine.begin() as connection:
+        assert connection.scalar(ensure_partitions_statement(*far_future)) == 2
+    assert partition_of(engine, eid) == "expenses_2031_05"
+
+    # Changing the date moves the row across partitions; reads see it as before
+    resp = client.put(f"/expenses/{eid}", json={
+        "amount": 12.5, "category": "Leisure", "date": "2031-06-02", "description": "festival tickets",
+    }, headers=user_headers)
+    assert resp.status_code == 200, resp.text
+    assert partition_of(engine, eid) == "expenses_2031_06"
+    listed = client.get("/expenses/", params={"start_date": "2031-06-01", "end_date": "2031-06-30"},
+                        headers=user_headers).json()
+    assert [e["id"] for e in listed] == [eid]
+    assert client.delete(f"/expenses/{eid}", headers=user_headers).status_code == 204
@@ -0,0 +1,229 @@
+# tests/test_query_plans.py
+#
+# EXPLAIN the queries behind the hot endpoints and the expense writes against
+# a seeded table and check they are served by an index without sorting. A plan regression (a
+# dropped index, a rewritten ORDER BY) shows up here instead of in production.
+
+from datetime import date, datetime, timezone
+
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from app.cursors import DeclareCursor
+from app.models import Expense, ExpenseCategory, User
+from app.partitions import ensure_partitions_statement
+from app.rollups import rebuild_rollups
+from app.routers.auth import user_by_email_query
+from app.routers.expenses import (
+    BulkFilter, bulk_delete_query, bulk_filter_conditions, bulk_update_query, delete_expense_query, export_query,
+    list_expenses_query, prefix_tsquery, search_expenses_query, stats_query, summary_query, update_expense_query,
+)
+
+SEED_USERS = 2000
+SEED_ROWS_PER_USER = 50
+HEAVY_USER_ROWS = 5000
+INDEX_NODES = {"Index Scan", "Index Only Scan", "Bitmap Index Scan"}
+SORT_NODES = {"Sort", "Incremental Sort"}
+# Reading this many rows sequentially is fine, and what the planner does for them
+SMALL_TABLE_ROWS = 500
+
+
+class Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    return f"EXPLAIN (FORMAT JSON) {compiler.process(element.statement, **kw)}"
+
+
+def _node_types(plan):
+    yield plan["Node Type"]
+    for child in plan.get("Plans", ()):
+        yield from _node_types(child)
+
+
+def _plan_values(plan, key):
+    if key in plan:
+        yield plan[key]
+    for child in plan.get("Plans", ()):
+        yield from _plan_values(child, key)
+
+
+def plan_nodes(connection, statement) -> set:
+    plan = connection.execute(Explain(statement)).scalar_one()
+    return set(_node_types(plan[0]["Plan"]))
+
+
+def plan_indexes(connection, statement) -> set:
+    """Indexes the plan scans; a partition's index is reported as the partitioned index it belongs to."""
+    plan = connection.execute(Explain(statement)).scalar_one()
+    return {
+        connection.scalar(text("SELECT coalesce(pg_partition_root(CAST(:name AS regclass)), CAST(:name AS regclass))::text"),
+                          {"name": name})
+        for name in _plan_values(plan[0]["Plan"], "Index Name")
+    }
+
+
+def _seq_scans(plan):
+    if plan["Node Type"] == "Seq Scan":
+        yield plan["Relation Name"]
+    for child in plan.get("Plans", ()):
+        yield from _seq_scans(child)
+
+
+def plan_seq_scans(connection, statement) -> set:
+    """Tables the plan reads sequentially, apart from near-empty ones (such as unused partitions)."""
+    plan = connection.execute(Explain(statement)).scalar_one()
+    return {
+        name for name in _seq_scans(plan[0]["Plan"])
+        if connection.scalar(text(f'SELECT count(*) FROM "{name}"')) > SMALL_TABLE_ROWS
+    }
+
+
+def plan_relations(connection, statement) -> set:
+    """Tables (partitions) the plan reads, after pruning."""
+    plan = connection.execute(Explain(statement)).scalar_one()
+    return set(_plan_values(plan[0]["Plan"], "Relation Name"))
+
+
+@pytest.fixture(scope="module")
+def seeded(engine):
+    """
+    Seed enough users and rows that the planner's choices mean something.
+
+    plan0 is a heavy user whose rows are interleaved with everyone else's.
+    """
+    with engine.begin() as connection:
+        # Monthly partitions for the seeded dates (2024 through 2027)
+        connection.execute(ensure_partitions_statement(date(2024, 1, 1), date(2027, 12, 1)))
+        connection.execute(text(
+            "INSERT INTO users (email, hashed_password) "
+            "SELECT 'plan' || g || '@example.com', 'x' FROM generate_series(0, :users) g"
+        ), {"users": SEED_USERS})
+        connection.execute(text(
+            "INSERT INTO expenses (user_id, amount, description, category, date) "
+            "SELECT u.id, round((random() * 100)::numeric, 2), 'seed item' || n, "
+            "       (enum_range(NULL::expensecategory))[1 + n % 5], "
+            "       timestamptz '2024-01-01' + n * CASE WHEN u.email = 'plan0@example.com' "
+            "           THEN interval '7 hours' ELSE interval '29 days' END "
+            "FROM users u CROSS JOIN LATERAL generate_series("
+            "    1, CASE WHEN u.email = 'plan0@example.com' THEN :heavy ELSE :rows END) n "
+            "WHERE u.email LIKE 'plan%@example.com' "
+            "ORDER BY random()"
+        ), {"heavy": HEAVY_USER_ROWS, "rows": SEED_ROWS_PER_USER})
+        rebuild_rollups(connection)
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("ANALYZE users, expenses, expense_daily_rollups"))
+    with engine.connect() as connection:
+        heavy_id = connection.scalar(select(User.id).where(User.email == "plan0@example.com"))
+    yield heavy_id
+    with engine.begin() as connection:
+        connection.execute(text("DELETE FROM users WHERE email LIKE 'plan%@example.com'"))
+
+
+@pytest.fixture
+def connection(engine, seeded):
+    with engine.connect() as connection:
+        yield connection
+        connection.rollback()
+
+
+def assert_index_without_sort(nodes: set):
+    assert nodes & INDEX_NODES, nodes
+    assert not nodes & SORT_NODES, nodes
+
+
+# A narrow range is legitimately cheaper as bitmap scan + top-N sort, so the
+# range case spans most of the heavy user's history
+@pytest.mark.parametrize("start_date, end_date, after", [
+    (None, None, None),
+    (date(2024, 3, 1), date(2026, 12, 31), None),
+    (None, None, (datetime(2024, 6, 1, tzinfo=timezone.utc), 10**9)),
+])
+def test_list_page_walks_index(connection, seeded, start_date, end_date, after):
+    query = list_expenses_query(seeded, start_date, end_date, after, 101)
+    assert_index_without_sort(plan_nodes(connection, query))
+
+
+@pytest.mark.parametrize("start_date, end_date, after, partitions", [
+    (date(2024, 3, 1), date(2024, 4, 30), None, {"expenses_2024_03", "expenses_2024_04"}),
+    (date(2024, 3, 1), None, (datetime(2024, 5, 10, tzinfo=timezone.utc), 10**9),
+     {"expenses_2024_03", "expenses_2024_04", "expenses_2024_05"}),
+])
+def test_list_page_prunes_partitions(connection, seeded, start_date, end_date, after, partitions):
+    query = list_expenses_query(seeded, start_date, end_date, after, 101)
+    assert plan_relations(connection, query) == partitions
+
+
+def test_export_cursor_walks_index(connection, seeded):
+    cursor = DeclareCursor("plan_export", export_query(seeded, None, None))
+    assert_index_without_sort(plan_nodes(connection, cursor))
+
+
+def test_summary_reads_rollups_by_index(connection, seeded):
+    query = summary_query(seeded, "month", date(2024, 1, 1), date(2024, 12, 31))
+    assert_index_without_sort(plan_nodes(connection, query))
+
+
+def test_search_reads_by_index(connection, seeded):
+    # item4000..item4009 only exist among the heavy user's rows. Each monthly
+    # partition holds ~100 of them, few enough that the planner may filter
+    # them off the user index instead of the GIN index; either way no
+    # partition of any size is read sequentially.
+    query = search_expenses_query(seeded, prefix_tsquery("item400"), None, None, None, 100, 0)
+    assert plan_indexes(connection, query) & {"ix_expenses_search_vector", "ix_expenses_user_id_date_id"}
+    assert not plan_seq_scans(connection, query)
+
+
+def test_stats_reads_only_the_user_index(connection, seeded):
+    # Every column it aggregates is in the index, so no heap table is read
+    query = stats_query(seeded, None, None)
+    assert plan_indexes(connection, query) == {"ix_expenses_user_id_date_id"}
+    assert not plan_seq_scans(connection, query)
+
+
+@pytest.fixture
+def heavy_expense_id(connection, seeded) -> int:
+    return connection.scalar(select(Expense.id).where(Expense.user_id == seeded).order_by(Expense.id).limit(1))
+
+
+OTHERS = {"category": ExpenseCategory.OTHERS}
+SPRING_2024 = BulkFilter(start_date=date(2024, 3, 1), end_date=date(2024, 4, 30), category="Groceries")
+
+
+@pytest.mark.parametrize("build", [
+    lambda user_id, expense_id: update_expense_query(
+        expense_id, user_id, {**OTHERS, "amount": 1.0, "date": date(2024, 5, 1), "description": ""},
+    ),
+    lambda user_id, expense_id: delete_expense_query(expense_id, user_id),
+    lambda user_id, expense_id: bulk_update_query(
+        bulk_filter_conditions(user_id, BulkFilter(ids=[expense_id])), OTHERS, user_id,
+    ),
+    lambda user_id, expense_id: bulk_update_query(bulk_filter_conditions(user_id, SPRING_2024), OTHERS, user_id),
+    lambda user_id, expense_id: bulk_delete_query(bulk_filter_conditions(user_id, BulkFilter(ids=[expense_id])), user_id),
+    lambda user_id, expense_id: bulk_delete_query(bulk_filter_conditions(user_id, SPRING_2024), user_id),
+], ids=["put", "delete", "bulk_update_ids", "bulk_update_range", "bulk_delete_ids", "bulk_delete_range"])
+def test_expense_writes_use_index(connection, seeded, heavy_expense_id, build):
+    # An id alone does not prune partitions, so writes by id still visit every
+    # month, but each through an index; none reads a partition of real size
+    # sequentially (a join on id alone used to hash-join them all)
+    query = build(seeded, heavy_expense_id)
+    nodes = plan_nodes(connection, query)
+    assert nodes & INDEX_NODES, nodes
+    assert not plan_seq_scans(connection, query)
+
+
+@pytest.mark.parametrize("build", [
+    lambda user_id: user_by_email_query("plan7@example.com"),
+    lambda user_id: select(User).where(User.id == user_id),
+    lambda user_id: select(User.data_version).where(User.id == user_id),
+])
+def test_user_lookups_use_index(connection, seeded, build):
+    nodes = plan_nodes(connection, build(seeded))
+    assert nodes & INDEX_NODES, nodes
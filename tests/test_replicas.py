@@ -0,0 +1,140 @@
+# tests/test_replicas.py
+#
+# A second database on the test server stands in for the replica. Nothing
+# replicates into it, so it is a replica infinitely far behind: a read that
+# sees its marker row was served by it, one that sees the real rows by the
+# primary.
+
+import asyncio
+import time
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.database import get_replica_db, get_replica_sessionmaker
+from app.invalidation import listener
+from app.main import app
+from app.metrics import db_reads
+from app.models import Base, Expense, ExpenseCategory, User
+from app.replicas import WriteTracker, write_tracker
+from app.versioning import data_version_bump
+from tests.conftest import ASYNC_DATABASE_URL, DATABASE_URL, POSTGRES_DB
+
+REPLICA_DB = f"{POSTGRES_DB}_replica"
+PIN_SECONDS = 0.3
+
+
+def wait_until(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.02)
+
+
+def test_write_tracker_pins_for_window():
+    tracker = WriteTracker(window=0.05)
+    assert not tracker.pinned(1)
+    tracker.record(1)
+    assert tracker.pinned(1) and not tracker.pinned(2)
+    time.sleep(0.06)
+    assert not tracker.pinned(1)
+    tracker.record(2)
+    assert list(tracker._writes) == [2]  # expired entries are dropped
+
+    tracker.pin_all()
+    assert tracker.pinned(3)
+    time.sleep(0.06)
+    assert not tracker.pinned(3)
+
+
+@pytest.fixture(scope="module")
+def replica_url(engine):
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        try:
+            connection.execute(text(f'DROP DATABASE IF EXISTS "{REPLICA_DB}"'))
+            connection.execute(text(f'CREATE DATABASE "{REPLICA_DB}"'))
+        except DBAPIError as exc:
+            pytest.skip(f"cannot create a stand-in replica database: {exc}")
+    url = DATABASE_URL.rsplit("/", 1)[0] + f"/{REPLICA_DB}"
+    replica = create_engine(url, poolclass=NullPool)
+    Base.metadata.create_all(bind=replica)
+    replica.dispose()
+    yield url
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text(f'DROP DATABASE "{REPLICA_DB}" WITH (FORCE)'))
+
+
+@pytest.fixture
+def replica(client, replica_url, monkeypatch):
+    """Route the app's replica dependencies to the stand-in, with a short pin window."""
+    replica_engine = create_async_engine(
+        ASYNC_DATABASE_URL.rsplit("/", 1)[0] + f"/{REPLICA_DB}", poolclass=NullPool
+    )
+    sessions = async_sessionmaker(bind=replica_engine, expire_on_commit=False)
+
+    async def override_get_replica_db():
+        async with sessions() as session:
+            yield session
+
+    app.dependency_overrides[get_replica_db] = override_get_replica_db
+    app.dependency_overrides[get_replica_sessionmaker] = lambda: sessions
+    monkeypatch.setattr(write_tracker, "window", PIN_SECONDS)
+    # Startup pins everyone (writes before LISTEN went unheard); start clean
+    wait_until(lambda: listener.connected)
+    time.sleep(0.05)
+    write_tracker.clear()
+    yield replica_url
+    write_tracker.clear()
+    asyncio.run(replica_engine.dispose())
+
+
+def test_reads_use_replica_unless_user_just_wrote(client, replica, engine, auth_headers):
+    email, password = "wendy@example.com", "Replica$24"
+    headers = auth_headers(email, password)
+    with engine.connect() as connection:
+        user_id = connection.scalar(text("SELECT id FROM users WHERE email = :email"), {"email": email})
+
+    # What the (stale) replica has for this user
+    marker = create_engine(replica, poolclass=NullPool)
+    with marker.begin() as connection:
+        connection.execute(User.__table__.insert().values(id=user_id, email=email, hashed_password="x"))
+        connection.execute(Expense.__table__.insert().values(
+            user_id=user_id, amount=1.0, category=ExpenseCategory.OTHERS, description="from replica",
+            date=datetime(2026, 9, 1, tzinfo=timezone.utc),
+        ))
+    marker.dispose()
+
+    def descriptions(path="/expenses/"):
+        resp = client.get(path, headers=headers)
+        assert resp.status_code == 200, resp.text
+        return [e["description"] for e in resp.json()]
+
+    replica_reads = db_reads.value("replica", "default")
+    assert descriptions() == ["from replica"]
+    assert descriptions("/expenses/search?q=replica") == ["from replica"]
+    assert db_reads.value("replica", "default") == replica_reads + 2
+
+    # A write pins the user to the primary, so the write is visible at once
+    resp = client.post("/expenses/", json={
+        "amount": 20.0, "category": "Groceries", "date": "2026-10-01", "description": "from primary",
+    }, headers=headers)
+    assert resp.status_code == 201, resp.text
+    pinned_reads = db_reads.value("primary", "pinned")
+    assert descriptions() == ["from primary"]
+    export = client.get("/expenses/export", headers=headers)
+    assert [line for line in export.text.splitlines() if "from primary" in line]
+    assert db_reads.value("primary", "pinned") == pinned_reads + 2
+
+    # Once the window has passed, reads go back to the replica
+    time.sleep(PIN_SECONDS * 2)
+    assert descriptions() == ["from replica"]
+
+    # A write committed by another worker pins the user through its invalidation event
+    with engine.begin() as connection:
+        connection.execute(data_version_bump(user_id))
+    wait_until(lambda: write_tracker.pinned(user_id))
+    assert descriptions() == ["from primary"]
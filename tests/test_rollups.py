@@ -0,0 +1,107 @@
+# tests/test_rollups.py
+
+from datetime import date
+
+import pytest
+from sqlalchemy import update
+
+from app.models import ExpenseDailyRollup, ExpenseCategory, User
+from app.rollups import find_rollup_mismatches, rebuild_rollups
+
+
+@pytest.fixture
+def user_headers(auth_headers):
+    return auth_headers("mallory@example.com", "Rollup$13")
+
+
+def _user_id(db_session):
+    return db_session.query(User).filter_by(email="mallory@example.com").one().id
+
+
+def test_mutations_keep_rollups_consistent(client, db_session, user_headers):
+    # Every write path: single create, batch, import, update and delete
+    created = client.post("/expenses/", json={
+        "amount": 10.0, "category": "Groceries", "date": "2024-05-01"
+    }, headers=user_headers).json()
+    client.post("/expenses/batch", json=[
+        {"amount": 2.5, "category": "Groceries", "date": "2024-05-01"},
+        {"amount": 7.0, "category": "Health", "date": "2024-05-02"},
+    ], headers=user_headers)
+    client.post(
+        "/expenses/import",
+        files={"file": ("s.csv", "date,amount,category\n2024-05-02,3.0,Health\n", "text/csv")},
+        headers=user_headers,
+    )
+    to_delete = client.post("/expenses/", json={
+        "amount": 50.0, "category": "Leisure", "date": "2024-05-03"
+    }, headers=user_headers).json()
+
+    # Moving an expense to another day and category shifts it between buckets
+    client.put(f"/expenses/{created['id']}", json={
+        "amount": 12.0, "category": "Utilities", "date": "2024-05-04"
+    }, headers=user_headers)
+    client.delete(f"/expenses/{to_delete['id']}", headers=user_headers)
+
+    user_id = _user_id(db_session)
+    assert find_rollup_mismatches(db_session.connection(), user_id) == []
+
+    rollups = {
+        (r.day, r.category): (r.total, r.count)
+        for r in db_session.query(ExpenseDailyRollup).filter_by(user_id=user_id)
+    }
+    assert rollups == {
+        (date(2024, 5, 1), ExpenseCategory.GROCERIES): (2.5, 1),
+        (date(2024, 5, 2), ExpenseCategory.HEALTH): (10.0, 2),
+        (date(2024, 5, 4), ExpenseCategory.UTILITIES): (12.0, 1),
+    }
+
+
+def test_emptied_rollups_are_deleted(client, db_session, user_headers):
+    # 0.1 + 0.2 + 0.7 - 0.1 - 0.7 leaves float noise in the incremental total
+    ids = [item["id"] for item in client.post("/expenses/batch", json=[
+        {"amount": amount, "category": "Health", "date": "2024-07-01"} for amount in (0.1, 0.2, 0.7)
+    ], headers=user_headers).json()["created"]]
+    client.delete(f"/expenses/{ids[0]}", headers=user_headers)
+    client.request("DELETE", "/expenses/bulk", json={"ids": [ids[2]]}, headers=user_headers)
+
+    user_id = _user_id(db_session)
+    july = db_session.query(ExpenseDailyRollup).filter_by(user_id=user_id, day=date(2024, 7, 1))
+    assert find_rollup_mismatches(db_session.connection(), user_id) == []
+    rollup = july.one()
+    assert (rollup.count, rollup.total) == (1, pytest.approx(0.2))
+
+    # Moving the last expense out of a bucket deletes the bucket's row
+    client.put(f"/expenses/{ids[1]}", json={
+        "amount": 0.2, "category": "Leisure", "date": "2024-07-01"
+    }, headers=user_headers)
+    db_session.expire_all()
+    assert [(r.category, r.count) for r in july] == [(ExpenseCategory.LEISURE, 1)]
+
+    client.delete(f"/expenses/{ids[1]}", headers=user_headers)
+    assert july.all() == []
+    assert find_rollup_mismatches(db_session.connection(), user_id) == []
+
+    # A leftover empty row is reported, and a rebuild removes it
+    db_session.add(ExpenseDailyRollup(user_id=user_id, day=date(2024, 7, 1), category=ExpenseCategory.HEALTH))
+    db_session.flush()
+    assert len(find_rollup_mismatches(db_session.connection(), user_id)) == 1
+    rebuild_rollups(db_session.connection(), user_id)
+    assert find_rollup_mismatches(db_session.connection(), user_id) == []
+    db_session.rollback()
+
+
+def test_rebuild_repairs_drifted_rollups(client, db_session, user_headers):
+    client.post("/expenses/", json={
+        "amount": 4.0, "category": "Clothing", "date": "2024-06-01"
+    }, headers=user_headers)
+    user_id = _user_id(db_session)
+
+    # Simulate drift, e.g. a row written by something that bypassed the API
+    db_session.execute(
+        update(ExpenseDailyRollup).where(ExpenseDailyRollup.user_id == user_id).values(total=999.0)
+    )
+    assert find_rollup_mismatches(db_session.connection(), user_id) != []
+
+    rebuild_rollups(db_session.connection(), user_id)
+    assert find_rollup_mismatches(db_session.connection(), user_id) == []
+    db_session.rollback()
@@ -0,0 +1,125 @@
+# tests/test_sql_stats.py
+
+import json
+import logging
+
+import pytest
+from sqlalchemy import select
+
+from app import sql_stats
+from app.models import User
+from app.rollups import find_rollup_mismatches
+from app.sql_stats import normalize_sql
+
+
+@pytest.fixture
+def user_headers(auth_headers):
+    return auth_headers("paul@example.com", "Queries$15")
+
+
+def _records(caplog, event):
+    return [json.loads(r.getMessage()) for r in caplog.records
+            if r.name == "app.sql" and json.loads(r.getMessage())["event"] == event]
+
+
+def test_normalize_sql():
+    assert normalize_sql(
+        "SELECT a::date, 'it''s'\n  FROM t WHERE id IN ($1, $2, $3) AND x = 5 AND ix_1 > -2.5"
+    ) == "SELECT a::date, ? FROM t WHERE id IN (?, ...) AND x = ? AND ix_1 > ?"
+    assert normalize_sql(
+        "INSERT INTO t (a, b) VALUES (%(a_m0)s, %(b_m0)s), (%(a_m1)s, %(b_m1)s)"
+    ) == "INSERT INTO t (a, b) VALUES (?, ...), ..."
+
+
+def test_query_count_headers(client, user_headers):
+    resp = client.get("/expenses/", headers=user_headers)
+    assert resp.status_code == 200
+    assert int(resp.headers["X-DB-Queries"]) >= 1
+    assert float(resp.headers["X-DB-Time-Ms"]) > 0
+
+    resp = client.get("/health")
+    assert resp.headers["X-DB-Queries"] == "0"
+
+
+def test_too_many_queries_flagged(client, user_headers, monkeypatch, caplog):
+    monkeypatch.setattr(sql_stats, "MAX_QUERIES_PER_REQUEST", 1)
+    with caplog.at_level(logging.WARNING, logger="app.sql"):
+        resp = client.post("/expenses/", json={
+            "amount": 3.0, "category": "Others", "date": "2024-02-02"
+        }, headers=user_headers)
+    [record] = _records(caplog, "too_many_queries")
+    assert record["route"] == "/expenses/"
+    assert record["method"] == "POST"
+    assert record["queries"] == int(resp.headers["X-DB-Queries"]) > 1
+
+
+def test_slow_queries_logged_normalized(client, user_headers, monkeypatch, caplog):
+    monkeypatch.setattr(sql_stats, "SLOW_QUERY_MS", 0)
+    with caplog.at_level(logging.WARNING, logger="app.sql"):
+        client.get("/expenses/?start_date=2024-01-01", headers=user_headers)
+    records = _records(caplog, "slow_query")
+    assert records
+    assert all(r["route"] == "/expenses/" for r in records)
+    assert any("FROM expenses" in r["sql"] and "$" not in r["sql"] for r in records)
+
+
+def test_writes_are_single_statements(client, db_session, user_headers):
+    # Warm the token cache so the counts below are the endpoints' own statements
+    client.get("/health", headers=user_headers)
+    client.get("/expenses/", headers=user_headers)
+    eid = client.post("/expenses/", json={
+        "amount": 8.0, "category": "Health", "date": "2024-03-03"
+    }, headers=user_headers).json()["id"]
+    version = db_session.scalar(select(User.data_version).filter_by(email="paul@example.com"))
+
+    resp = client.put(f"/expenses/{eid}", json={
+        "amount": 9.5, "category": "Health", "date": "2024-03-03", "description": "same bucket"
+    }, headers=user_headers)
+    assert resp.status_code == 200, resp.text
+    assert resp.json() == {
+        "id": eid, "amount": 9.5, "category": "Health", "date": "2024-03-03", "description": "same bucket"
+    }
+    assert resp.headers["X-DB-Queries"] == "1"
+
+    resp = client.delete(f"/expenses/{eid}", headers=user_headers)
+    assert resp.status_code == 204
+    assert resp.headers["X-DB-Queries"] == "1"
+
+    # Signup checks the email first so a taken one skips the password hash
+    resp = client.post("/auth/signup", json={"email": "quentin@example.com", "password": "Single$18"})
+    assert resp.status_code == 201
+    assert resp.headers["X-DB-Queries"] == "2"
+    resp = client.post("/auth/signup", json={"email": "quentin@example.com", "password": "Single$18"})
+    assert resp.status_code == 400
+    assert resp.json()["detail"] == "Email already registered"
+    assert resp.headers["X-DB-Queries"] == "1"
+
+    db_session.expire_all()
+    user = db_session.scalars(select(User).filter_by(email="paul@example.com")).one()
+    assert user.data_version == version + 2
+    assert find_rollup_mismatches(db_session.connection(), user.id) == []
+
+
+def test_single_statement_writes_keep_error_semantics(client, user_headers, auth_headers):
+    eid = client.post("/expenses/", json={
+        "amount": 4.0, "category": "Others", "date": "2024-03-04"
+    }, headers=user_headers).json()["id"]
+    valid = {"amount": 1.0, "category": "Others", "date": "2024-03-04"}
+
+    # Someone else's expense looks exactly like a missing one
+    other_headers = auth_headers("rupert@example.com", "Other$18")
+    for headers, target in ((other_headers, eid), (user_headers, 10**9)):
+        resp = client.put(f"/expenses/{target}", json=valid, headers=headers)
+        assert resp.status_code == 404
+        assert resp.json()["detail"] == "Expense not found or not owned by user"
+        # A missing expense wins over a bad payload, as before
+        resp = client.put(f"/expenses/{target}", json={**valid, "category": "Nope"}, headers=headers)
+        assert resp.status_code == 404
+        resp = client.delete(f"/expenses/{target}", headers=headers)
+        assert resp.status_code == 404
+
+    resp = client.put(f"/expenses/{eid}", json={**valid, "category": "Nope"}, headers=user_headers)
+    assert resp.status_code == 400
+    assert resp.json()["detail"] == "Invalid category: Nope"
+    resp = client.put(f"/expenses/{eid}", json={**valid, "date": "03/04/2024"}, headers=user_headers)
+    assert resp.status_code == 400
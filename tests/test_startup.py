@@ -0,0 +1,50 @@
+# tests/test_startup.py
+#
+# Cold-start guard: import app.main in a fresh interpreter under
+# `python -X importtime` and check both the total against a budget and that
+# the modules deferred to the lifespan pre-warm stay out of the import.
+
+import asyncio
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from app import auth
+
+# Generous enough for slow CI machines; the point is to catch regressions
+# like an eager heavy import, not to benchmark. Override per environment.
+IMPORT_TIME_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", 3000))
+DEFERRED_MODULES = {"passlib", "jose", "cryptography", "bcrypt", "psycopg2", "numpy"}
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def import_times(module: str) -> dict[str, int]:
+    """Cumulative import time in microseconds for every module ``module`` pulls in."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        times[name] = int(cumulative)
+    return times
+
+
+def test_app_import_time_within_budget():
+    times = import_times("app.main")
+    assert times["app.main"] / 1000 <= IMPORT_TIME_BUDGET_MS, f"app.main took {times['app.main'] / 1000:.0f}ms"
+
+
+def test_heavy_modules_are_deferred():
+    loaded = {name.split(".")[0] for name in import_times("app.main")}
+    assert not loaded & DEFERRED_MODULES
+
+
+def test_warm_up_auth_starts_hash_workers():
+    asyncio.run(auth.warm_up_auth())
+    assert len(auth._hash_executor._threads) == auth.PASSWORD_HASH_WORKERS
+    assert "jose.jwt" in sys.modules
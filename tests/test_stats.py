@@ -0,0 +1,118 @@
+# tests/test_stats.py
+
+import random
+from collections import namedtuple
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from app.models import ExpenseCategory
+from app.stats import STATS_CATEGORIES, compute_stats
+from benchmarks.stats import assert_same, reference_stats
+
+ExpenseRow = namedtuple("ExpenseRow", "id date amount category")
+
+
+def random_expenses(count: int, seed: int) -> list[ExpenseRow]:
+    rng = random.Random(seed)
+    start = datetime(2025, 11, 20, tzinfo=timezone.utc)
+    return [
+        ExpenseRow(
+            id=i,
+            date=start + timedelta(days=rng.randrange(120)),
+            # A few large amounts for the outlier flags
+            amount=round(rng.uniform(1, 60) * (25 if rng.random() < 0.01 else 1), 2),
+            category=rng.choice(STATS_CATEGORIES[:5]),
+        )
+        for i in range(count)
+    ]
+
+
+def as_arrays(expenses: list[ExpenseRow]) -> tuple:
+    return (
+        [e.id for e in expenses],
+        [(e.date.date() - date(1970, 1, 1)).days for e in expenses],
+        [e.amount for e in expenses],
+        [STATS_CATEGORIES.index(e.category) for e in expenses],
+    )
+
+
+@pytest.mark.parametrize("start_date, end_date, rolling_days", [
+    (None, None, 90),
+    (date(2025, 12, 10), date(2026, 2, 15), 30),
+    (date(2025, 11, 1), None, 400),
+])
+def test_matches_pure_python_reference(start_date, end_date, rolling_days):
+    expenses = random_expenses(3000, seed=rolling_days)
+    today = date(2026, 3, 31)
+    if start_date or end_date:
+        expenses = [
+            e for e in expenses
+            if (not start_date or e.date.date() >= start_date) and (not end_date or e.date.date() <= end_date)
+        ]
+    stats = compute_stats(*as_arrays(expenses), start_date, end_date, rolling_days, today=today)
+    reference = reference_stats(expenses, start_date, end_date, rolling_days, today)
+    assert stats.outlier_count > 0
+    assert_same(stats.model_dump(), reference.model_dump())
+
+
+def test_no_expenses():
+    stats = compute_stats([], [], [], [], None, None, 7, today=date(2026, 3, 31))
+    assert (stats.count, stats.total, stats.by_category, stats.outliers) == (0, 0.0, [], [])
+    assert stats.start_date == stats.end_date == date(2026, 3, 31)
+    assert [m.month for m in stats.by_month] == [date(2026, 3, 1)]
+
+
+@pytest.fixture
+def user_headers(auth_headers):
+    return auth_headers("xavier@example.com", "Stats$25")
+
+
+def test_stats_endpoint(client, user_headers):
+    params = {"start_date": "2026-01-01", "end_date": "2026-02-28", "days": 3}
+    empty = client.get("/expenses/stats", params=params, headers=user_headers)
+    assert empty.status_code == 200, empty.text
+    assert empty.json()["count"] == 0 and empty.json()["forecast"]["projected_total"] == 0.0
+
+    expenses = [("2026-01-05", 10.0), ("2026-01-06", 12.0), ("2026-01-07", 11.0), ("2026-01-08", 9.0),
+                ("2026-01-09", 10.0), ("2026-02-26", 13.0), ("2026-02-27", 250.0)]
+    for day, amount in expenses:
+        resp = client.post("/expenses/", json={"amount": amount, "category": "Groceries", "date": day}, headers=user_headers)
+        assert resp.status_code == 201, resp.text
+    client.post("/expenses/", json={"amount": 40.0, "category": "Leisure", "date": "2026-02-28"}, headers=user_headers)
+
+    resp = client.get("/expenses/stats", params=params, headers=user_headers)
+    assert resp.status_code == 200, resp.text
+    stats = resp.json()
+    assert (stats["start_date"], stats["end_date"], stats["count"], stats["total"]) == ("2026-01-01", "2026-02-28", 8, 355.0)
+    assert [(d["day"], d["total"]) for d in stats["rolling"]] == [
+        ("2026-02-26", 13.0), ("2026-02-27", 250.0), ("2026-02-28", 40.0),
+    ]
+    assert stats["rolling"][-1]["average_7d"] == pytest.approx(303.0 / 7)
+
+    groceries, leisure = stats["by_category"]
+    assert (groceries["category"], groceries["count"], groceries["p50"]) == ("Groceries", 7, 11.0)
+    assert groceries["p25"] == 10.0 and groceries["p75"] == 12.5
+    assert (leisure["category"], leisure["p95"]) == ("Leisure", 40.0)
+
+    january, february = stats["by_month"]
+    assert (january["month"], january["total"], january["change"]) == ("2026-01-01", 52.0, None)
+    assert (february["total"], february["count"], february["change"]) == (303.0, 3, 251.0)
+    assert february["change_pct"] == pytest.approx(251.0 / 52.0 * 100)
+
+    assert stats["forecast"]["fit_days"] == 59 and stats["forecast"]["horizon_days"] == 30
+    assert stats["outlier_count"] == 1
+    assert [(o["date"], o["amount"], o["category"]) for o in stats["outliers"]] == [("2026-02-27", 250.0, "Groceries")]
+
+    # Cached until the next write, like the other reads
+    etag = resp.headers["ETag"]
+    assert client.get("/expenses/stats", params=params, headers={**user_headers, "If-None-Match": etag}).status_code == 304
+
+
+@pytest.mark.parametrize("params", [
+    {"days": 0},
+    {"days": 5000},
+    {"start_date": "2026-03-01", "end_date": "2026-02-01"},
+])
+def test_stats_rejects_bad_parameters(client, user_headers, params):
+    assert client.get("/expenses/stats", params=params, headers=user_headers).status_code in (400, 422)